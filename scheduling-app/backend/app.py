@@ -10,6 +10,18 @@ from datetime import datetime, timedelta
 # Import db instance from models.py
 from models import db, Resource, Reservation # Import Resource and Reservation here as well if needed directly in app.py, or ensure they are imported where used.
 from routes import init_routes
+from reservation_index import reservation_index
+from resource_search import resource_search_index
+from resource_cache import resource_cache
+from outbox import outbox_dispatcher
+from lifecycle import lifecycle_scheduler
+from response_cache import response_cache
+from occupancy import occupancy_cache
+from metrics import metrics
+from compression import response_compressor
+import engine_profiles
+from archive import archiver, archive_command
+from health import health_prober
 
 # Load environment variables
 load_dotenv()
@@ -21,11 +33,105 @@ CORS(app) # Enable CORS for all routes
 # Configure SQLAlchemy
 app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///resources.db')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+# Engine tuning (DB_ENGINE_PROFILE): SQLite pragmas or a sized PostgreSQL pool, plus an optional
+# read replica (DATABASE_READ_URL) for the read-only endpoints. See engine_profiles.py.
+engine_profiles.configure(app, os.environ)
+# In-memory interval index for conflict checks and availability lookups (single-process deployments only)
+app.config['RESERVATION_INDEX_ENABLED'] = os.environ.get('RESERVATION_INDEX_ENABLED', 'false').lower() == 'true'
+if os.environ.get('SOCKETIO_MESSAGE_QUEUE') and app.config['RESERVATION_INDEX_ENABLED']:
+    # A message queue means several worker processes; each would only see its own writes.
+    app.logger.warning('RESERVATION_INDEX_ENABLED is ignored when SOCKETIO_MESSAGE_QUEUE is set (multi-worker mode).')
+    app.config['RESERVATION_INDEX_ENABLED'] = False
+# How many times a booking is retried when the database reports lock contention
+app.config['BOOKING_MAX_ATTEMPTS'] = int(os.environ.get('BOOKING_MAX_ATTEMPTS', '5'))
+# Largest number of reservations accepted by POST /reserve/batch
+app.config['BATCH_MAX_SIZE'] = int(os.environ.get('BATCH_MAX_SIZE', '1000'))
+# Largest number of entries returned by one GET /reservations/changes call
+app.config['CHANGES_MAX_LIMIT'] = int(os.environ.get('CHANGES_MAX_LIMIT', '1000'))
+# Page sizes for keyset-paginated listings (?limit=&cursor=)
+app.config['DEFAULT_PAGE_SIZE'] = int(os.environ.get('DEFAULT_PAGE_SIZE', '100'))
+app.config['MAX_PAGE_SIZE'] = int(os.environ.get('MAX_PAGE_SIZE', '1000'))
+# ETag / If-None-Match support and an in-process cache of read responses, expired by the next write.
+# Only sees this process's writes, so it is off in multi-worker mode (SOCKETIO_MESSAGE_QUEUE set).
+# A lagging read replica could also get a stale body cached under a fresh version, so it is off then too.
+app.config['RESPONSE_CACHE_ENABLED'] = (os.environ.get('RESPONSE_CACHE_ENABLED', 'true').lower() == 'true'
+                                        and not os.environ.get('SOCKETIO_MESSAGE_QUEUE')
+                                        and not app.config['READ_REPLICA_ENABLED'])
+app.config['RESPONSE_CACHE_MAX_ENTRIES'] = int(os.environ.get('RESPONSE_CACHE_MAX_ENTRIES', '256'))
+app.config['RESPONSE_CACHE_MAX_BODY_BYTES'] = int(os.environ.get('RESPONSE_CACHE_MAX_BODY_BYTES', str(8 * 1024 * 1024)))
+response_cache.max_entries = app.config['RESPONSE_CACHE_MAX_ENTRIES']
+# Read-through cache of resources for GET /resources, /resources/<id> and /availability/<id>. Writes made
+# through this process invalidate it at once; other processes' writes show up after the TTL.
+app.config['RESOURCE_CACHE_ENABLED'] = os.environ.get('RESOURCE_CACHE_ENABLED', 'true').lower() == 'true'
+app.config['RESOURCE_CACHE_MAX_ENTRIES'] = int(os.environ.get('RESOURCE_CACHE_MAX_ENTRIES', '1024'))
+app.config['RESOURCE_CACHE_TTL_SECONDS'] = int(os.environ.get('RESOURCE_CACHE_TTL_SECONDS', '60'))
+# GET /occupancy: cached matrices per window, each checked against the change log before reuse
+app.config['OCCUPANCY_CACHE_ENABLED'] = os.environ.get('OCCUPANCY_CACHE_ENABLED', 'true').lower() == 'true'
+app.config['OCCUPANCY_CACHE_MAX_ENTRIES'] = int(os.environ.get('OCCUPANCY_CACHE_MAX_ENTRIES', '128'))
+app.config['OCCUPANCY_MAX_SLOTS'] = int(os.environ.get('OCCUPANCY_MAX_SLOTS', '2016'))
+occupancy_cache.max_entries = app.config['OCCUPANCY_CACHE_MAX_ENTRIES']
+# Batch reservation events per Socket.IO room for this many milliseconds (0 emits immediately)
+app.config['SOCKETIO_COALESCE_MS'] = int(os.environ.get('SOCKETIO_COALESCE_MS', '0'))
+# Longest date window a client may subscribe to
+app.config['SOCKETIO_MAX_SUBSCRIPTION_DAYS'] = int(os.environ.get('SOCKETIO_MAX_SUBSCRIPTION_DAYS', '31'))
+# Also emit reservation events in the compact (columnar) form, to clients subscribing with compact: true.
+# Every event is then emitted twice.
+app.config['SOCKETIO_COMPACT_EVENTS'] = os.environ.get('SOCKETIO_COMPACT_EVENTS', 'false').lower() == 'true'
+# gzip (or brotli, when installed) JSON and MessagePack responses of at least this many bytes; streamed
+# listings are always compressed. 0 turns compression off.
+app.config['COMPRESSION_MIN_BYTES'] = int(os.environ.get('COMPRESSION_MIN_BYTES', '1024'))
+# Per-endpoint latency, SQL and Socket.IO metrics on GET /metrics (Prometheus text format)
+app.config['METRICS_ENABLED'] = os.environ.get('METRICS_ENABLED', 'true').lower() == 'true'
+# Log requests slower than this many milliseconds together with their SQL (0 disables the log)
+app.config['SLOW_REQUEST_MS'] = int(os.environ.get('SLOW_REQUEST_MS', '0'))
+app.config['SLOW_REQUEST_MAX_STATEMENTS'] = int(os.environ.get('SLOW_REQUEST_MAX_STATEMENTS', '50'))
+# Reservations that ended more than ARCHIVE_RETENTION_DAYS ago are moved to reservations_archive,
+# ARCHIVE_BATCH_SIZE rows per transaction, by `flask archive-reservations` or, when
+# ARCHIVE_INTERVAL_SECONDS > 0, by a background task of the server process.
+app.config['ARCHIVE_RETENTION_DAYS'] = int(os.environ.get('ARCHIVE_RETENTION_DAYS', '90'))
+app.config['ARCHIVE_BATCH_SIZE'] = int(os.environ.get('ARCHIVE_BATCH_SIZE', '1000'))
+app.config['ARCHIVE_BATCH_PAUSE_MS'] = int(os.environ.get('ARCHIVE_BATCH_PAUSE_MS', '50'))
+app.config['ARCHIVE_INTERVAL_SECONDS'] = int(os.environ.get('ARCHIVE_INTERVAL_SECONDS', '0'))
+# Both the command and the task also delete /reservations/changes entries older than
+# CHANGES_RETENTION_DAYS; clients further behind than that are told to resync.
+app.config['CHANGES_RETENTION_DAYS'] = int(os.environ.get('CHANGES_RETENTION_DAYS', '30'))
+# Background TCP probes of every resource's SSH and web ports (HEALTH_PROBE_INTERVAL_SECONDS = 0 disables
+# them): at most HEALTH_PROBE_CONCURRENCY connections at once, HEALTH_PROBE_TIMEOUT_MS each, unreachable
+# devices backed off up to HEALTH_PROBE_MAX_BACKOFF_SECONDS. Results older than HEALTH_STATUS_TTL_SECONDS
+# are reported as unknown by /resources/status.
+app.config['HEALTH_PROBE_INTERVAL_SECONDS'] = int(os.environ.get('HEALTH_PROBE_INTERVAL_SECONDS', '30'))
+app.config['HEALTH_PROBE_CONCURRENCY'] = int(os.environ.get('HEALTH_PROBE_CONCURRENCY', '200'))
+app.config['HEALTH_PROBE_TIMEOUT_MS'] = int(os.environ.get('HEALTH_PROBE_TIMEOUT_MS', '2000'))
+app.config['HEALTH_PROBE_MAX_BACKOFF_SECONDS'] = int(os.environ.get('HEALTH_PROBE_MAX_BACKOFF_SECONDS', '600'))
+app.config['HEALTH_STATUS_TTL_SECONDS'] = int(os.environ.get('HEALTH_STATUS_TTL_SECONDS',
+                                                             str(3 * max(app.config['HEALTH_PROBE_INTERVAL_SECONDS'], 30))))
+# GET /resources/search: in-memory index over resource names and addresses (false queries the database).
+# Writes from other processes are picked up by rebuilding it once older than RESOURCE_SEARCH_REFRESH_SECONDS.
+app.config['RESOURCE_SEARCH_INDEX_ENABLED'] = os.environ.get('RESOURCE_SEARCH_INDEX_ENABLED', 'true').lower() == 'true'
+app.config['RESOURCE_SEARCH_REFRESH_SECONDS'] = int(os.environ.get('RESOURCE_SEARCH_REFRESH_SECONDS', '300'))
+# Transactional outbox: Socket.IO events are stored with the write they announce and emitted after commit by
+# a dispatcher (the background jobs' process), OUTBOX_BATCH_SIZE at a time; it polls every OUTBOX_POLL_INTERVAL_MS
+# for events of other worker processes. A failed emit is retried every OUTBOX_RETRY_DELAY_MS, OUTBOX_MAX_ATTEMPTS times.
+app.config['OUTBOX_BATCH_SIZE'] = int(os.environ.get('OUTBOX_BATCH_SIZE', '100'))
+app.config['OUTBOX_POLL_INTERVAL_MS'] = int(os.environ.get('OUTBOX_POLL_INTERVAL_MS', '200'))
+app.config['OUTBOX_RETRY_DELAY_MS'] = int(os.environ.get('OUTBOX_RETRY_DELAY_MS', '1000'))
+app.config['OUTBOX_MAX_ATTEMPTS'] = int(os.environ.get('OUTBOX_MAX_ATTEMPTS', '5'))
+# reservation_started / reservation_ended events: upcoming boundaries are loaded this many minutes ahead
+# (0 turns the events off)
+app.config['LIFECYCLE_HORIZON_MINUTES'] = int(os.environ.get('LIFECYCLE_HORIZON_MINUTES', '60'))
 
 # Initialize db with the app
 db.init_app(app)
 migrate = Migrate(app, db)
-socketio = SocketIO(app, cors_allowed_origins="*")
+# Socket.IO async mode: the development server uses threads; serve.py switches to gevent.
+# With SOCKETIO_MESSAGE_QUEUE set (e.g. redis://localhost:6379/0), emits are relayed through the
+# queue so clients connected to any worker process receive them.
+socketio = SocketIO(
+    app,
+    cors_allowed_origins="*",
+    async_mode=os.environ.get('SOCKETIO_ASYNC_MODE', 'threading'),
+    message_queue=os.environ.get('SOCKETIO_MESSAGE_QUEUE') or None
+)
 
 swagger_template = {
     "swagger": "2.0",
@@ -82,6 +188,31 @@ swagger_template = {
                     "nullable": True
                 }
             }
+        },
+        "SeriesRequest": {
+            "type": "object",
+            "required": ["resource_id", "start_time", "duration_minutes", "rrule"],
+            "properties": {
+                "resource_id": {"type": "integer", "description": "ID of the resource to reserve"},
+                "start_time": {"type": "string", "format": "date-time", "description": "Start of the first occurrence (ISO 8601)"},
+                "duration_minutes": {"type": "integer", "description": "Duration of each occurrence in minutes"},
+                "rrule": {"type": "string", "description": "Recurrence rule: FREQ=DAILY|WEEKLY with optional INTERVAL, BYDAY (weekly) and UNTIL or COUNT, e.g. FREQ=WEEKLY;BYDAY=MO,TU,WE,TH,FR"},
+                "exdates": {"type": "array", "items": {"type": "string", "format": "date-time"}, "description": "Start times of occurrences to leave out"},
+                "description": {"type": "string", "description": "Optional description for every occurrence", "nullable": True}
+            }
+        },
+        "Series": {
+            "type": "object",
+            "properties": {
+                "id": {"type": "integer", "description": "Series ID"},
+                "resource_id": {"type": "integer", "description": "ID of the reserved resource"},
+                "start_time": {"type": "string", "format": "date-time", "description": "Start of the first occurrence"},
+                "duration_minutes": {"type": "integer"},
+                "rrule": {"type": "string"},
+                "exdates": {"type": "array", "items": {"type": "string", "format": "date-time"}},
+                "last_end_time": {"type": "string", "format": "date-time", "description": "End of the last occurrence; null for open-ended series", "nullable": True},
+                "description": {"type": "string", "nullable": True}
+            }
         }
     }
 }
@@ -90,6 +221,30 @@ swagger = Swagger(app, template=swagger_template) # Initialize Flasgger with the
 
 # Initialize routes (db is already imported and initialized)
 init_routes(app, db, socketio)
+outbox_dispatcher.init_app(app)
+outbox_dispatcher.add_listener(lifecycle_scheduler.on_event)
+metrics.init_app(app)
+response_compressor.init_app(app)
+resource_cache.init_app(app)
+app.cli.add_command(archive_command)
+
+def start_background_jobs():
+    """Starts the periodic jobs of a server process (one process per deployment, see serve.py)."""
+    outbox_dispatcher.start(app, socketio)
+    lifecycle_scheduler.start(app, socketio)
+    archiver.start(app, socketio)
+    health_prober.start(app, socketio)
+
+def build_indexes():
+    """Loads the enabled in-memory indexes up front, so the first requests do not pay for it."""
+    with app.app_context():
+        if app.config['RESERVATION_INDEX_ENABLED']:
+            reservation_index.build()
+        if app.config['RESOURCE_SEARCH_INDEX_ENABLED']:
+            resource_search_index.build()
 
 if __name__ == '__main__':
+    build_indexes()
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':  # Only in the reloader's child, which serves requests
+        start_background_jobs()
     socketio.run(app, debug=True, host="0.0.0.0", port=5001)
\ No newline at end of file
@@ -0,0 +1,203 @@
+import time
+from datetime import datetime, timedelta, timezone
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import delete, insert, literal, select
+from sqlalchemy.exc import IntegrityError
+
+from changes import prune_changes
+from models import Reservation, ReservationArchive, db
+from reservation_index import reservation_index
+
+ARCHIVE_COLUMNS = (ReservationArchive.id, ReservationArchive.resource_id, ReservationArchive.start_time,
+                   ReservationArchive.end_time, ReservationArchive.description)
+
+
+def utcnow():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def retention_cutoff(retention_days):
+    """Reservations that ended before this (naive UTC) time are archived."""
+    if retention_days < 0:
+        raise ValueError('retention must not be negative')
+    return utcnow() - timedelta(days=retention_days)
+
+
+def find_archived_conflict(resource_id, start_time, end_time):
+    """
+    Returns the id of an archived reservation overlapping [start_time, end_time) on resource_id.
+    Archived reservations all ended in the past, so bookings starting from now on skip the query.
+    """
+    if start_time >= utcnow():
+        return None
+    return db.session.scalar(
+        select(ReservationArchive.id).where(
+            ReservationArchive.resource_id == resource_id,
+            ReservationArchive.start_time < end_time,
+            ReservationArchive.end_time > start_time
+        ).limit(1)
+    )
+
+
+def load_archived_intervals(resource_ids, start_time, end_time):
+    """Like booking.load_window_intervals, for archived reservations; empty for windows in the future."""
+    if start_time >= utcnow():
+        return {}
+    rows = db.session.execute(
+        select(ReservationArchive.resource_id, ReservationArchive.start_time, ReservationArchive.end_time,
+               ReservationArchive.id)
+        .where(ReservationArchive.resource_id.in_(resource_ids),
+               ReservationArchive.start_time < end_time,
+               ReservationArchive.end_time > start_time)
+        .order_by(ReservationArchive.resource_id, ReservationArchive.start_time)
+    )
+    intervals = {}
+    for resource_id, start, end, reservation_id in rows:
+        intervals.setdefault(resource_id, []).append((start, end, reservation_id))
+    return intervals
+
+
+class ArchiveConflict(Exception):
+    """Reservations could not be archived because their ids are already in reservations_archive."""
+
+    def __init__(self, ids):
+        super().__init__(f'Reservation ids already in reservations_archive: {ids}')
+        self.ids = ids
+
+
+def _archive_batch(cutoff, batch_size):
+    query = select(Reservation.id).where(Reservation.end_time < cutoff) \
+        .order_by(Reservation.end_time).limit(batch_size)
+    if db.engine.dialect.name == 'postgresql':
+        query = query.with_for_update(skip_locked=True)  # Concurrent archivers take disjoint batches
+    ids = db.session.scalars(query).all()
+    if not ids:
+        db.session.rollback()
+        return []
+
+    db.session.execute(insert(ReservationArchive.__table__).from_select(
+        ['id', 'resource_id', 'start_time', 'end_time', 'description', 'group_id', 'archived_at'],
+        select(Reservation.id, Reservation.resource_id, Reservation.start_time, Reservation.end_time,
+               Reservation.description, Reservation.group_id, literal(utcnow(), db.DateTime)).where(Reservation.id.in_(ids))
+    ))
+    db.session.execute(delete(Reservation.__table__).where(Reservation.id.in_(ids)))
+    db.session.commit()
+    for reservation_id in ids:
+        reservation_index.remove(reservation_id)
+    return ids
+
+
+def _already_archived(cutoff, limit=20):
+    """Ids of reservations due for archival that reservations_archive already holds."""
+    return db.session.scalars(
+        select(Reservation.id).join(ReservationArchive, ReservationArchive.id == Reservation.id)
+        .where(Reservation.end_time < cutoff).order_by(Reservation.id).limit(limit)
+    ).all()
+
+
+def archive_reservations(cutoff, batch_size=1000, max_batches=None, pause_seconds=0.0):
+    """
+    Moves reservations that ended before cutoff into reservations_archive, oldest first, one
+    transaction of at most batch_size rows at a time, so writers are never blocked for long.
+    Sleeps pause_seconds between batches. Returns the number of reservations moved.
+
+    Raises ArchiveConflict when reservations_archive already holds some of the ids (outside
+    PostgreSQL, where concurrent archivers cannot explain it).
+
+    Archival is not a change clients need to replay: the change log is left alone, and archived
+    rows stay visible to history queries that pass include_archived.
+    """
+    moved = batches = collisions = 0
+    while max_batches is None or batches < max_batches:
+        try:
+            ids = _archive_batch(cutoff, batch_size)
+        except IntegrityError:
+            db.session.rollback()
+            if db.engine.dialect.name != 'postgresql':
+                # Batches are only taken concurrently with SKIP LOCKED: elsewhere the ids themselves collide
+                raise ArchiveConflict(_already_archived(cutoff))
+            # Another archiver (a second process) moved some of the same rows first; try again.
+            collisions += 1
+            if collisions > 3:
+                raise
+            continue
+        collisions = 0
+        if not ids:
+            break
+        moved += len(ids)
+        batches += 1
+        if pause_seconds:
+            time.sleep(pause_seconds)
+    return moved
+
+
+class Archiver:
+    """
+    Runs archive_reservations every ARCHIVE_INTERVAL_SECONDS in a background task, and prunes the
+    change log down to CHANGES_RETENTION_DAYS.
+    """
+
+    def __init__(self):
+        self.running = False
+
+    def start(self, app, socketio):
+        if self.running or app.config.get('ARCHIVE_INTERVAL_SECONDS', 0) <= 0:
+            return
+        self.running = True
+        socketio.start_background_task(self._run, app, socketio)
+
+    def _run(self, app, socketio):
+        interval = app.config['ARCHIVE_INTERVAL_SECONDS']
+        while self.running:
+            socketio.sleep(interval)
+            with app.app_context():
+                try:
+                    moved = archive_reservations(
+                        retention_cutoff(app.config['ARCHIVE_RETENTION_DAYS']),
+                        batch_size=app.config['ARCHIVE_BATCH_SIZE'],
+                        pause_seconds=app.config['ARCHIVE_BATCH_PAUSE_MS'] / 1000.0
+                    )
+                    if moved:
+                        app.logger.info('Archived %d reservations', moved)
+                except Exception:
+                    app.logger.exception('Reservation archival failed')
+                finally:
+                    db.session.remove()
+                try:
+                    pruned = prune_changes(retention_cutoff(app.config['CHANGES_RETENTION_DAYS']),
+                                           batch_size=app.config['ARCHIVE_BATCH_SIZE'])
+                    if pruned:
+                        app.logger.info('Pruned %d change-log entries', pruned)
+                except Exception:
+                    app.logger.exception('Change-log pruning failed')
+                finally:
+                    db.session.remove()
+
+    def stop(self):
+        self.running = False
+
+
+archiver = Archiver()
+
+
+@click.command('archive-reservations')
+@click.option('--older-than-days', type=int, default=None,
+              help='Archive reservations that ended more than this many days ago (default: ARCHIVE_RETENTION_DAYS).')
+@click.option('--batch-size', type=int, default=None, help='Rows moved per transaction (default: ARCHIVE_BATCH_SIZE).')
+@click.option('--max-batches', type=int, default=None, help='Stop after this many batches.')
+@with_appcontext
+def archive_command(older_than_days, batch_size, max_batches):
+    """Move finished reservations into reservations_archive and prune the change log."""
+    config = current_app.config
+    days = config['ARCHIVE_RETENTION_DAYS'] if older_than_days is None else older_than_days
+    started = time.perf_counter()
+    moved = archive_reservations(retention_cutoff(days), batch_size or config['ARCHIVE_BATCH_SIZE'], max_batches,
+                                 config['ARCHIVE_BATCH_PAUSE_MS'] / 1000.0)
+    click.echo(f'Archived {moved} reservations that ended more than {days} days ago '
+               f'in {time.perf_counter() - started:.1f}s')
+    pruned = prune_changes(retention_cutoff(config['CHANGES_RETENTION_DAYS']),
+                           batch_size or config['ARCHIVE_BATCH_SIZE'])
+    click.echo(f"Pruned {pruned} change-log entries older than {config['CHANGES_RETENTION_DAYS']} days")
@@ -0,0 +1,297 @@
+"""
+Load and latency benchmark for the scheduling API.
+
+Seeds a synthetic dataset, then drives the main endpoints with concurrent clients and prints
+throughput and latency percentiles as JSON (compare two runs with benchmarks/compare.py).
+
+In-process (Flask test client, no network), against a fresh SQLite file:
+    python benchmarks/bench_api.py --resources 10000 --reservations 1000000 --output sqlite.json
+
+Against a local PostgreSQL:
+    python benchmarks/bench_api.py --database-url postgresql://localhost/scheduler_bench --output pg.json
+
+Against an already running server (seed its database first with --seed-only):
+    python benchmarks/bench_api.py --url http://localhost:5001 --clients 32
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from urllib.parse import urlsplit
+
+# Add the parent directory (backend) to sys.path
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PARENT_DIR = os.path.dirname(SCRIPT_DIR)
+sys.path.append(PARENT_DIR)
+sys.path.append(os.path.join(PARENT_DIR, 'db_scripts'))
+
+SCENARIOS = ('reserve', 'list_full', 'list_window', 'availability', 'delete', 'mixed')
+
+# Seeded reservations are spread over this period, ending at BASE_TIME; new bookings go after it.
+BASE_TIME = datetime(2026, 1, 1)
+HISTORY_DAYS = 365
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * (len(sorted_values) - 1)))))
+    return sorted_values[index]
+
+
+def rounded(value):
+    return None if value is None else round(value, 3)
+
+
+def summarize(latencies, statuses, elapsed):
+    latencies_ms = sorted(latency * 1000 for latency in latencies)
+    count = len(latencies_ms)
+    return {
+        'requests': count,
+        'errors': sum(n for status, n in statuses.items() if status >= 500),
+        'statuses': {str(status): n for status, n in sorted(statuses.items())},
+        'throughput_rps': round(count / elapsed, 2) if elapsed else None,
+        'latency_ms': {
+            'mean': rounded(sum(latencies_ms) / count) if count else None,
+            'p50': rounded(percentile(latencies_ms, 0.50)),
+            'p95': rounded(percentile(latencies_ms, 0.95)),
+            'p99': rounded(percentile(latencies_ms, 0.99)),
+            'max': rounded(latencies_ms[-1]) if count else None,
+        },
+    }
+
+
+class TestClientDriver:
+    """Sends requests through the Flask test client (app + database cost only, no network)."""
+
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method, path, body=None):
+        response = self.client.open(path, method=method, json=body)
+        data = response.get_data()
+        return response.status_code, data
+
+
+class HTTPDriver:
+    """Sends requests to a running server over one keep-alive connection per client."""
+
+    def __init__(self, base_url):
+        parts = urlsplit(base_url)
+        self.connection = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=60)
+
+    def request(self, method, path, body=None):
+        payload = json.dumps(body) if body is not None else None
+        headers = {'Content-Type': 'application/json'} if body is not None else {}
+        self.connection.request(method, path, body=payload, headers=headers)
+        response = self.connection.getresponse()
+        return response.status, response.read()
+
+
+def seed_database(db, resources, reservations, seed=42, chunk_size=10000):
+    """
+    Loads a deterministic synthetic dataset (db_scripts/generate_data.py) through the bulk
+    importer, with reservations covering HISTORY_DAYS before BASE_TIME. Requires an app context
+    with an empty database. Returns the resource ids.
+    """
+    from bulk_import import import_reservations, import_resources
+    from generate_data import generate_reservations, generate_resources
+    from models import Resource
+
+    db.create_all()
+    import_resources(enumerate(generate_resources(resources, seed), start=1), chunk_size)
+    report = import_reservations(
+        enumerate(generate_reservations(resources, reservations, BASE_TIME - timedelta(days=HISTORY_DAYS),
+                                        HISTORY_DAYS, seed), start=1),
+        chunk_size
+    )
+    if report.rejected:
+        raise RuntimeError(f'{len(report.rejected)} generated reservations were rejected')
+    return [row[0] for row in db.session.query(Resource.id).order_by(Resource.id)]
+
+
+class Scenario:
+    """Generates requests for one endpoint; each client thread calls next_request()."""
+
+    def __init__(self, name, resource_ids):
+        self.name = name
+        self.resource_ids = resource_ids
+        self.created_ids = []
+        self.lock = threading.Lock()
+
+    def next_request(self, rng):
+        window_start = BASE_TIME - timedelta(days=rng.randrange(HISTORY_DAYS))
+        window = f'start={window_start.isoformat()}Z&end={(window_start + timedelta(days=1)).isoformat()}Z'
+        if self.name == 'reserve':
+            start_time = BASE_TIME + timedelta(minutes=30 * rng.randrange(1_000_000))
+            return 'POST', '/reserve', {'resource_id': rng.choice(self.resource_ids),
+                                        'start_time': start_time.isoformat() + 'Z', 'duration_minutes': 30}
+        if self.name == 'list_full':
+            return 'GET', '/reservations', None
+        if self.name == 'list_window':
+            return 'GET', f'/reservations?{window}', None
+        if self.name == 'availability':
+            return 'GET', f'/availability/{rng.choice(self.resource_ids)}?{window}', None
+        if self.name == 'mixed':
+            # One write for every three reads, all running at once: what a busy day looks like.
+            return Scenario(rng.choice(('reserve', 'list_window', 'list_window', 'availability')),
+                            self.resource_ids).next_request(rng)
+        if self.name == 'delete':
+            with self.lock:
+                reservation_id = self.created_ids.pop() if self.created_ids else None
+            if reservation_id is None:
+                return None
+            return 'DELETE', f'/reservations/{reservation_id}', None
+        raise ValueError(self.name)
+
+
+def run_scenario(scenario, driver_factory, clients, requests_per_client, seed):
+    latencies = []
+    statuses = {}
+    lock = threading.Lock()
+    barrier = threading.Barrier(clients + 1)
+
+    def client_loop(client_index):
+        driver = driver_factory()
+        rng = random.Random(seed * 1000 + client_index)
+        local_latencies, local_statuses, created = [], {}, []
+        barrier.wait()
+        for _ in range(requests_per_client):
+            request = scenario.next_request(rng)
+            if request is None:
+                break
+            method, path, body = request
+            started = time.perf_counter()
+            status, data = driver.request(method, path, body)
+            local_latencies.append(time.perf_counter() - started)
+            local_statuses[status] = local_statuses.get(status, 0) + 1
+            if method == 'POST' and status == 201:
+                created.append(json.loads(data)['id'])
+        with lock:
+            latencies.extend(local_latencies)
+            for status, n in local_statuses.items():
+                statuses[status] = statuses.get(status, 0) + n
+            scenario.created_ids.extend(created)
+
+    threads = [threading.Thread(target=client_loop, args=(i,)) for i in range(clients)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    return summarize(latencies, statuses, time.perf_counter() - started)
+
+
+def run_benchmark(driver_factory, resource_ids, scenarios=SCENARIOS, clients=8, requests_per_client=50, seed=42):
+    """Runs the scenarios in order and returns {scenario: summary}. delete removes what reserve created."""
+    results = {}
+    created_ids = []
+    for name in scenarios:
+        scenario = Scenario(name, resource_ids)
+        if name == 'delete':
+            scenario.created_ids = list(created_ids)
+        per_client = max(1, requests_per_client // 10) if name == 'list_full' else requests_per_client
+        results[name] = run_scenario(scenario, driver_factory, clients, per_client, seed)
+        if name == 'reserve':
+            created_ids = scenario.created_ids
+    return results
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=PARENT_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the scheduling API.')
+    parser.add_argument('--database-url', help='database to seed and benchmark (default: a fresh SQLite file)')
+    parser.add_argument('--url', help='benchmark a running server instead of the in-process app')
+    parser.add_argument('--resources', type=int, default=1000)
+    parser.add_argument('--reservations', type=int, default=100000)
+    parser.add_argument('--clients', type=int, default=8, help='concurrent client threads')
+    parser.add_argument('--requests', type=int, default=200, help='requests per client per scenario')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS), help='comma-separated subset of ' + ', '.join(SCENARIOS))
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--skip-seed', action='store_true', help='reuse the data already in the database')
+    parser.add_argument('--seed-only', action='store_true', help='seed the database and exit')
+    parser.add_argument('--with-cache', action='store_true', help='keep the response cache enabled for reads')
+    parser.add_argument('--engine-profile', choices=('tuned', 'default'), help='DB_ENGINE_PROFILE for the in-process app')
+    parser.add_argument('--output', help='write the JSON report here as well as to stdout')
+    args = parser.parse_args(argv)
+
+    scenarios = [name.strip() for name in args.scenarios.split(',') if name.strip()]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    tmpdir = None
+    if args.database_url:
+        os.environ['DATABASE_URL'] = args.database_url
+    elif not args.url:
+        tmpdir = tempfile.TemporaryDirectory()
+        os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tmpdir.name, 'bench.db')}"
+    if not args.with_cache:
+        os.environ['RESPONSE_CACHE_ENABLED'] = 'false'
+    if args.engine_profile:
+        os.environ['DB_ENGINE_PROFILE'] = args.engine_profile
+
+    from app import app, db
+    from models import Resource
+
+    with app.app_context():
+        dialect = db.engine.dialect.name
+        if args.skip_seed or args.url and not args.database_url:
+            resource_ids = [row[0] for row in db.session.query(Resource.id).order_by(Resource.id)]
+        else:
+            started = time.perf_counter()
+            resource_ids = seed_database(db, args.resources, args.reservations, args.seed)
+            print(f'Seeded {args.resources} resources and {args.reservations} reservations '
+                  f'in {time.perf_counter() - started:.1f}s', file=sys.stderr)
+    if args.seed_only:
+        return 0
+    if not resource_ids:
+        parser.error('the database has no resources; seed it first')
+
+    if args.url:
+        driver_factory = lambda: HTTPDriver(args.url)
+    else:
+        driver_factory = lambda: TestClientDriver(app)
+
+    report = {
+        'meta': {
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'git_revision': git_revision(),
+            'database': dialect,
+            'target': args.url or 'in-process',
+            'resources': len(resource_ids),
+            'reservations': args.reservations,
+            'clients': args.clients,
+            'requests_per_client': args.requests,
+            'response_cache': args.with_cache,
+            'engine_profile': app.config['DB_ENGINE_PROFILE'],
+        },
+        'scenarios': run_benchmark(driver_factory, resource_ids, scenarios, args.clients, args.requests, args.seed),
+    }
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    if tmpdir:
+        tmpdir.cleanup()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
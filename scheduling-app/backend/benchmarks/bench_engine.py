@@ -0,0 +1,67 @@
+"""
+Compares the SQLite engine profiles (DB_ENGINE_PROFILE=default vs tuned) on the same workload.
+
+    python benchmarks/bench_engine.py --resources 1000 --reservations 100000 --clients 16
+
+Runs bench_api.py once per profile, each against a fresh SQLite file, then prints both reports
+side by side (baseline: default) with compare.py. Pass --database-url to compare the pool
+settings against a PostgreSQL database instead; it is re-seeded for each run, so use a scratch one.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(SCRIPT_DIR)
+
+import compare
+
+DEFAULT_SCENARIOS = 'reserve,list_window,availability,mixed'
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the default and tuned engine profiles.')
+    parser.add_argument('--database-url', help='scratch server database (default: fresh SQLite files)')
+    parser.add_argument('--resources', type=int, default=1000)
+    parser.add_argument('--reservations', type=int, default=100000)
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=100)
+    parser.add_argument('--scenarios', default=DEFAULT_SCENARIOS)
+    parser.add_argument('--output', help='write both reports here as one JSON object')
+    args = parser.parse_args(argv)
+
+    reports = {}
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for profile in ('default', 'tuned'):
+            output = os.path.join(tmpdir, f'{profile}.json')
+            command = [sys.executable, os.path.join(SCRIPT_DIR, 'bench_api.py'), '--engine-profile', profile,
+                       '--resources', str(args.resources), '--reservations', str(args.reservations),
+                       '--clients', str(args.clients), '--requests', str(args.requests),
+                       '--scenarios', args.scenarios, '--output', output]
+            if args.database_url:
+                if args.database_url.startswith('postgresql'):
+                    reset = [sys.executable, '-c', 'from app import app, db\nwith app.app_context(): db.drop_all()']
+                    subprocess.run(reset, cwd=os.path.dirname(SCRIPT_DIR), check=True,
+                                   env=dict(os.environ, DATABASE_URL=args.database_url))
+                command += ['--database-url', args.database_url]
+            print(f'Running the {profile} profile...', file=sys.stderr)
+            subprocess.run(command, check=True, stdout=subprocess.DEVNULL)
+            with open(output) as f:
+                reports[profile] = json.load(f)
+
+    rows, _ = compare.compare(reports['default'], reports['tuned'], threshold=0)
+    print(f"{'scenario':<14}{'metric':<22}{'default':>12}{'tuned':>12}{'change':>10}")
+    for name, label, before, after, change, _ in rows:
+        change_text = '' if change is None else f'{change:+.1f}%'
+        print(f'{name:<14}{label:<22}{before!s:>12}{after!s:>12}{change_text:>10}')
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(reports, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
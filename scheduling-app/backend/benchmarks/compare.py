@@ -0,0 +1,70 @@
+"""
+Compares two benchmark reports written by bench_api.py and flags regressions.
+
+    python benchmarks/compare.py baseline.json candidate.json --threshold 10
+
+Exits with status 1 when any scenario's p95/p99 latency grew, or its throughput dropped, by more
+than the threshold percentage (or when a scenario started returning 5xx errors).
+"""
+import argparse
+import json
+import sys
+
+LATENCY_KEYS = ('p50', 'p95', 'p99')
+GATED_LATENCY_KEYS = ('p95', 'p99')
+
+
+def change_percent(before, after):
+    if not before or after is None:
+        return None
+    return (after - before) / before * 100
+
+
+def compare(baseline, candidate, threshold):
+    """Returns (rows, regressions): one printable row per scenario metric, and the failing ones."""
+    rows, regressions = [], []
+    for name, base in baseline['scenarios'].items():
+        current = candidate['scenarios'].get(name)
+        if current is None:
+            continue
+        metrics = [(f'latency {key} (ms)', base['latency_ms'][key], current['latency_ms'][key], key in GATED_LATENCY_KEYS, 1)
+                   for key in LATENCY_KEYS]
+        metrics.append(('throughput (req/s)', base['throughput_rps'], current['throughput_rps'], True, -1))
+        for label, before, after, gated, direction in metrics:
+            change = change_percent(before, after)
+            regressed = gated and change is not None and change * direction > threshold
+            rows.append((name, label, before, after, change, regressed))
+            if regressed:
+                regressions.append((name, label, change))
+        if current['errors'] > base['errors']:
+            rows.append((name, 'errors', base['errors'], current['errors'], None, True))
+            regressions.append((name, 'errors', None))
+    return rows, regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compare two benchmark reports.')
+    parser.add_argument('baseline')
+    parser.add_argument('candidate')
+    parser.add_argument('--threshold', type=float, default=10.0, help='allowed regression in percent (default 10)')
+    args = parser.parse_args(argv)
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+
+    rows, regressions = compare(baseline, candidate, args.threshold)
+    print(f"{'scenario':<14}{'metric':<22}{'baseline':>12}{'candidate':>12}{'change':>10}")
+    for name, label, before, after, change, regressed in rows:
+        change_text = '' if change is None else f'{change:+.1f}%'
+        print(f"{name:<14}{label:<22}{before!s:>12}{after!s:>12}{change_text:>10}{'  REGRESSION' if regressed else ''}")
+
+    if regressions:
+        print(f'\n{len(regressions)} regression(s) above {args.threshold}%')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
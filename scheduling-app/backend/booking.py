@@ -0,0 +1,436 @@
+import random
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+from flask import current_app
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+from models import Resource, Reservation, db
+from reservation_index import reservation_index
+from changes import record_change, record_series_change
+from archive import find_archived_conflict, load_archived_intervals
+from series import find_rule_conflict, find_series_conflict, new_series, occurrences_in_window, series_scope
+from outbox import enqueue_event
+
+# Name of the PostgreSQL exclusion constraint added by migration 8c2d4e6f1a93.
+NO_OVERLAP_CONSTRAINT = 'reservations_no_overlap'
+
+# SQLSTATEs PostgreSQL uses for serialization failures and deadlocks; both are safe to retry.
+RETRYABLE_PGCODES = ('40001', '40P01')
+
+
+class BookingError(Exception):
+    """Base class for errors raised by the booking engine."""
+
+
+class ResourceNotFound(BookingError):
+    pass
+
+
+class ReservationConflict(BookingError):
+    pass
+
+
+class StaleRead(BookingError):
+    """Another writer committed between our conflict check and our insert; the transaction is retried."""
+
+
+class ResourceLocks:
+    """
+    In-process locks keyed by resource id.
+
+    Bookings on the same resource are serialized inside this process, while bookings on
+    different resources proceed in parallel. Locks for several resources are always taken
+    in ascending id order so that multi-resource callers cannot deadlock each other.
+    """
+
+    def __init__(self):
+        self._guard = threading.Lock()
+        self._locks = {}
+
+    def _lock_for(self, resource_id):
+        with self._guard:
+            lock = self._locks.get(resource_id)
+            if lock is None:
+                lock = self._locks[resource_id] = threading.Lock()
+            return lock
+
+    @contextmanager
+    def hold(self, resource_ids):
+        locks = [self._lock_for(resource_id) for resource_id in sorted(set(resource_ids))]
+        acquired = []
+        try:
+            for lock in locks:
+                lock.acquire()
+                acquired.append(lock)
+            yield
+        finally:
+            for lock in reversed(acquired):
+                lock.release()
+
+
+resource_locks = ResourceLocks()
+
+
+def _is_postgresql():
+    return db.engine.dialect.name == 'postgresql'
+
+
+def _is_retryable(error):
+    if getattr(error.orig, 'pgcode', None) in RETRYABLE_PGCODES:
+        return True
+    message = str(error.orig).lower()
+    return 'database is locked' in message or 'database is busy' in message
+
+
+def _is_overlap_violation(error):
+    return NO_OVERLAP_CONSTRAINT in str(error.orig)
+
+
+def run_with_retry(operation):
+    """
+    Runs operation() in a fresh transaction, retrying with jittered backoff when the database
+    reports lock contention (SQLite "database is locked", PostgreSQL serialization failures).
+    """
+    attempts = current_app.config.get('BOOKING_MAX_ATTEMPTS', 5)
+    for attempt in range(1, attempts + 1):
+        try:
+            return operation()
+        except (OperationalError, StaleRead) as e:
+            db.session.rollback()
+            if attempt == attempts or (isinstance(e, OperationalError) and not _is_retryable(e)):
+                raise
+            time.sleep(random.uniform(0, 0.01 * 2 ** attempt))
+
+
+def lock_resources(resource_ids):
+    """
+    Loads the given resources inside the current transaction, keyed by id.
+    On PostgreSQL the rows are locked with SELECT ... FOR UPDATE (in id order), which
+    serializes bookers of the same resource across processes.
+    """
+    query = Resource.query.filter(Resource.id.in_(resource_ids)).order_by(Resource.id)
+    if _is_postgresql():
+        query = query.with_for_update()
+    return {resource.id: resource for resource in query.all()}
+
+
+def find_conflict(resource_id, start_time, end_time, exclude_ids=()):
+    """Returns an existing reservation id overlapping [start_time, end_time) on resource_id, or None."""
+    query = db.session.query(Reservation.id).filter(
+        Reservation.resource_id == resource_id,
+        Reservation.start_time < end_time,
+        Reservation.end_time > start_time
+    )
+    if exclude_ids:
+        query = query.filter(Reservation.id.notin_(exclude_ids))
+    row = query.first()
+    return row[0] if row else None
+
+
+def book(resource_id, start_time, end_time, description=None, use_index=False):
+    """
+    Creates a reservation, guaranteeing it does not overlap any other reservation on the resource.
+
+    Concurrent bookings stay correct in three layers:
+    - an in-process lock per resource serializes threads of this process;
+    - on PostgreSQL the resource row is locked FOR UPDATE, and the reservations_no_overlap
+      exclusion constraint backs it up;
+    - on SQLite the overlap check is repeated after the INSERT, when the transaction holds the
+      database write lock, so a booking committed by another process is always seen.
+      Lock contention is retried with backoff.
+
+    Returns (reservation, change_seq); raises ResourceNotFound or ReservationConflict.
+    """
+    with resource_locks.hold([resource_id]):
+        return run_with_retry(lambda: _book_locked(resource_id, start_time, end_time, description, use_index))
+
+
+def _book_locked(resource_id, start_time, end_time, description, use_index):
+    resource = lock_resources([resource_id]).get(resource_id)
+    if not resource:
+        db.session.rollback()
+        raise ResourceNotFound(resource_id)
+
+    if use_index:
+        conflict = reservation_index.find_conflict(resource.id, start_time, end_time)
+    else:
+        conflict = find_conflict(resource.id, start_time, end_time)
+    if conflict is None:
+        conflict = find_archived_conflict(resource.id, start_time, end_time)
+    if conflict is None:
+        conflict = find_series_conflict(resource.id, start_time, end_time)
+    if conflict is not None:
+        db.session.rollback()
+        raise ReservationConflict(conflict)
+
+    reservation = Reservation(
+        resource_id=resource.id,
+        start_time=start_time,
+        end_time=end_time,
+        description=description
+    )
+    db.session.add(reservation)
+    try:
+        db.session.flush()
+        if not _is_postgresql():
+            conflict = find_conflict(resource.id, start_time, end_time, exclude_ids=[reservation.id]) \
+                or find_series_conflict(resource.id, start_time, end_time)
+            if conflict is not None:
+                db.session.rollback()
+                raise ReservationConflict(conflict)
+        change = record_change('created', reservation)
+        db.session.flush()
+        enqueue_event('reservation_update', {'action': 'created', 'seq': change.seq, 'reservation': reservation.to_dict()},
+                      [(reservation.resource_id, reservation.start_time, reservation.end_time)])
+        db.session.commit()
+    except IntegrityError as e:
+        db.session.rollback()
+        if _is_overlap_violation(e):
+            raise ReservationConflict(None)
+        raise
+
+    reservation_index.add(reservation.id, reservation.resource_id, reservation.start_time,
+                          reservation.end_time, reservation.description)
+    return reservation, change.seq
+
+
+class BatchItem:
+    """One requested reservation of a batch, with its position in the request and its outcome."""
+
+    __slots__ = ('index', 'resource_id', 'start_time', 'end_time', 'description', 'status', 'error',
+                 'reservation', 'change_seq')
+
+    def __init__(self, index, resource_id, start_time, end_time, description=None):
+        self.index = index
+        self.resource_id = resource_id
+        self.start_time = start_time
+        self.end_time = end_time
+        self.description = description
+        self.status = None
+        self.error = None
+        self.reservation = None
+        self.change_seq = None
+
+    def reject(self, status, error):
+        self.status = status
+        self.error = error
+
+    def to_dict(self):
+        result = {'index': self.index, 'status': self.status}
+        if self.reservation is not None:
+            result['reservation'] = self.reservation.to_dict()
+        if self.error:
+            result['error'] = self.error
+        return result
+
+
+def load_window_intervals(resource_ids, start_time, end_time):
+    """
+    Returns {resource_id: [(start_time, end_time, id), ...]} for reservations overlapping
+    [start_time, end_time) on the given resources, sorted by start time, in a single query
+    (plus one on reservations_archive when the window reaches into the past, and one for
+    recurring series, whose occurrences are listed with a None id).
+    """
+    rows = db.session.query(Reservation.resource_id, Reservation.start_time, Reservation.end_time, Reservation.id) \
+        .filter(
+            Reservation.resource_id.in_(resource_ids),
+            Reservation.start_time < end_time,
+            Reservation.end_time > start_time
+        ).order_by(Reservation.resource_id, Reservation.start_time).all()
+    intervals = {}
+    for resource_id, start, end, reservation_id in rows:
+        intervals.setdefault(resource_id, []).append((start, end, reservation_id))
+    for resource_id, archived in load_archived_intervals(resource_ids, start_time, end_time).items():
+        intervals[resource_id] = sorted(archived + intervals.get(resource_id, []))
+    occurrences = {}
+    for resource_id, start, end, _ in occurrences_in_window(list(resource_ids), start_time, end_time):
+        occurrences.setdefault(resource_id, []).append((start, end, None))
+    for resource_id, expanded in occurrences.items():
+        intervals[resource_id] = sorted(expanded + intervals.get(resource_id, []), key=lambda interval: interval[:2])
+    return intervals
+
+
+def sweep_conflicts(items, existing):
+    """
+    Checks requested items against existing reservations and against each other, per resource.
+
+    items are BatchItems not yet rejected; existing maps resource_id to a start-sorted list of
+    disjoint (start_time, end_time, id) intervals. Both sides are walked in start order, so the
+    check is O((n + m) log n) for n requests and m existing reservations. When two requests
+    overlap, the earlier-starting one is kept. Returns the items that can be inserted.
+    """
+    by_resource = {}
+    for item in items:
+        by_resource.setdefault(item.resource_id, []).append(item)
+
+    accepted = []
+    for resource_id, requested in by_resource.items():
+        requested.sort(key=lambda item: (item.start_time, item.end_time))
+        booked = existing.get(resource_id, [])
+        position = 0
+        accepted_end = None
+        for item in requested:
+            while position < len(booked) and booked[position][1] <= item.start_time:
+                position += 1
+            if position < len(booked) and booked[position][0] < item.end_time:
+                item.reject('conflict', 'Time slot is already reserved or overlaps with an existing reservation')
+            elif accepted_end is not None and accepted_end > item.start_time:
+                item.reject('conflict', 'Overlaps with another reservation in the same batch')
+            else:
+                accepted.append(item)
+                accepted_end = item.end_time
+    return accepted
+
+
+def book_batch(items, atomic=True):
+    """
+    Books a list of BatchItems in one transaction with one bulk INSERT.
+
+    Conflicts are found with one windowed read of the affected resources and a sort-and-sweep
+    (see sweep_conflicts) instead of one query per item. In atomic mode nothing is written unless
+    every item can be booked; otherwise the bookable items are written and the rest are rejected.
+    Every item's status is filled in. Returns the created Reservation objects.
+    """
+    pending = [item for item in items if item.status is None]
+    if atomic and len(pending) != len(items):
+        for item in pending:
+            item.reject('skipped', 'Not booked because another item in the batch failed')
+        return []
+    if not pending:
+        return []
+
+    resource_ids = {item.resource_id for item in pending}
+    with resource_locks.hold(resource_ids):
+        return run_with_retry(lambda: _book_batch_locked(pending, atomic))
+
+
+def book_group(resource_ids, start_time, end_time, description=None):
+    """
+    Books every resource of resource_ids for the same window in one transaction, or none of them.
+
+    The resources are locked in ascending id order (in process and, on PostgreSQL, with
+    SELECT ... FOR UPDATE), so groups that share resources queue up instead of deadlocking, and
+    all of them are checked for conflicts with one windowed read. The reservations share a
+    group_id and are announced with a single group_created event.
+
+    Returns (group_id, items), one BatchItem per resource in request order; the group was booked
+    when every item has status 'created'.
+    """
+    items = [BatchItem(index, resource_id, start_time, end_time, description)
+             for index, resource_id in enumerate(resource_ids)]
+    group_id = uuid.uuid4().hex
+    with resource_locks.hold(resource_ids):
+        run_with_retry(lambda: _book_batch_locked(items, True, group_id))
+    return group_id, items
+
+
+def _book_batch_locked(items, atomic, group_id=None):
+    for item in items:
+        item.status = item.error = None
+
+    resources = lock_resources({item.resource_id for item in items})
+    candidates = []
+    for item in items:
+        if item.resource_id in resources:
+            candidates.append(item)
+        else:
+            item.reject('not_found', 'Resource not found')
+
+    window_start = min(item.start_time for item in candidates) if candidates else None
+    window_end = max(item.end_time for item in candidates) if candidates else None
+    if candidates:
+        existing = load_window_intervals(resources.keys(), window_start, window_end)
+        accepted = sweep_conflicts(candidates, existing)
+    else:
+        accepted = []
+
+    if not accepted or (atomic and len(accepted) != len(items)):
+        db.session.rollback()
+        for item in accepted:
+            item.reject('skipped', 'Not booked because another item in the batch failed')
+        return []
+
+    reservations = [
+        Reservation(resource_id=item.resource_id, start_time=item.start_time,
+                    end_time=item.end_time, description=item.description, group_id=group_id)
+        for item in accepted
+    ]
+    db.session.add_all(reservations)
+    try:
+        # The PostgreSQL exclusion constraint is not deferred: a concurrent overlap fails this flush.
+        db.session.flush()  # One executemany / multi-row INSERT for the whole batch
+
+        if not _is_postgresql():
+            # Under the write lock: any overlap now means another process booked meanwhile.
+            new_ids = {reservation.id for reservation in reservations}
+            committed = load_window_intervals(resources.keys(), window_start, window_end)
+            for intervals in committed.values():
+                for previous, current in zip(intervals, intervals[1:]):
+                    if current[0] < previous[1] and (previous[2] in new_ids or current[2] in new_ids):
+                        raise StaleRead()
+
+        changes = [record_change('created', reservation) for reservation in reservations]
+        db.session.flush()
+        # One coalesced event for the whole batch instead of one per reservation
+        payload = {'action': 'batch_created', 'first_seq': changes[0].seq, 'seq': changes[-1].seq,
+                   'reservations': [reservation.to_dict() for reservation in reservations]}
+        if group_id is not None:
+            payload.update(action='group_created', group_id=group_id)
+        enqueue_event('reservation_update', payload, [(r.resource_id, r.start_time, r.end_time) for r in reservations])
+        db.session.commit()
+    except IntegrityError as e:
+        db.session.rollback()
+        if _is_overlap_violation(e):
+            raise StaleRead()
+        raise
+
+    for item, reservation, change in zip(accepted, reservations, changes):
+        item.status = 'created'
+        item.reservation = reservation
+        item.change_seq = change.seq
+        reservation_index.add(reservation.id, reservation.resource_id, reservation.start_time,
+                              reservation.end_time, reservation.description)
+    return reservations
+
+
+def book_series(resource_id, rule, description=None, excluded=()):
+    """
+    Creates a recurring series (see series.Rule) on resource_id, guaranteeing that none of its
+    occurrences, except the excluded ones, overlaps a reservation or another series. Takes the
+    same locks as book(), so series and single bookings of a resource are serialized.
+
+    Returns (series, change_seq); raises ResourceNotFound or ReservationConflict.
+    """
+    with resource_locks.hold([resource_id]):
+        return run_with_retry(lambda: _book_series_locked(resource_id, rule, description, excluded))
+
+
+def _book_series_locked(resource_id, rule, description, excluded):
+    resource = lock_resources([resource_id]).get(resource_id)
+    if not resource:
+        db.session.rollback()
+        raise ResourceNotFound(resource_id)
+
+    conflict = find_rule_conflict(resource.id, rule, excluded)
+    if conflict is not None:
+        db.session.rollback()
+        raise ReservationConflict(conflict)
+
+    series = new_series(resource.id, rule, description, excluded)
+    db.session.add(series)
+    db.session.flush()
+    if not _is_postgresql():
+        # Repeated under the write lock, as in _book_locked.
+        conflict = find_rule_conflict(resource.id, rule, excluded, exclude_series_id=series.id)
+        if conflict is not None:
+            db.session.rollback()
+            raise ReservationConflict(conflict)
+    change = record_series_change('series_created', series)
+    db.session.flush()
+    enqueue_event('reservation_update', {'action': 'series_created', 'seq': change.seq, 'series': series.to_dict()},
+                  series_scope(series))
+    db.session.commit()
+    return series, change.seq
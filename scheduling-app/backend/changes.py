@@ -0,0 +1,97 @@
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import delete, func, select, text
+
+from models import ReservationChange, db
+
+# Arbitrary application-wide key for the PostgreSQL advisory lock that orders change-log writes.
+CHANGE_LOG_LOCK_KEY = 7_301_442
+
+
+def _lock_change_log():
+    if db.engine.dialect.name == 'postgresql':
+        db.session.execute(text('SELECT pg_advisory_xact_lock(:key)'), {'key': CHANGE_LOG_LOCK_KEY})
+
+
+def record_change(action, reservation):
+    """
+    Adds a change-log entry for reservation to the current transaction and returns it.
+    Call it right before committing the reservation write itself.
+
+    On PostgreSQL, sequence values are handed out in allocation order, not commit order, so a
+    transaction-scoped advisory lock is taken first: it is held only from here to COMMIT, and it
+    guarantees that a client reading `since=<seq>` can never miss a lower seq committed later.
+    SQLite already serializes writers.
+    """
+    _lock_change_log()
+    change = ReservationChange(
+        action=action,
+        reservation_id=reservation.id,
+        resource_id=reservation.resource_id,
+        start_time=reservation.start_time,
+        end_time=reservation.end_time,
+        description=reservation.description,
+        created_at=datetime.now(timezone.utc).replace(tzinfo=None)
+    )
+    db.session.add(change)
+    return change
+
+
+def record_series_change(action, series):
+    """
+    Like record_change, for a recurring series; the entry covers the series' first occurrence
+    and only tells clients to reload their window.
+    """
+    _lock_change_log()
+    change = ReservationChange(
+        action=action,
+        series_id=series.id,
+        resource_id=series.resource_id,
+        start_time=series.start_time,
+        end_time=series.start_time + timedelta(minutes=series.duration_minutes),
+        description=series.description,
+        created_at=datetime.now(timezone.utc).replace(tzinfo=None)
+    )
+    db.session.add(change)
+    return change
+
+
+def latest_seq():
+    """Returns the highest committed change seq, or 0 when nothing has changed yet."""
+    return db.session.query(func.max(ReservationChange.seq)).scalar() or 0
+
+
+def changes_since(since, limit):
+    """
+    Returns (changes, resync_required) for up to limit entries with seq > since, in seq order.
+    resync_required is True when entries after since have already been pruned, in which case
+    the client must reload the full state instead of applying deltas.
+    """
+    oldest = db.session.query(func.min(ReservationChange.seq)).scalar()
+    if oldest is not None and since < oldest - 1:
+        return [], True
+    changes = ReservationChange.query.filter(ReservationChange.seq > since) \
+        .order_by(ReservationChange.seq).limit(limit).all()
+    return changes, False
+
+
+def prune_changes(cutoff, batch_size=1000):
+    """
+    Deletes the change-log entries created before cutoff (naive UTC), oldest first and at most
+    batch_size per transaction, and returns how many were deleted. Only a prefix of the log is
+    removed, and never the newest entry, so latest_seq() keeps counting and changes_since()
+    tells clients whose `since` falls in the pruned range to resync.
+    """
+    bound = db.session.scalar(select(func.max(ReservationChange.seq)).where(ReservationChange.created_at < cutoff))
+    bound = min(bound or 0, latest_seq() - 1)
+    pruned = 0
+    while True:
+        seqs = db.session.scalars(select(ReservationChange.seq).where(ReservationChange.seq <= bound)
+                                  .order_by(ReservationChange.seq).limit(batch_size)).all()
+        if not seqs:
+            break
+        db.session.execute(delete(ReservationChange.__table__).where(ReservationChange.seq.in_(seqs)))
+        db.session.commit()
+        pruned += len(seqs)
+    db.session.rollback()
+    return pruned
@@ -0,0 +1,103 @@
+import zlib
+
+from flask import request
+
+from serialization import MSGPACK_MIMETYPE
+
+try:
+    import brotli
+except ImportError:  # Optional: without it, responses are gzipped only
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = ('application/json', MSGPACK_MIMETYPE)
+
+# Favour speed: bodies are compressed on every request, not once ahead of time
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+class _Gzip:
+    def __init__(self):
+        self._compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def chunk(self, data):
+        # Sync-flushed so that each streamed chunk reaches the client as soon as it is produced
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._compressor.flush()
+
+
+class _Brotli:
+    def __init__(self):
+        self._compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+
+    def chunk(self, data):
+        return self._compressor.process(data) + self._compressor.flush()
+
+    def finish(self):
+        return self._compressor.finish()
+
+
+CODINGS = {'gzip': _Gzip, 'br': _Brotli}
+
+
+def _compress_chunks(chunks, coding):
+    compressor = CODINGS[coding]()
+    for chunk in chunks:
+        data = compressor.chunk(chunk.encode() if isinstance(chunk, str) else chunk)
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+class ResponseCompressor:
+    """
+    Compresses JSON and MessagePack responses for clients that accept it: brotli when installed
+    and accepted, gzip otherwise. Bodies smaller than COMPRESSION_MIN_BYTES are sent as they are;
+    streamed bodies (the large listings) are compressed chunk by chunk as they are produced.
+    Compressed responses get a weak ETag, since their bytes differ from the identity encoding.
+    """
+
+    def __init__(self):
+        self.min_bytes = 1024
+
+    def init_app(self, app):
+        self.min_bytes = app.config.get('COMPRESSION_MIN_BYTES', 1024)
+        if self.min_bytes > 0:
+            app.after_request(self.compress)
+
+    def coding(self):
+        """The content coding to use for the current request, or None."""
+        accepted = request.accept_encodings
+        if brotli is not None and accepted['br']:
+            return 'br'
+        if accepted['gzip']:
+            return 'gzip'
+        return None
+
+    def compress(self, response):
+        if (response.status_code != 200 or response.direct_passthrough or request.method == 'HEAD'
+                or response.mimetype not in COMPRESSIBLE_MIMETYPES or 'Content-Encoding' in response.headers):
+            return response
+        response.vary.add('Accept-Encoding')
+        coding = self.coding()
+        if coding is None:
+            return response
+
+        if response.is_streamed:
+            response.response = _compress_chunks(response.response, coding)
+            response.headers.pop('Content-Length', None)
+        else:
+            body = response.get_data()
+            if len(body) < self.min_bytes:
+                return response
+            response.set_data(b''.join(_compress_chunks([body], coding)))
+        response.headers['Content-Encoding'] = coding
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
+
+
+response_compressor = ResponseCompressor()
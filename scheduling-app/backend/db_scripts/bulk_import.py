@@ -0,0 +1,268 @@
+"""
+Bulk loader for resources and reservations.
+
+Reads JSON Lines, CSV or a JSON array, and writes in chunks with one executemany INSERT and one
+commit per chunk. JSONL and CSV files are streamed, so memory use does not depend on file size.
+
+    python db_scripts/bulk_import.py resources resources.jsonl
+    python db_scripts/bulk_import.py reservations reservations.csv --rejects rejects.jsonl
+
+Resources are deduplicated by name, against the database with one IN (...) lookup per chunk and
+within the input itself. Reservations name their resource by `resource_id` or `resource_name`
+and give `start_time` plus `end_time` or `duration_minutes`. Rows that overlap an existing
+reservation, or an earlier row of the same import, are rejected rather than inserted.
+
+Imported reservations are not added to the change log, so connected clients only see them after
+a full reload. Meant for seeding and offline loads, not for use alongside live bookings.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from datetime import timedelta
+from itertools import islice
+
+# Add the parent directory (backend) to sys.path
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PARENT_DIR = os.path.dirname(SCRIPT_DIR)
+sys.path.append(PARENT_DIR)
+
+from sqlalchemy import insert, select
+
+from booking import BatchItem, load_window_intervals, sweep_conflicts
+from models import Reservation, Resource, db, parse_iso_datetime
+from slots import MAX_IN_CLAUSE
+
+CHUNK_SIZE = 5000
+FORMATS = ('jsonl', 'csv', 'json')
+
+
+class ImportReport:
+    """Counts for one import run, plus the rejected rows as (line, reason, record)."""
+
+    def __init__(self):
+        self.read = 0
+        self.inserted = 0
+        self.duplicates = 0
+        self.rejected = []
+
+    def reject(self, line, reason, record):
+        self.rejected.append((line, reason, record))
+
+    def to_dict(self):
+        return {'read': self.read, 'inserted': self.inserted, 'duplicates': self.duplicates,
+                'rejected': len(self.rejected)}
+
+
+def detect_format(path):
+    extension = os.path.splitext(path)[1].lower().lstrip('.')
+    if extension in ('jsonl', 'ndjson'):
+        return 'jsonl'
+    if extension in FORMATS:
+        return extension
+    raise ValueError(f'Cannot tell the format of {path}; pass --format')
+
+
+def read_records(path, fmt=None):
+    """Yields (line_number, dict) for each record of a JSONL, CSV or JSON array file."""
+    fmt = fmt or detect_format(path)
+    with open(path, newline='') as f:
+        if fmt == 'jsonl':
+            for line_number, line in enumerate(f, start=1):
+                if line.strip():
+                    yield line_number, json.loads(line)
+        elif fmt == 'csv':
+            # Header is line 1; empty cells are treated as missing values.
+            for line_number, row in enumerate(csv.DictReader(f), start=2):
+                yield line_number, {key: value for key, value in row.items() if value not in ('', None)}
+        elif fmt == 'json':
+            for index, record in enumerate(json.load(f), start=1):
+                yield index, record
+        else:
+            raise ValueError(f'Unknown format: {fmt}')
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _optional_int(value):
+    return None if value is None else int(value)
+
+
+def _in_batches(values):
+    values = list(values)
+    for start in range(0, len(values), MAX_IN_CLAUSE):
+        yield values[start:start + MAX_IN_CLAUSE]
+
+
+def import_resources(records, chunk_size=CHUNK_SIZE, report=None):
+    """Inserts resources whose name is not taken yet. records yields (line_number, dict)."""
+    report = report or ImportReport()
+    seen = set()
+    for chunk in chunked(records, chunk_size):
+        report.read += len(chunk)
+        rows = []
+        for line, record in chunk:
+            try:
+                name = str(record['name']).strip()
+                if not name:
+                    raise ValueError('name is empty')
+                row = {
+                    'name': name,
+                    'ip_address': record.get('ip_address'),
+                    'ssh_port': _optional_int(record.get('ssh_port')),
+                    'web_port': _optional_int(record.get('web_port')),
+                }
+            except (KeyError, TypeError, ValueError) as e:
+                report.reject(line, f'invalid: {e}', record)
+                continue
+            if name in seen:
+                report.duplicates += 1
+                continue
+            seen.add(name)
+            rows.append(row)
+
+        existing = set()
+        for names in _in_batches(row['name'] for row in rows):
+            existing.update(db.session.scalars(select(Resource.name).where(Resource.name.in_(names))))
+        rows = [row for row in rows if row['name'] not in existing]
+        report.duplicates += len(existing)
+        if rows:
+            db.session.execute(insert(Resource.__table__), rows)
+        db.session.commit()
+        report.inserted += len(rows)
+    return report
+
+
+def _resolve_resources(chunk_refs):
+    """Maps the resource ids and names referenced by a chunk to existing resource ids."""
+    ids, names = set(), set()
+    for key, value in chunk_refs:
+        (ids if key == 'id' else names).add(value)
+    found = {}
+    for batch in _in_batches(ids):
+        for resource_id in db.session.scalars(select(Resource.id).where(Resource.id.in_(batch))):
+            found[('id', resource_id)] = resource_id
+    for batch in _in_batches(names):
+        # Names are not unique in the schema; the oldest resource with the name wins.
+        rows = db.session.execute(select(Resource.name, Resource.id).where(Resource.name.in_(batch))
+                                  .order_by(Resource.id.desc()))
+        for name, resource_id in rows:
+            found[('name', name)] = resource_id
+    return found
+
+
+def _existing_intervals(resource_ids, window_start, window_end):
+    intervals = {}
+    for batch in _in_batches(sorted(resource_ids)):
+        intervals.update(load_window_intervals(batch, window_start, window_end))
+    return intervals
+
+
+def _parse_reservation(record):
+    if 'resource_id' in record:
+        ref = ('id', int(record['resource_id']))
+    elif 'resource_name' in record:
+        ref = ('name', str(record['resource_name']))
+    else:
+        raise ValueError('resource_id or resource_name is required')
+    start_time = parse_iso_datetime(record['start_time'])
+    if 'end_time' in record:
+        end_time = parse_iso_datetime(record['end_time'])
+    else:
+        end_time = start_time + timedelta(minutes=int(record['duration_minutes']))
+    if end_time <= start_time:
+        raise ValueError('end_time must be after start_time')
+    return ref, start_time, end_time, record.get('description')
+
+
+def import_reservations(records, chunk_size=CHUNK_SIZE, report=None):
+    """
+    Inserts reservations that fit. Each chunk costs one lookup of the referenced resources, one
+    windowed read of their reservations and a sort-and-sweep (booking.sweep_conflicts); rows
+    accepted by earlier chunks are committed, so later chunks are checked against them too.
+    Input sorted by resource and start time keeps the windowed reads small.
+    """
+    report = report or ImportReport()
+    for chunk in chunked(records, chunk_size):
+        report.read += len(chunk)
+        parsed = []
+        for line, record in chunk:
+            try:
+                parsed.append((line, record, *_parse_reservation(record)))
+            except (KeyError, TypeError, ValueError) as e:
+                report.reject(line, f'invalid: {e}', record)
+
+        resources = _resolve_resources(ref for _, _, ref, _, _, _ in parsed)
+        items, records_by_line = [], {}
+        for line, record, ref, start_time, end_time, description in parsed:
+            resource_id = resources.get(ref)
+            if resource_id is None:
+                report.reject(line, 'resource not found', record)
+                continue
+            items.append(BatchItem(line, resource_id, start_time, end_time, description))
+            records_by_line[line] = record
+
+        if items:
+            existing = _existing_intervals({item.resource_id for item in items},
+                                           min(item.start_time for item in items),
+                                           max(item.end_time for item in items))
+            accepted = sweep_conflicts(items, existing)
+            for item in items:
+                if item.status is not None:
+                    report.reject(item.index, item.error, records_by_line[item.index])
+            if accepted:
+                db.session.execute(insert(Reservation.__table__), [
+                    {'resource_id': item.resource_id, 'start_time': item.start_time,
+                     'end_time': item.end_time, 'description': item.description}
+                    for item in accepted
+                ])
+            report.inserted += len(accepted)
+        db.session.commit()
+    report.rejected.sort(key=lambda rejected: rejected[0])
+    return report
+
+
+IMPORTERS = {'resources': import_resources, 'reservations': import_reservations}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Bulk-load resources or reservations.')
+    parser.add_argument('kind', choices=sorted(IMPORTERS))
+    parser.add_argument('path')
+    parser.add_argument('--format', choices=FORMATS, help='input format (default: from the file extension)')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='rows per INSERT and commit')
+    parser.add_argument('--rejects', help='write rejected rows here as JSON Lines')
+    args = parser.parse_args(argv)
+
+    from app import app
+
+    started = time.perf_counter()
+    with app.app_context():
+        db.create_all()
+        report = IMPORTERS[args.kind](read_records(args.path, args.format), args.chunk_size)
+    elapsed = time.perf_counter() - started
+
+    if args.rejects:
+        with open(args.rejects, 'w') as f:
+            for line, reason, record in report.rejected:
+                f.write(json.dumps({'line': line, 'reason': reason, 'record': record}) + '\n')
+    else:
+        for line, reason, _ in report.rejected[:20]:
+            print(f'line {line}: {reason}', file=sys.stderr)
+    summary = report.to_dict()
+    print(f"{args.kind}: read {summary['read']}, inserted {summary['inserted']}, "
+          f"duplicates {summary['duplicates']}, rejected {summary['rejected']} in {elapsed:.1f}s")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
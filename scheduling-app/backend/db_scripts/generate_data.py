@@ -0,0 +1,134 @@
+"""
+Deterministic synthetic dataset generator for bulk_import.py.
+
+    python db_scripts/generate_data.py --resources 10000 --reservations 1000000 --out-dir /tmp/staging
+    python db_scripts/bulk_import.py resources /tmp/staging/resources.jsonl
+    python db_scripts/bulk_import.py reservations /tmp/staging/reservations.jsonl
+
+The same --seed always produces the same files. Resources get lab-style names, addresses and
+ports; reservations refer to them by name, start on quarter hours, mostly on weekday working
+hours, and never overlap on a resource. Rows are written sorted by resource and start time,
+which is the order bulk_import.py loads fastest.
+"""
+import argparse
+import csv
+import json
+import os
+import random
+import sys
+from datetime import datetime, timedelta
+
+SITES = ('ams', 'fra', 'lon', 'nyc', 'sfo', 'sin', 'tok')
+KINDS = ('rover', 'lander', 'telescope', 'sensor', 'router', 'switch', 'probe', 'gateway')
+PORTS = ((22, 80), (22, 443), (22, 8080), (2222, 443), (22, None), (None, 8443))
+DURATIONS = (30, 30, 60, 60, 60, 90, 120, 120, 240, 480)
+DESCRIPTIONS = (None, None, 'Firmware test', 'Regression run', 'Demo', 'Calibration',
+                'Integration test', 'Debugging session', 'Maintenance')
+
+DEFAULT_START = datetime(2025, 1, 1)
+QUARTER_HOUR = timedelta(minutes=15)
+
+
+def resource_name(index):
+    return f'{SITES[index % len(SITES)]}-{KINDS[index // len(SITES) % len(KINDS)]}-{index:06d}'
+
+
+def generate_resources(count, seed=42):
+    """Yields count resource dicts; names are unique and stable for a given index."""
+    rng = random.Random(seed)
+    for index in range(count):
+        ssh_port, web_port = rng.choice(PORTS)
+        yield {
+            'name': resource_name(index),
+            'ip_address': f'10.{index >> 16 & 255}.{index >> 8 & 255}.{index & 255}',
+            'ssh_port': ssh_port,
+            'web_port': web_port,
+        }
+
+
+def _working_hours(start, rng):
+    """Moves most off-hours starts to the next weekday morning, keeping some night/weekend use."""
+    if rng.random() < 0.15:
+        return start
+    if start.hour >= 18:
+        start = (start + timedelta(days=1)).replace(hour=8, minute=0)
+    elif start.hour < 8:
+        start = start.replace(hour=8, minute=0)
+    while start.weekday() >= 5:
+        start = (start + timedelta(days=1)).replace(hour=8, minute=0)
+    return start
+
+
+def generate_reservations(resources, count, start=DEFAULT_START, days=365, seed=42):
+    """
+    Yields count reservation dicts spread over the resources. Some resources are busier than
+    others; each one's reservations are laid out one after another with random gaps sized so
+    they roughly fill `days` days from `start`, so they cannot overlap.
+    """
+    rng = random.Random(seed)
+    weights = [rng.paretovariate(2.0) for _ in range(resources)]
+    total = sum(weights)
+    counts = [int(count * weight / total) for weight in weights]
+    for index in rng.sample(range(resources), count - sum(counts)) if resources else ():
+        counts[index] += 1
+
+    span = timedelta(days=days)
+    mean_duration = timedelta(minutes=sum(DURATIONS) / len(DURATIONS))
+    for index, per_resource in enumerate(counts):
+        if not per_resource:
+            continue
+        mean_gap = max(timedelta(0), span / per_resource - mean_duration)
+        cursor = start
+        name = resource_name(index)
+        for _ in range(per_resource):
+            gap = timedelta(seconds=rng.expovariate(1 / mean_gap.total_seconds())) if mean_gap else timedelta(0)
+            begin = _working_hours(cursor + gap, rng)
+            # Round up to the next quarter hour; never earlier than the previous end.
+            begin = begin + (-(begin - datetime.min) % QUARTER_HOUR)
+            end = begin + timedelta(minutes=rng.choice(DURATIONS))
+            yield {
+                'resource_name': name,
+                'start_time': begin.isoformat() + 'Z',
+                'end_time': end.isoformat() + 'Z',
+                'description': rng.choice(DESCRIPTIONS),
+            }
+            cursor = end
+
+
+def write_records(path, records, fields, fmt):
+    with open(path, 'w', newline='') as f:
+        if fmt == 'csv':
+            writer = csv.DictWriter(f, fieldnames=fields)
+            writer.writeheader()
+            writer.writerows(records)
+        else:
+            for record in records:
+                f.write(json.dumps(record, separators=(',', ':')) + '\n')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Generate a synthetic scheduling dataset.')
+    parser.add_argument('--resources', type=int, default=1000)
+    parser.add_argument('--reservations', type=int, default=100000)
+    parser.add_argument('--days', type=int, default=365, help='period the reservations cover')
+    parser.add_argument('--start', default=DEFAULT_START.date().isoformat(), help='first day (YYYY-MM-DD)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--format', choices=('jsonl', 'csv'), default='jsonl')
+    parser.add_argument('--out-dir', default='.')
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.out_dir, exist_ok=True)
+    resources_path = os.path.join(args.out_dir, f'resources.{args.format}')
+    reservations_path = os.path.join(args.out_dir, f'reservations.{args.format}')
+    write_records(resources_path, generate_resources(args.resources, args.seed),
+                  ('name', 'ip_address', 'ssh_port', 'web_port'), args.format)
+    write_records(reservations_path,
+                  generate_reservations(args.resources, args.reservations,
+                                        datetime.fromisoformat(args.start), args.days, args.seed),
+                  ('resource_name', 'start_time', 'end_time', 'description'), args.format)
+    print(f'Wrote {resources_path} and {reservations_path}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,117 @@
+import sqlite3
+from contextlib import contextmanager
+from functools import wraps
+
+import sqlalchemy as sa
+from flask import g, has_app_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+PROFILES = ('tuned', 'default')
+
+# Bind key of the read replica engine in SQLALCHEMY_BINDS
+READ_BIND = 'read'
+
+# PRAGMAs run on every new SQLite connection by the tuned profile (empty means SQLite defaults).
+sqlite_pragmas = {}
+
+
+def sqlite_pragmas_from_env(env):
+    """
+    WAL lets readers run while a writer commits; synchronous=NORMAL syncs the WAL at
+    checkpoints instead of on every commit (still safe against corruption, a power loss can undo
+    the last commits); busy_timeout makes writers wait for the lock instead of failing with
+    "database is locked"; cache_size and mmap_size keep hot pages in memory.
+    """
+    return {
+        'journal_mode': env.get('SQLITE_JOURNAL_MODE', 'WAL'),
+        'synchronous': env.get('SQLITE_SYNCHRONOUS', 'NORMAL'),
+        'busy_timeout': int(env.get('SQLITE_BUSY_TIMEOUT_MS', '5000')),
+        'cache_size': -int(env.get('SQLITE_CACHE_SIZE_KB', '65536')),  # negative means KiB
+        'mmap_size': int(env.get('SQLITE_MMAP_SIZE_MB', '256')) * 1024 * 1024,
+        'temp_store': 'MEMORY',
+    }
+
+
+def pool_options_from_env(env):
+    """Connection pool settings for server databases; sized per worker process."""
+    return {
+        'pool_size': int(env.get('DB_POOL_SIZE', '10')),
+        'max_overflow': int(env.get('DB_MAX_OVERFLOW', '20')),
+        'pool_timeout': int(env.get('DB_POOL_TIMEOUT', '30')),
+        'pool_recycle': int(env.get('DB_POOL_RECYCLE', '1800')),
+        'pool_pre_ping': env.get('DB_POOL_PRE_PING', 'true').lower() == 'true',
+    }
+
+
+def configure(app, env):
+    """
+    Fills in SQLALCHEMY_ENGINE_OPTIONS (and SQLALCHEMY_BINDS for a read replica) for the
+    DB_ENGINE_PROFILE chosen in env. Call before db.init_app(app).
+    """
+    profile = env.get('DB_ENGINE_PROFILE', 'tuned')
+    if profile not in PROFILES:
+        raise ValueError(f"DB_ENGINE_PROFILE must be one of {', '.join(PROFILES)}")
+    app.config['DB_ENGINE_PROFILE'] = profile
+    url = sa.engine.make_url(app.config['SQLALCHEMY_DATABASE_URI'])
+
+    sqlite_pragmas.clear()
+    options = {}
+    if profile == 'tuned':
+        if url.get_backend_name() == 'sqlite':
+            sqlite_pragmas.update(sqlite_pragmas_from_env(env))
+        else:
+            options = pool_options_from_env(env)
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+
+    read_url = env.get('DATABASE_READ_URL')
+    app.config['READ_REPLICA_ENABLED'] = bool(read_url)
+    if read_url:
+        app.config.setdefault('SQLALCHEMY_BINDS', {})[READ_BIND] = {'url': read_url, **options}
+
+
+@event.listens_for(Engine, 'connect')
+def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+    if not sqlite_pragmas or not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    for name, value in sqlite_pragmas.items():
+        cursor.execute(f'PRAGMA {name}={value}')
+    cursor.close()
+
+
+class RoutingSession(Session):
+    """
+    Sends SELECTs to the read replica inside views marked with @read_replica; everything else,
+    including any write or flush, goes to the primary.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (bind is None and not self._flushing and isinstance(clause, sa.Select)
+                and has_app_context() and g.get('read_replica') and READ_BIND in self._db.engines):
+            return self._db.engines[READ_BIND]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def read_replica(view):
+    """Routes the view's queries, including those of a streamed body, to DATABASE_READ_URL if set."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        g.read_replica = True
+        return view(*args, **kwargs)
+
+    return wrapper
+
+
+@contextmanager
+def primary_reads():
+    """Reads inside the block go to the primary even in a @read_replica view."""
+    previous = g.get('read_replica') if has_app_context() else None
+    if has_app_context():
+        g.read_replica = False
+    try:
+        yield
+    finally:
+        if has_app_context():
+            g.read_replica = previous
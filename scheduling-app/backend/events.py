@@ -0,0 +1,189 @@
+import threading
+import time
+from datetime import timedelta
+
+from flask import request
+from flask_socketio import join_room, leave_room, rooms
+
+from metrics import metrics
+from models import parse_iso_datetime
+from serialization import compact_event_payload
+
+# Clients that never subscribed receive every event, as before rooms existed.
+BROADCAST_ROOM = 'all'
+
+# Every client stays in this room, whatever it subscribed to; used for changes without a bounded
+# time span, such as open-ended recurring series.
+EVERYONE_ROOM = 'everyone'
+
+
+# Prefix of the rooms of clients that subscribed with `compact`: same rooms, compact payloads.
+COMPACT_PREFIX = 'compact:'
+
+
+def resource_room(resource_id):
+    return f'resource:{resource_id}'
+
+
+def day_room(day):
+    return f'day:{day.isoformat()}'
+
+
+def days_spanned(start_time, end_time):
+    """Yields the UTC dates touched by [start_time, end_time)."""
+    day = start_time.date()
+    last_day = (end_time - timedelta(microseconds=1)).date()
+    while day <= last_day:
+        yield day
+        day += timedelta(days=1)
+
+
+def rooms_for(scopes):
+    """
+    Returns the rooms interested in changes to the given (resource_id, start_time, end_time) scopes.
+    An end_time of None means the change may touch any day, and reaches every client.
+    """
+    targets = {BROADCAST_ROOM}
+    for resource_id, start_time, end_time in scopes:
+        if end_time is None:
+            return [EVERYONE_ROOM]
+        targets.add(resource_room(resource_id))
+        targets.update(day_room(day) for day in days_spanned(start_time, end_time))
+    return sorted(targets)
+
+
+class EventPublisher:
+    """
+    Sends reservation events to the Socket.IO rooms that care about them.
+
+    Clients subscribe to resource rooms (`resource:<id>`) and/or day rooms (`day:<YYYY-MM-DD>`,
+    UTC) with the `subscribe` event; clients that never subscribe stay in the broadcast room and
+    keep receiving everything. A client in several matching rooms receives an event once.
+
+    With SOCKETIO_COALESCE_MS > 0, events are buffered per room and flushed every that many
+    milliseconds: a room that got a single event receives it unchanged, a room that got several
+    receives one {'action': 'batch', 'events': [...]} event in publish order. A client in several
+    rooms may then see the same change in more than one batch; changes carry a seq, so clients
+    can ignore ones they already applied.
+
+    With SOCKETIO_COMPACT_EVENTS, clients that subscribe with `compact: true` join the
+    `compact:` twin of each room and receive reservations as columnar arrays with epoch-second
+    times (see serialization.compact_event_payload) instead of full Reservation dicts. Every
+    event is then emitted twice, once per form.
+    """
+
+    def __init__(self):
+        self.socketio = None
+        self.coalesce_seconds = 0
+        self.max_subscription_days = 31
+        self.compact_enabled = False
+        self._lock = threading.Lock()
+        self._buffers = {}          # (event, room) -> list of payloads, in publish order
+        self._flush_scheduled = False
+
+    def init_app(self, app, socketio):
+        self.socketio = socketio
+        self.coalesce_seconds = app.config.get('SOCKETIO_COALESCE_MS', 0) / 1000.0
+        self.max_subscription_days = app.config.get('SOCKETIO_MAX_SUBSCRIPTION_DAYS', 31)
+        self.compact_enabled = app.config.get('SOCKETIO_COMPACT_EVENTS', False)
+        socketio.on_event('connect', self._on_connect)
+        socketio.on_event('disconnect', self._on_disconnect)
+        socketio.on_event('subscribe', self._on_subscribe)
+
+    def _on_connect(self, auth=None):
+        join_room(EVERYONE_ROOM)
+        join_room(BROADCAST_ROOM)
+        metrics.socketio_clients.inc()
+
+    def _on_disconnect(self, *args):
+        metrics.socketio_clients.dec()
+
+    def _on_subscribe(self, data):
+        """
+        Replaces the caller's subscriptions. data may contain `resource_ids` (list of ints) and/or
+        a `start`/`end` window (ISO 8601); an empty subscription returns to the broadcast room.
+        With `compact: true`, events arrive in the compact form.
+        """
+        data = data or {}
+        try:
+            targets = [resource_room(int(resource_id)) for resource_id in data.get('resource_ids') or []]
+            if data.get('start') and data.get('end'):
+                start, end = parse_iso_datetime(data['start']), parse_iso_datetime(data['end'])
+                days = list(days_spanned(start, end))
+                if len(days) > self.max_subscription_days:
+                    raise ValueError(f'windows may span at most {self.max_subscription_days} days')
+                targets.extend(day_room(day) for day in days)
+        except (TypeError, ValueError) as e:
+            return {'error': f'Invalid subscription: {e}'}
+
+        prefix = COMPACT_PREFIX if data.get('compact') and self.compact_enabled else ''
+        wanted = {prefix + room for room in [EVERYONE_ROOM] + (targets or [BROADCAST_ROOM])}
+        for room in rooms():
+            if room != request.sid and room not in wanted:
+                leave_room(room)
+        for room in wanted:
+            join_room(room)
+        result = {'rooms': targets or [BROADCAST_ROOM]}
+        if 'compact' in data:
+            result['compact'] = bool(prefix)  # False when SOCKETIO_COMPACT_EVENTS is off
+        return result
+
+    def publish(self, event, payload, scopes):
+        """
+        Publishes payload right away to the rooms interested in scopes, a list of
+        (resource_id, start_time, end_time) tuples describing what changed. Events announcing a
+        database write go through the outbox instead (outbox.enqueue_event).
+        """
+        self.publish_to_rooms(event, payload, rooms_for(scopes))
+
+    def publish_to_rooms(self, event, payload, targets):
+        if self.socketio is None:
+            return
+        self._publish(event, payload, targets)
+        if self.compact_enabled:
+            self._publish(event, compact_event_payload(payload), [COMPACT_PREFIX + room for room in targets])
+
+    def _publish(self, event, payload, targets):
+        if self.coalesce_seconds <= 0:
+            self._emit(event, payload, targets)
+            return
+
+        with self._lock:
+            for room in targets:
+                self._buffers.setdefault((event, room), []).append(payload)
+            if self._flush_scheduled:
+                return
+            self._flush_scheduled = True
+        self.socketio.start_background_task(self._flush_later)
+
+    def _flush_later(self):
+        self.socketio.sleep(self.coalesce_seconds)
+        self.flush()
+
+    def flush(self):
+        """Emits everything buffered so far, one event per room."""
+        with self._lock:
+            buffers, self._buffers = self._buffers, {}
+            self._flush_scheduled = False
+        for (event, room), payloads in buffers.items():
+            if len(payloads) == 1:
+                self._emit(event, payloads[0], room)
+            else:
+                self._emit(event, coalesced_payload(payloads), room)
+
+    def _emit(self, event, payload, to):
+        started = time.perf_counter()
+        self.socketio.emit(event, payload, to=to)
+        metrics.record_emit(event, time.perf_counter() - started)
+
+
+def coalesced_payload(payloads):
+    payload = {'action': 'batch', 'events': payloads}
+    seqs = [seq for event in payloads for seq in (event.get('first_seq'), event.get('seq')) if seq is not None]
+    if seqs:
+        payload['first_seq'] = min(seqs)
+        payload['seq'] = max(seqs)
+    return payload
+
+
+event_publisher = EventPublisher()
@@ -0,0 +1,219 @@
+import asyncio
+import time
+from datetime import timedelta
+
+from sqlalchemy import bindparam, insert, select, update
+
+from archive import utcnow
+from events import event_publisher
+from models import Resource, ResourceStatus, db, isoformat_utc
+
+PORTS = ('ssh', 'web')
+
+
+async def probe_port(host, port, timeout):
+    """
+    Opens (and closes) a TCP connection to host:port.
+    Returns (reachable, latency_ms, error); error is None when reachable.
+    """
+    started = time.perf_counter()
+    try:
+        _, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+    except asyncio.TimeoutError:
+        return False, None, 'timeout'
+    except OSError as e:
+        return False, None, e.strerror or type(e).__name__
+    latency_ms = round((time.perf_counter() - started) * 1000, 1)
+    writer.close()
+    try:
+        await writer.wait_closed()
+    except OSError:
+        pass
+    return True, latency_ms, None
+
+
+async def probe_targets(targets, concurrency, timeout):
+    """
+    Probes every configured port of targets, a list of (resource_id, host, {port_name: port}),
+    with at most concurrency connections in flight. Returns {resource_id: {port_name: result}}
+    with probe_port results.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def probe(resource_id, name, host, port):
+        async with semaphore:
+            return resource_id, name, await probe_port(host, port, timeout)
+
+    results = {resource_id: {} for resource_id, _, _ in targets}
+    probes = [probe(resource_id, name, host, port)
+              for resource_id, host, ports in targets for name, port in ports.items()]
+    for resource_id, name, result in await asyncio.gather(*probes):
+        results[resource_id][name] = result
+    return results
+
+
+def probe_targets_of(resources):
+    """(resource_id, host, {port_name: port}) for the resources with an address and at least one port."""
+    targets = []
+    for resource_id, host, ssh_port, web_port in resources:
+        ports = {name: port for name, port in (('ssh', ssh_port), ('web', web_port)) if port}
+        if host and ports:
+            targets.append((resource_id, host, ports))
+    return targets
+
+
+def overall_status(ssh_reachable, web_reachable):
+    configured = [reachable for reachable in (ssh_reachable, web_reachable) if reachable is not None]
+    if not configured:
+        return 'unknown'
+    if all(configured):
+        return 'up'
+    return 'degraded' if any(configured) else 'down'
+
+
+def status_dict(resource_id, row, ttl, now):
+    """
+    API representation of a resource's status. Results older than ttl (or never probed)
+    are reported as 'unknown' with stale set, since the device may have changed since.
+    """
+    if row is None:
+        return {'resource_id': resource_id, 'status': 'unknown', 'stale': True, 'checked_at': None,
+                'changed_at': None, 'ssh': None, 'web': None, 'error': None}
+    stale = row.checked_at < now - ttl
+    return {
+        'resource_id': resource_id,
+        'status': 'unknown' if stale else overall_status(row.ssh_reachable, row.web_reachable),
+        'stale': stale,
+        'checked_at': isoformat_utc(row.checked_at),
+        'changed_at': isoformat_utc(row.changed_at),
+        'ssh': None if row.ssh_reachable is None else {'reachable': row.ssh_reachable, 'latency_ms': row.ssh_latency_ms},
+        'web': None if row.web_reachable is None else {'reachable': row.web_reachable, 'latency_ms': row.web_latency_ms},
+        'error': row.error
+    }
+
+
+def load_statuses(resource_ids, ttl):
+    """Returns status_dict for every resource (or those in resource_ids) in id order, in one query."""
+    query = select(Resource.id, ResourceStatus).outerjoin(ResourceStatus, ResourceStatus.resource_id == Resource.id)
+    if resource_ids is not None:
+        query = query.where(Resource.id.in_(resource_ids))
+    now = utcnow()
+    return [status_dict(resource_id, row, ttl, now)
+            for resource_id, row in db.session.execute(query.order_by(Resource.id))]
+
+
+class HealthProber:
+    """
+    Checks the SSH and web ports of every resource with an ip_address every
+    HEALTH_PROBE_INTERVAL_SECONDS, in a background task, with asyncio TCP connects:
+    up to HEALTH_PROBE_CONCURRENCY connections in flight, each given HEALTH_PROBE_TIMEOUT_MS.
+
+    A resource with a port down is probed less and less often: after n failed probes in a row
+    it waits interval * 2^(n-1), at most HEALTH_PROBE_MAX_BACKOFF_SECONDS, so a rack of powered-off
+    devices does not use up the connection budget every cycle.
+
+    Results go to the resource_status table, so every worker process can serve
+    /resources/status; changes in reachability are pushed to every Socket.IO client as a
+    resource_status event.
+    """
+
+    def __init__(self):
+        self.running = False
+        self._next_check = {}  # resource_id -> monotonic time of the next probe
+
+    def start(self, app, socketio):
+        if self.running or app.config.get('HEALTH_PROBE_INTERVAL_SECONDS', 0) <= 0:
+            return
+        self.running = True
+        socketio.start_background_task(self._run, app, socketio)
+
+    def _run(self, app, socketio):
+        while self.running:
+            with app.app_context():
+                try:
+                    self.run_cycle(app.config)
+                except Exception:
+                    app.logger.exception('Resource health probe failed')
+                finally:
+                    db.session.remove()
+            socketio.sleep(app.config['HEALTH_PROBE_INTERVAL_SECONDS'])
+
+    def stop(self):
+        self.running = False
+
+    def backoff_seconds(self, failures, config):
+        """Seconds until the next probe of a resource after failures failed probes in a row."""
+        interval = config['HEALTH_PROBE_INTERVAL_SECONDS']
+        if failures <= 1:
+            return interval
+        return min(interval * 2 ** (failures - 1), max(interval, config['HEALTH_PROBE_MAX_BACKOFF_SECONDS']))
+
+    def run_cycle(self, config, now=None):
+        """
+        Probes the resources that are due, stores the results and publishes the changes.
+        Returns the status dicts of the resources whose reachability changed.
+        """
+        now = time.monotonic() if now is None else now
+        resources = db.session.execute(
+            select(Resource.id, Resource.ip_address, Resource.ssh_port, Resource.web_port).order_by(Resource.id))
+        due = [target for target in probe_targets_of(resources) if self._next_check.get(target[0], 0) <= now]
+        if not due:
+            return []
+
+        results = asyncio.run(probe_targets(due, config['HEALTH_PROBE_CONCURRENCY'],
+                                            config['HEALTH_PROBE_TIMEOUT_MS'] / 1000.0))
+        changed_ids, failures = self._store(results)
+        for resource_id, count in failures.items():
+            self._next_check[resource_id] = now + self.backoff_seconds(count, config)
+
+        if not changed_ids:
+            return []
+        changed = load_statuses(changed_ids, timedelta(seconds=config['HEALTH_STATUS_TTL_SECONDS']))
+        if changed:
+            event_publisher.publish('resource_status', {'statuses': changed},
+                                    [(status['resource_id'], None, None) for status in changed])
+        return changed
+
+    def _store(self, results):
+        """
+        Writes results to resource_status, with one executemany each for updates and inserts.
+        Returns (ids whose reachability changed, {resource_id: consecutive failures}).
+        """
+        checked_at = utcnow()
+        existing = {row.resource_id: row for row in db.session.scalars(
+            select(ResourceStatus).where(ResourceStatus.resource_id.in_(list(results))))}
+        inserts, updates, changed_ids, failures = [], [], [], {}
+        for resource_id, ports in results.items():
+            values = {'checked_at': checked_at}
+            errors = []
+            for name in PORTS:
+                reachable, latency_ms, error = ports.get(name, (None, None, None))
+                values[f'{name}_reachable'] = reachable
+                values[f'{name}_latency_ms'] = latency_ms
+                if error:
+                    errors.append(f'{name}: {error}')
+            values['error'] = '; '.join(errors)[:200] or None
+            row = existing.get(resource_id)
+            down = any(reachable is False for reachable, _, _ in ports.values())
+            values['failures'] = ((row.failures if row else 0) + 1) if down else 0
+            failures[resource_id] = values['failures']
+            if row is None or (row.ssh_reachable, row.web_reachable) != (values['ssh_reachable'], values['web_reachable']):
+                values['changed_at'] = checked_at
+                changed_ids.append(resource_id)
+            else:
+                values['changed_at'] = row.changed_at
+            if row is None:
+                inserts.append({'resource_id': resource_id, **values})
+            else:
+                updates.append({'target_id': resource_id, **values})
+
+        if inserts:
+            db.session.execute(insert(ResourceStatus.__table__), inserts)
+        if updates:
+            table = ResourceStatus.__table__
+            db.session.execute(update(table).where(table.c.resource_id == bindparam('target_id')), updates)
+        db.session.commit()
+        return changed_ids, failures
+
+
+health_prober = HealthProber()
@@ -0,0 +1,169 @@
+import heapq
+import threading
+from datetime import timedelta
+
+from sqlalchemy import and_, or_, select
+
+from archive import utcnow
+from events import event_publisher
+from models import Reservation, db, isoformat_utc, parse_iso_datetime, reservation_dict
+from series import occurrence_dict, occurrences_in_window
+
+# At the same instant, a reservation ending is announced before the next one starting
+ENDED, STARTED = 0, 1
+EVENT_NAMES = {ENDED: 'reservation_ended', STARTED: 'reservation_started'}
+
+
+def reservation_key(reservation):
+    """The id of a reservation dict, or "<series_id>@<start_time>" for an occurrence of a series."""
+    if reservation.get('id') is not None:
+        return reservation['id']
+    return f"{reservation['series_id']}@{reservation['start_time']}"
+
+
+class LifecycleScheduler:
+    """
+    Emits reservation_started and reservation_ended Socket.IO events when reservations (and
+    occurrences of series) start and end.
+
+    Upcoming boundaries live in a heap ordered by time, loaded from the database one horizon
+    (LIFECYCLE_HORIZON_MINUTES) at a time with two index range scans, on start_time and on
+    end_time. The background task sleeps until the earliest boundary or the end of the horizon,
+    whichever comes first; it never polls the table. Writes reach it through the outbox (see
+    on_event), so a booking, cancellation or early release inside the horizon moves its
+    boundaries right away. Heap entries are not removed when a reservation changes: each
+    boundary is checked against the reservation's current times when it comes up.
+
+    Runs in the background jobs' process, which is also the one draining the outbox. Boundaries
+    that passed while no process was running are not announced afterwards.
+    """
+
+    def __init__(self):
+        self.running = False
+        self._lock = threading.RLock()
+        self._wake = threading.Event()
+        self._heap = []             # (time, ENDED or STARTED, key)
+        self._reservations = {}     # key -> (resource_id, start_time, end_time, reservation dict)
+        self._loaded_until = None   # Boundaries before this are in the heap
+        self._fired_until = None    # Boundaries up to this have been announced
+        self._reload = False
+
+    def start(self, app, socketio):
+        if self.running or app.config.get('LIFECYCLE_HORIZON_MINUTES', 0) <= 0:
+            return
+        self.running = True
+        socketio.start_background_task(self._run, app)
+
+    def _run(self, app):
+        while self.running:
+            self._wake.clear()
+            with app.app_context():
+                try:
+                    _, timeout = self.run_due(app.config)
+                except Exception:
+                    app.logger.exception('Reservation lifecycle events failed')
+                    timeout = 5
+                finally:
+                    db.session.remove()
+            self._wake.wait(timeout)
+
+    def stop(self):
+        self.running = False
+        self._wake.set()
+        with self._lock:
+            self._heap, self._reservations = [], {}
+            self._loaded_until = self._fired_until = None
+
+    def run_due(self, config, now=None):
+        """
+        Announces the boundaries up to now, loading the next horizon when needed. Returns
+        (announced [(event name, reservation dict)], seconds until the next boundary or the
+        end of the horizon).
+        """
+        now = utcnow() if now is None else now
+        horizon = timedelta(minutes=config['LIFECYCLE_HORIZON_MINUTES'])
+        with self._lock:
+            if self._loaded_until is None:
+                self._fired_until = now
+                self._load(now, now + horizon)
+            elif self._reload:  # A series changed: its occurrences are easier to reload than to patch
+                self._heap, self._reservations = [], {}
+                self._load(self._fired_until + timedelta(microseconds=1), max(self._loaded_until, now + horizon))
+            elif now >= self._loaded_until:
+                self._load(self._loaded_until, now + horizon)
+            announced = self._fire(now)
+            next_time = min(self._heap[0][0], self._loaded_until) if self._heap else self._loaded_until
+        return announced, max((next_time - now).total_seconds(), 0)
+
+    def _load(self, start, end):
+        """Adds the boundaries in [start, end)."""
+        rows = db.session.execute(
+            select(Reservation.id, Reservation.resource_id, Reservation.start_time, Reservation.end_time,
+                   Reservation.description)
+            .where(or_(and_(Reservation.start_time >= start, Reservation.start_time < end),
+                       and_(Reservation.end_time >= start, Reservation.end_time < end)))
+        )
+        for reservation_id, resource_id, start_time, end_time, description in rows:
+            self._track(reservation_id, resource_id, start_time, end_time,
+                        reservation_dict(reservation_id, resource_id, start_time, end_time, description), start, end)
+        for resource_id, start_time, end_time, series in occurrences_in_window(None, start, end):
+            data = occurrence_dict(resource_id, start_time, end_time, series)
+            self._track(reservation_key(data), resource_id, start_time, end_time, data, start, end)
+        self._loaded_until = end
+        self._reload = False
+
+    def _track(self, key, resource_id, start_time, end_time, data, lo, hi):
+        """Pushes the boundaries of a reservation that fall in [lo, hi)."""
+        pushed = False
+        if lo <= start_time < hi:
+            heapq.heappush(self._heap, (start_time, STARTED, key))
+            pushed = True
+        if lo <= end_time < hi:
+            heapq.heappush(self._heap, (end_time, ENDED, key))
+            pushed = True
+        if pushed:
+            self._reservations[key] = (resource_id, start_time, end_time, data)
+        else:
+            self._reservations.pop(key, None)
+
+    def _fire(self, now):
+        announced = []
+        while self._heap and self._heap[0][0] <= now:
+            time, kind, key = heapq.heappop(self._heap)
+            tracked = self._reservations.get(key)
+            if tracked is None or tracked[2 if kind == ENDED else 1] != time:
+                continue  # Cancelled or moved since it was pushed
+            resource_id, start_time, end_time, data = tracked
+            if kind == ENDED:
+                del self._reservations[key]
+            event_publisher.publish(EVENT_NAMES[kind], {'reservation': data, 'at': isoformat_utc(time)},
+                                    [(resource_id, start_time, end_time)])
+            announced.append((EVENT_NAMES[kind], data))
+        self._fired_until = max(self._fired_until, now)
+        return announced
+
+    def on_event(self, event, payload):
+        """Outbox listener: applies an emitted reservation_update to the loaded horizon."""
+        if event != 'reservation_update':
+            return
+        with self._lock:
+            if self._loaded_until is None:
+                return
+            action = payload.get('action')
+            if action == 'deleted':
+                self._reservations.pop(reservation_key(payload['reservation']), None)
+            elif action in ('created', 'released', 'batch_created', 'group_created'):
+                for data in payload.get('reservations') or [payload['reservation']]:
+                    start_time, end_time = parse_iso_datetime(data['start_time']), parse_iso_datetime(data['end_time'])
+                    # Only boundaries still ahead, except that a released reservation always gets its end
+                    lo = min(self._fired_until, end_time) if action == 'released' else self._fired_until
+                    self._track(reservation_key(data), data['resource_id'], start_time, end_time, data,
+                                lo, self._loaded_until)
+            elif action.startswith('series_'):
+                self._reload = True
+            else:
+                return
+        self._wake.set()
+
+
+lifecycle_scheduler = LifecycleScheduler()
@@ -0,0 +1,253 @@
+import threading
+import time
+from bisect import bisect_left
+
+from flask import Response, current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250, 1000)
+
+# Longest SQL text kept per statement in the slow-request log
+MAX_STATEMENT_CHARS = 500
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=''):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """A named family of series keyed by label values; subclasses define how samples are kept."""
+
+    kind = None
+
+    def __init__(self, name, help_text, label_names=()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} {self.kind}']
+        with self._lock:
+            series = sorted(self._series.items())
+            lines.extend(self._render_series(labels, value) for labels, value in series)
+        return '\n'.join(line for line in lines if line)
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._series[labels] = self._series.get(labels, 0) + amount
+
+    def value(self, *labels):
+        return self._series.get(labels, 0)
+
+    def _render_series(self, labels, value):
+        return f'{self.name}{_labels(self.label_names, labels)} {_number(value)}'
+
+
+class Gauge(Counter):
+    kind = 'gauge'
+
+    def dec(self, *labels, amount=1):
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram(Metric):
+    """Cumulative-bucket histogram in the Prometheus layout (per-bucket counts, sum and count)."""
+
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, label_names=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help_text, label_names)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, *labels):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][bisect_left(self.buckets, value)] += 1
+            series[1] += value
+            series[2] += 1
+
+    def count(self, *labels):
+        series = self._series.get(labels)
+        return series[2] if series else 0
+
+    def _render_series(self, labels, series):
+        counts, total, count = series
+        lines = []
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+            cumulative += bucket_count
+            le = '+Inf' if bound == float('inf') else _number(bound)
+            bucket_labels = _labels(self.label_names, labels, f'le="{le}"')
+            lines.append(f'{self.name}_bucket{bucket_labels} {cumulative}')
+        lines.append(f'{self.name}_sum{_labels(self.label_names, labels)} {_number(total)}')
+        lines.append(f'{self.name}_count{_labels(self.label_names, labels)} {count}')
+        return '\n'.join(lines)
+
+
+class Metrics:
+    """
+    Process-wide registry of the request, SQL and Socket.IO metrics served on GET /metrics.
+
+    Requests are labelled by URL rule (`/reservations/<int:reservation_id>`), not by path, so the
+    number of series stays bounded. Each worker process keeps its own numbers; scrape every worker.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.slow_request_seconds = 0
+        self.slow_request_max_statements = 50
+        self.request_duration = Histogram(
+            'http_request_duration_seconds', 'Time spent serving HTTP requests, including streamed bodies.',
+            ('method', 'endpoint', 'status'))
+        self.request_queries = Histogram(
+            'http_request_sql_queries', 'SQL statements executed per HTTP request.',
+            ('method', 'endpoint'), QUERY_COUNT_BUCKETS)
+        self.request_sql_duration = Histogram(
+            'http_request_sql_duration_seconds', 'Time spent in SQL per HTTP request.', ('method', 'endpoint'))
+        self.sql_queries = Counter('sql_queries_total', 'SQL statements executed, inside or outside requests.')
+        self.sql_duration = Counter('sql_query_duration_seconds_total', 'Time spent executing SQL statements.')
+        self.socketio_emits = Counter('socketio_emits_total', 'Socket.IO events emitted.', ('event',))
+        self.socketio_emit_duration = Histogram(
+            'socketio_emit_duration_seconds', 'Time spent handing a Socket.IO event to the server or queue.',
+            ('event',))
+        self.socketio_clients = Gauge('socketio_connected_clients', 'Socket.IO clients connected to this process.')
+        self.outbox_dispatched = Counter('outbox_events_dispatched_total', 'Outbox events emitted by this process.')
+        self.outbox_failures = Counter('outbox_emit_failures_total', 'Outbox events whose emit failed (and was retried).')
+        self.outbox_lag = Histogram('outbox_dispatch_lag_seconds', 'Time from writing an outbox event to emitting it.')
+        self.resource_cache_lookups = Counter(
+            'resource_cache_lookups_total', 'Resource cache lookups, by result (hit or miss).', ('result',))
+        self.all = (self.request_duration, self.request_queries, self.request_sql_duration, self.sql_queries,
+                    self.sql_duration, self.socketio_emits, self.socketio_emit_duration, self.socketio_clients,
+                    self.outbox_dispatched, self.outbox_failures, self.outbox_lag, self.resource_cache_lookups)
+
+    def init_app(self, app):
+        self.enabled = app.config.get('METRICS_ENABLED', True)
+        self.slow_request_seconds = app.config.get('SLOW_REQUEST_MS', 0) / 1000.0
+        self.slow_request_max_statements = app.config.get('SLOW_REQUEST_MAX_STATEMENTS', 50)
+        if not self.enabled:
+            return
+        app.before_request(self._start_request)
+        app.after_request(self._note_status)
+        # teardown runs after a streamed body has been sent, so streaming time is included.
+        app.teardown_request(self._finish_request)
+        app.add_url_rule('/metrics', 'metrics', self.metrics_view)
+
+    def reset(self):
+        for metric in self.all:
+            metric.clear()
+
+    def render(self):
+        return '\n'.join(metric.render() for metric in self.all) + '\n'
+
+    def metrics_view(self):
+        """
+        Prometheus metrics for this process
+        ---
+        tags:
+          - Monitoring
+        produces:
+          - text/plain
+        responses:
+          200:
+            description: Metrics in the Prometheus text exposition format.
+        """
+        return Response(self.render(), mimetype='text/plain; version=0.0.4')
+
+    def _start_request(self):
+        g.metrics_started = time.perf_counter()
+        g.metrics_sql = [0, 0.0]
+        g.metrics_statements = [] if self.slow_request_seconds > 0 else None
+
+    def _note_status(self, response):
+        g.metrics_status = response.status_code
+        return response
+
+    def _finish_request(self, exc=None):
+        started = g.pop('metrics_started', None)
+        if started is None or request.endpoint == 'metrics':
+            return
+        elapsed = time.perf_counter() - started
+        endpoint = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        status = g.get('metrics_status', 500)
+        query_count, sql_seconds = g.metrics_sql
+        self.request_duration.observe(elapsed, request.method, endpoint, str(status))
+        self.request_queries.observe(query_count, request.method, endpoint)
+        self.request_sql_duration.observe(sql_seconds, request.method, endpoint)
+
+        if self.slow_request_seconds > 0 and elapsed >= self.slow_request_seconds:
+            statements = g.metrics_statements
+            details = '\n'.join(f'  {seconds * 1000:.1f} ms  {sql}' for sql, seconds in statements)
+            if query_count > len(statements):
+                details += f'\n  ... {query_count - len(statements)} more'
+            current_app.logger.warning(
+                'Slow request: %s %s -> %s in %.1f ms, %d SQL statements (%.1f ms)\n%s',
+                request.method, request.full_path.rstrip('?'), status, elapsed * 1000,
+                query_count, sql_seconds * 1000, details
+            )
+
+    def record_query(self, statement, seconds):
+        self.sql_queries.inc()
+        self.sql_duration.inc(amount=seconds)
+        if not has_request_context() or 'metrics_sql' not in g:
+            return
+        totals = g.metrics_sql
+        totals[0] += 1
+        totals[1] += seconds
+        statements = g.metrics_statements
+        if statements is not None and len(statements) < self.slow_request_max_statements:
+            statements.append((' '.join(statement.split())[:MAX_STATEMENT_CHARS], seconds))
+
+    def record_emit(self, event_name, seconds):
+        self.socketio_emits.inc(event_name)
+        self.socketio_emit_duration.observe(seconds, event_name)
+
+
+metrics = Metrics()
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('metrics_query_start', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info['metrics_query_start'].pop()
+    if metrics.enabled:
+        metrics.record_query(statement, time.perf_counter() - started)
+
+
+@event.listens_for(Engine, 'handle_error')
+def _failed_cursor_execute(exception_context):
+    # after_cursor_execute is skipped for failed statements; failures still count as queries.
+    connection = exception_context.connection
+    starts = connection.info.get('metrics_query_start') if connection is not None else None
+    if starts and exception_context.statement is not None:
+        started = starts.pop()
+        if metrics.enabled:
+            metrics.record_query(exception_context.statement, time.perf_counter() - started)
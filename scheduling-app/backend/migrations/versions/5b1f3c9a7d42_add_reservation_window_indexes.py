@@ -0,0 +1,28 @@
+"""Add reservation window indexes
+
+Revision ID: 5b1f3c9a7d42
+Revises: 2226b2807ed7
+Create Date: 2026-10-18 09:12:41.318220
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5b1f3c9a7d42'
+down_revision = '2226b2807ed7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('reservations', schema=None) as batch_op:
+        batch_op.create_index('ix_reservations_resource_window', ['resource_id', 'start_time', 'end_time'], unique=False)
+        batch_op.create_index('ix_reservations_end_time', ['end_time'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('reservations', schema=None) as batch_op:
+        batch_op.drop_index('ix_reservations_end_time')
+        batch_op.drop_index('ix_reservations_resource_window')
@@ -0,0 +1,34 @@
+"""Add reservation no-overlap exclusion constraint (PostgreSQL only)
+
+Revision ID: 8c2d4e6f1a93
+Revises: 5b1f3c9a7d42
+Create Date: 2026-10-18 11:40:03.502117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8c2d4e6f1a93'
+down_revision = '5b1f3c9a7d42'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Range exclusion constraints are PostgreSQL-specific; other databases rely on the
+    # booking engine's locking and re-check (see booking.py).
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute('CREATE EXTENSION IF NOT EXISTS btree_gist')
+    op.execute(
+        'ALTER TABLE reservations ADD CONSTRAINT reservations_no_overlap '
+        'EXCLUDE USING gist (resource_id WITH =, tsrange(start_time, end_time) WITH &&)'
+    )
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute('ALTER TABLE reservations DROP CONSTRAINT IF EXISTS reservations_no_overlap')
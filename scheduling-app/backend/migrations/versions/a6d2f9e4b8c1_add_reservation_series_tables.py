@@ -0,0 +1,64 @@
+"""Add reservation_series tables and series changes
+
+Revision ID: a6d2f9e4b8c1
+Revises: f3a8c61d2e47
+Create Date: 2026-10-18 18:21:47.905113
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a6d2f9e4b8c1'
+down_revision = 'f3a8c61d2e47'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('reservation_series',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('resource_id', sa.Integer(), nullable=False),
+    sa.Column('start_time', sa.DateTime(), nullable=False),
+    sa.Column('duration_minutes', sa.Integer(), nullable=False),
+    sa.Column('freq', sa.String(length=10), nullable=False),
+    sa.Column('interval', sa.Integer(), nullable=False),
+    sa.Column('by_weekday', sa.String(length=20), nullable=True),
+    sa.Column('until', sa.DateTime(), nullable=True),
+    sa.Column('count', sa.Integer(), nullable=True),
+    sa.Column('last_end', sa.DateTime(), nullable=True),
+    sa.Column('description', sa.String(length=200), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['resource_id'], ['resources.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('reservation_series', schema=None) as batch_op:
+        batch_op.create_index('ix_reservation_series_resource_span', ['resource_id', 'start_time', 'last_end'], unique=False)
+
+    op.create_table('reservation_series_exceptions',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('series_id', sa.Integer(), nullable=False),
+    sa.Column('occurrence_start', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['series_id'], ['reservation_series.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('series_id', 'occurrence_start', name='uq_reservation_series_exception')
+    )
+
+    # The SQLite table copy must keep AUTOINCREMENT so seq values are never reused.
+    with op.batch_alter_table('reservation_changes', schema=None, table_kwargs={'sqlite_autoincrement': True}) as batch_op:
+        batch_op.alter_column('reservation_id', existing_type=sa.Integer(), nullable=True)
+        batch_op.add_column(sa.Column('series_id', sa.Integer(), nullable=True))
+
+
+def downgrade():
+    op.execute('DELETE FROM reservation_changes WHERE series_id IS NOT NULL')
+    with op.batch_alter_table('reservation_changes', schema=None, table_kwargs={'sqlite_autoincrement': True}) as batch_op:
+        batch_op.drop_column('series_id')
+        batch_op.alter_column('reservation_id', existing_type=sa.Integer(), nullable=False)
+
+    op.drop_table('reservation_series_exceptions')
+    with op.batch_alter_table('reservation_series', schema=None) as batch_op:
+        batch_op.drop_index('ix_reservation_series_resource_span')
+
+    op.drop_table('reservation_series')
@@ -0,0 +1,36 @@
+"""Add resource_status table
+
+Revision ID: b7e31c5a9f20
+Revises: a6d2f9e4b8c1
+Create Date: 2026-10-18 19:42:08.551930
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7e31c5a9f20'
+down_revision = 'a6d2f9e4b8c1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('resource_status',
+    sa.Column('resource_id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('ssh_reachable', sa.Boolean(), nullable=True),
+    sa.Column('ssh_latency_ms', sa.Float(), nullable=True),
+    sa.Column('web_reachable', sa.Boolean(), nullable=True),
+    sa.Column('web_latency_ms', sa.Float(), nullable=True),
+    sa.Column('error', sa.String(length=200), nullable=True),
+    sa.Column('failures', sa.Integer(), nullable=False),
+    sa.Column('checked_at', sa.DateTime(), nullable=False),
+    sa.Column('changed_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['resource_id'], ['resources.id'], ),
+    sa.PrimaryKeyConstraint('resource_id')
+    )
+
+
+def downgrade():
+    op.drop_table('resource_status')
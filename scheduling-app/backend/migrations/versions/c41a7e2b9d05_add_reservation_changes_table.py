@@ -0,0 +1,35 @@
+"""Add reservation_changes table
+
+Revision ID: c41a7e2b9d05
+Revises: 8c2d4e6f1a93
+Create Date: 2026-10-18 13:05:27.114503
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c41a7e2b9d05'
+down_revision = '8c2d4e6f1a93'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('reservation_changes',
+    sa.Column('seq', sa.Integer(), nullable=False),
+    sa.Column('action', sa.String(length=20), nullable=False),
+    sa.Column('reservation_id', sa.Integer(), nullable=False),
+    sa.Column('resource_id', sa.Integer(), nullable=False),
+    sa.Column('start_time', sa.DateTime(), nullable=False),
+    sa.Column('end_time', sa.DateTime(), nullable=False),
+    sa.Column('description', sa.String(length=200), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('seq'),
+    sqlite_autoincrement=True
+    )
+
+
+def downgrade():
+    op.drop_table('reservation_changes')
@@ -0,0 +1,27 @@
+"""Add lower(name) and lower(ip_address) indexes on resources
+
+Revision ID: c8f4a2d6e1b3
+Revises: b7e31c5a9f20
+Create Date: 2026-10-18 20:31:12.118406
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c8f4a2d6e1b3'
+down_revision = 'b7e31c5a9f20'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Expression indexes are created directly: batch mode cannot recreate them on SQLite.
+    op.create_index('ix_resources_name_lower', 'resources', [sa.text('lower(name)')], unique=False)
+    op.create_index('ix_resources_ip_address_lower', 'resources', [sa.text('lower(ip_address)')], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_resources_ip_address_lower', table_name='resources')
+    op.drop_index('ix_resources_name_lower', table_name='resources')
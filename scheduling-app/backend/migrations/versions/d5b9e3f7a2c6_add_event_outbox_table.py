@@ -0,0 +1,34 @@
+"""Add event_outbox table
+
+Revision ID: d5b9e3f7a2c6
+Revises: c8f4a2d6e1b3
+Create Date: 2026-10-18 21:05:47.302114
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd5b9e3f7a2c6'
+down_revision = 'c8f4a2d6e1b3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('event_outbox',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('event', sa.String(length=50), nullable=False),
+    sa.Column('payload', sa.Text(), nullable=False),
+    sa.Column('rooms', sa.Text(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('last_error', sa.String(length=200), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sqlite_autoincrement=True
+    )
+
+
+def downgrade():
+    op.drop_table('event_outbox')
@@ -0,0 +1,26 @@
+"""Add reservation keyset pagination index
+
+Revision ID: d7e93b0c5f18
+Revises: c41a7e2b9d05
+Create Date: 2026-10-18 14:22:50.740381
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd7e93b0c5f18'
+down_revision = 'c41a7e2b9d05'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('reservations', schema=None) as batch_op:
+        batch_op.create_index('ix_reservations_start_time_id', ['start_time', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('reservations', schema=None) as batch_op:
+        batch_op.drop_index('ix_reservations_start_time_id')
@@ -0,0 +1,34 @@
+"""Add group_id to reservations
+
+Revision ID: e6a1c4f8b2d9
+Revises: d5b9e3f7a2c6
+Create Date: 2026-10-18 23:41:12.508337
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e6a1c4f8b2d9'
+down_revision = 'd5b9e3f7a2c6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('reservations', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('group_id', sa.String(length=32), nullable=True))
+        batch_op.create_index('ix_reservations_group_id', ['group_id'], unique=False)
+
+    with op.batch_alter_table('reservations_archive', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('group_id', sa.String(length=32), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('reservations_archive', schema=None) as batch_op:
+        batch_op.drop_column('group_id')
+
+    with op.batch_alter_table('reservations', schema=None) as batch_op:
+        batch_op.drop_index('ix_reservations_group_id')
+        batch_op.drop_column('group_id')
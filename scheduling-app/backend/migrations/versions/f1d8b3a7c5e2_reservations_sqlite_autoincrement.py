@@ -0,0 +1,40 @@
+"""Never reuse reservation ids on SQLite
+
+Revision ID: f1d8b3a7c5e2
+Revises: e6a1c4f8b2d9
+Create Date: 2026-10-19 10:12:36.184905
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f1d8b3a7c5e2'
+down_revision = 'e6a1c4f8b2d9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Without AUTOINCREMENT, SQLite hands out max(id) + 1, which can be the id of an archived
+    # reservation once the newest one is deleted. PostgreSQL sequences never go back.
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    with op.batch_alter_table('reservations', recreate='always',
+                              table_kwargs={'sqlite_autoincrement': True}) as batch_op:
+        pass
+    # Start above every id ever handed out, including those only left in the archive
+    op.execute("DELETE FROM sqlite_sequence WHERE name = 'reservations'")
+    op.execute(
+        "INSERT INTO sqlite_sequence (name, seq) SELECT 'reservations', max(coalesce("
+        "(SELECT max(id) FROM reservations), 0), coalesce((SELECT max(id) FROM reservations_archive), 0))"
+    )
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    with op.batch_alter_table('reservations', recreate='always',
+                              table_kwargs={'sqlite_autoincrement': False}) as batch_op:
+        pass
@@ -0,0 +1,40 @@
+"""Add reservations_archive table
+
+Revision ID: f3a8c61d2e47
+Revises: d7e93b0c5f18
+Create Date: 2026-10-18 16:05:12.418273
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3a8c61d2e47'
+down_revision = 'd7e93b0c5f18'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('reservations_archive',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('resource_id', sa.Integer(), nullable=False),
+    sa.Column('start_time', sa.DateTime(), nullable=False),
+    sa.Column('end_time', sa.DateTime(), nullable=False),
+    sa.Column('description', sa.String(length=200), nullable=True),
+    sa.Column('archived_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['resource_id'], ['resources.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('reservations_archive', schema=None) as batch_op:
+        batch_op.create_index('ix_reservations_archive_resource_window', ['resource_id', 'start_time', 'end_time'], unique=False)
+        batch_op.create_index('ix_reservations_archive_start_time_id', ['start_time', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('reservations_archive', schema=None) as batch_op:
+        batch_op.drop_index('ix_reservations_archive_start_time_id')
+        batch_op.drop_index('ix_reservations_archive_resource_window')
+
+    op.drop_table('reservations_archive')
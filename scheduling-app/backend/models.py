@@ -1,7 +1,19 @@
 from flask_sqlalchemy import SQLAlchemy
-from datetime import timezone # Added import for timezone
+from datetime import datetime, timezone # Added import for timezone
 
-db = SQLAlchemy()
+from engine_profiles import RoutingSession
+
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+
+def parse_iso_datetime(value):
+    """
+    Parses an ISO 8601 string into a naive UTC datetime, the convention used for stored times.
+    Raises ValueError on malformed input.
+    """
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
 
 class Resource(db.Model):
     """
@@ -25,29 +37,189 @@ class Resource(db.Model):
             'web_port': self.web_port
         }
 
+# Serve the prefix lookups of GET /resources/search when its in-memory index is off (see resource_search.py)
+db.Index('ix_resources_name_lower', db.func.lower(Resource.name))
+db.Index('ix_resources_ip_address_lower', db.func.lower(Resource.ip_address))
+
+class ResourceStatus(db.Model):
+    """
+    Latest reachability of a resource's SSH and web ports, written by the health prober
+    (see health.py). A null *_reachable means the port is not configured.
+    """
+    __tablename__ = 'resource_status'
+
+    resource_id = db.Column(db.Integer, db.ForeignKey('resources.id'), primary_key=True, autoincrement=False)
+    ssh_reachable = db.Column(db.Boolean, nullable=True)
+    ssh_latency_ms = db.Column(db.Float, nullable=True)
+    web_reachable = db.Column(db.Boolean, nullable=True)
+    web_latency_ms = db.Column(db.Float, nullable=True)
+    error = db.Column(db.String(200), nullable=True)
+    failures = db.Column(db.Integer, nullable=False, default=0)  # Consecutive probes with a port down
+    checked_at = db.Column(db.DateTime, nullable=False)
+    changed_at = db.Column(db.DateTime, nullable=False)  # Last time reachability changed
+
 class Reservation(db.Model):
     """
     Reservation model for the database.
     """
     __tablename__ = 'reservations'
+    __table_args__ = (
+        # Serves the per-resource overlap check in /reserve and resource-filtered window reads.
+        db.Index('ix_reservations_resource_window', 'resource_id', 'start_time', 'end_time'),
+        # Serves window reads across all resources: history ends before the window, so
+        # `end_time > window_start` range-scans only recent and upcoming reservations.
+        db.Index('ix_reservations_end_time', 'end_time'),
+        # Serves keyset pagination ordered by (start_time, id).
+        db.Index('ix_reservations_start_time_id', 'start_time', 'id'),
+        # Serves listing the members of a group reservation.
+        db.Index('ix_reservations_group_id', 'group_id'),
+        # Never reuse ids: an archived reservation keeps its id (see archive.py).
+        {'sqlite_autoincrement': True},
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     resource_id = db.Column(db.Integer, db.ForeignKey('resources.id'), nullable=False)
     start_time = db.Column(db.DateTime, nullable=False)
     end_time = db.Column(db.DateTime, nullable=False)
     description = db.Column(db.String(200), nullable=True) # New field for reservation description
+    group_id = db.Column(db.String(32), nullable=True)  # Shared by the reservations of one /reserve/group call
 
     def to_dict(self):
-        # Assuming self.start_time and self.end_time are naive datetime objects
-        # representing UTC time (due to SQLite storage convention).
-        # Convert them to aware UTC datetime objects before calling isoformat().
-        start_utc_iso = self.start_time.replace(tzinfo=timezone.utc).isoformat()
-        end_utc_iso = self.end_time.replace(tzinfo=timezone.utc).isoformat()
-        
+        return reservation_dict(self.id, self.resource_id, self.start_time, self.end_time, self.description)
+
+class ReservationArchive(db.Model):
+    """
+    Cold storage for reservations that ended before the retention window (see archive.py).
+    Rows keep the id they had in the reservations table.
+    """
+    __tablename__ = 'reservations_archive'
+    __table_args__ = (
+        # Serves per-resource history windows and the conflict check for bookings in the past.
+        db.Index('ix_reservations_archive_resource_window', 'resource_id', 'start_time', 'end_time'),
+        # Serves window reads and keyset pagination across all resources.
+        db.Index('ix_reservations_archive_start_time_id', 'start_time', 'id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    resource_id = db.Column(db.Integer, db.ForeignKey('resources.id'), nullable=False)
+    start_time = db.Column(db.DateTime, nullable=False)
+    end_time = db.Column(db.DateTime, nullable=False)
+    description = db.Column(db.String(200), nullable=True)
+    group_id = db.Column(db.String(32), nullable=True)
+    archived_at = db.Column(db.DateTime, nullable=False)
+
+    def to_dict(self):
+        return reservation_dict(self.id, self.resource_id, self.start_time, self.end_time, self.description)
+
+class ReservationSeries(db.Model):
+    """
+    A recurring reservation stored as a rule (see series.py) instead of one row per occurrence.
+    Occurrences repeat at the UTC time of day of start_time and are expanded only for the
+    window being read or checked.
+    """
+    __tablename__ = 'reservation_series'
+    __table_args__ = (
+        # Serves the per-resource lookup of series whose span overlaps a window.
+        db.Index('ix_reservation_series_resource_span', 'resource_id', 'start_time', 'last_end'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    resource_id = db.Column(db.Integer, db.ForeignKey('resources.id'), nullable=False)
+    start_time = db.Column(db.DateTime, nullable=False)  # Start of the first occurrence
+    duration_minutes = db.Column(db.Integer, nullable=False)
+    freq = db.Column(db.String(10), nullable=False)  # DAILY or WEEKLY
+    interval = db.Column(db.Integer, nullable=False, default=1)
+    by_weekday = db.Column(db.String(20), nullable=True)  # WEEKLY only: weekday numbers, "0,2,4" (0 is Monday)
+    until = db.Column(db.DateTime, nullable=True)
+    count = db.Column(db.Integer, nullable=True)
+    last_end = db.Column(db.DateTime, nullable=True)  # End of the last occurrence; null for open-ended series
+    description = db.Column(db.String(200), nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False)
+    exceptions = db.relationship('ReservationSeriesException', backref='series', lazy='selectin',
+                                 cascade='all, delete-orphan', order_by='ReservationSeriesException.occurrence_start')
+
+    def to_dict(self):
+        from series import Rule  # series.py imports the models
         return {
             'id': self.id,
             'resource_id': self.resource_id,
-            'start_time': start_utc_iso, # Now correctly includes UTC offset
-            'end_time': end_utc_iso,     # Now correctly includes UTC offset
-            'description': self.description # Include description in the dictionary
-        }
\ No newline at end of file
+            'start_time': isoformat_utc(self.start_time),
+            'duration_minutes': self.duration_minutes,
+            'rrule': Rule.of(self).to_rrule(),
+            'exdates': [isoformat_utc(exception.occurrence_start) for exception in self.exceptions],
+            'last_end_time': isoformat_utc(self.last_end) if self.last_end else None,
+            'description': self.description
+        }
+
+class ReservationSeriesException(db.Model):
+    """An occurrence removed from a series (RRULE EXDATE), identified by its start time."""
+    __tablename__ = 'reservation_series_exceptions'
+    __table_args__ = (
+        db.UniqueConstraint('series_id', 'occurrence_start', name='uq_reservation_series_exception'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    series_id = db.Column(db.Integer, db.ForeignKey('reservation_series.id', ondelete='CASCADE'), nullable=False)
+    occurrence_start = db.Column(db.DateTime, nullable=False)
+
+class OutboxEvent(db.Model):
+    """
+    A Socket.IO event, written in the same transaction as the change it announces and emitted
+    after commit by the outbox dispatcher (see outbox.py), in id order.
+    """
+    __tablename__ = 'event_outbox'
+    __table_args__ = {'sqlite_autoincrement': True}
+
+    id = db.Column(db.Integer, primary_key=True)
+    event = db.Column(db.String(50), nullable=False)
+    payload = db.Column(db.Text, nullable=False)  # JSON
+    rooms = db.Column(db.Text, nullable=False)  # JSON list of the Socket.IO rooms to emit to
+    created_at = db.Column(db.DateTime, nullable=False)
+    attempts = db.Column(db.Integer, nullable=False, default=0)  # Failed emits so far
+    last_error = db.Column(db.String(200), nullable=True)
+
+class ReservationChange(db.Model):
+    """
+    Change-log entry for a reservation write. seq increases monotonically in commit order,
+    so clients can fetch the changes after the last seq they applied.
+    """
+    __tablename__ = 'reservation_changes'
+    __table_args__ = {'sqlite_autoincrement': True} # Never reuse seq values, even after pruning
+
+    seq = db.Column(db.Integer, primary_key=True)
+    action = db.Column(db.String(20), nullable=False)
+    reservation_id = db.Column(db.Integer, nullable=True)  # Null for series changes
+    series_id = db.Column(db.Integer, nullable=True)
+    resource_id = db.Column(db.Integer, nullable=False)
+    start_time = db.Column(db.DateTime, nullable=False)
+    end_time = db.Column(db.DateTime, nullable=False)
+    description = db.Column(db.String(200), nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False)
+
+    def to_dict(self):
+        if self.series_id is not None:
+            # Occurrences are expanded per window, so clients reload their window on series changes.
+            return {'seq': self.seq, 'action': self.action, 'series_id': self.series_id, 'resource_id': self.resource_id}
+        return {
+            'seq': self.seq,
+            'action': self.action,
+            'reservation': reservation_dict(self.reservation_id, self.resource_id, self.start_time,
+                                            self.end_time, self.description)
+        }
+
+def isoformat_utc(value):
+    """
+    Formats a stored datetime as ISO 8601 with an explicit UTC offset.
+    Stored datetimes are naive and represent UTC time (due to SQLite storage convention).
+    """
+    return value.replace(tzinfo=timezone.utc).isoformat()
+
+def reservation_dict(reservation_id, resource_id, start_time, end_time, description):
+    """Serializes reservation fields into the API representation, without needing an ORM object."""
+    return {
+        'id': reservation_id,
+        'resource_id': resource_id,
+        'start_time': isoformat_utc(start_time), # Now correctly includes UTC offset
+        'end_time': isoformat_utc(end_time),     # Now correctly includes UTC offset
+        'description': description # Include description in the dictionary
+    }
@@ -0,0 +1,138 @@
+import json
+import threading
+from collections import OrderedDict
+
+from changes import changes_since
+from models import isoformat_utc, reservation_dict
+from series import occurrence_dict
+
+# Past this many changes since an entry was built, rebuilding is cheaper than replaying them.
+MAX_REPLAYED_CHANGES = 1000
+
+
+def slot_range(start_time, end_time, window_start, slot, slot_count):
+    """
+    Returns the [first, last) indexes of the slots whose start lies in [start_time, end_time),
+    the rule ScheduleGrid uses to mark a cell as reserved. Pure integer arithmetic: no
+    per-slot scan.
+    """
+    first = max(0, -((window_start - start_time) // slot))
+    last = min(slot_count, -((window_start - end_time) // slot))
+    return first, last
+
+
+def occupancy_matrix(rows, occurrences, window_start, slot, slot_count):
+    """
+    Sweeps reservations into a run-length encoded occupancy matrix.
+
+    rows are (id, resource_id, start_time, end_time, description) tuples and occurrences are
+    series.occurrences_in_window tuples. Returns {'resources': {resource_id: [[first_slot,
+    slot_count, key], ...]}, 'reservations': {key: reservation}}: one run per reservation,
+    ordered by slot, keyed by the reservation id (or "<series_id>@<start_time>" for an
+    occurrence of a series). Resources without reservations in the window are left out.
+    The work is O(reservations in the window), independent of the number of slots.
+    """
+    runs = {}
+    reservations = {}
+
+    def add(key, resource_id, start_time, end_time, data):
+        first, last = slot_range(start_time, end_time, window_start, slot, slot_count)
+        if first < last:
+            runs.setdefault(resource_id, []).append([first, last - first, key])
+            reservations[key] = data
+
+    for reservation_id, resource_id, start_time, end_time, description in rows:
+        add(str(reservation_id), resource_id, start_time, end_time,
+            reservation_dict(reservation_id, resource_id, start_time, end_time, description))
+    for resource_id, start_time, end_time, series in occurrences:
+        add(f'{series.id}@{isoformat_utc(start_time)}', resource_id, start_time, end_time,
+            occurrence_dict(resource_id, start_time, end_time, series))
+
+    for resource_runs in runs.values():
+        resource_runs.sort()
+    return {'resources': {str(resource_id): runs[resource_id] for resource_id in sorted(runs)},
+            'reservations': reservations}
+
+
+class OccupancyEntry:
+    __slots__ = ('seq', 'body', 'window_start', 'window_end', 'resource_ids')
+
+    def __init__(self, seq, body, window_start, window_end, resource_ids):
+        self.seq = seq
+        self.body = body
+        self.window_start = window_start
+        self.window_end = window_end
+        self.resource_ids = resource_ids
+
+    def affected_by(self, change):
+        if change.series_id is not None:  # Series may touch any window; rebuild
+            return True
+        if self.resource_ids is not None and change.resource_id not in self.resource_ids:
+            return False
+        if change.action == 'released':  # The freed part, after end_time, is not in the change
+            return change.start_time < self.window_end
+        return change.start_time < self.window_end and change.end_time > self.window_start
+
+
+class OccupancyCache:
+    """
+    Bounded LRU of serialized occupancy matrices, one per (window, slot size, resources).
+
+    Each entry remembers the change seq it was built at. On a hit, the changes committed since
+    then are read from the change log (one range scan on its primary key): if none of them
+    touches the entry's window and resources, the entry is still exact and is served, otherwise
+    it is rebuilt. Writes to other windows therefore never evict it, and because the check goes
+    through the database, writes made by other worker processes are seen as well.
+    """
+
+    def __init__(self, max_entries=128):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """Returns (body, seq) for key if the cached matrix is still exact, else None."""
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        seq = entry.seq
+        changes, resync_required = changes_since(seq, MAX_REPLAYED_CHANGES + 1)
+        if resync_required or len(changes) > MAX_REPLAYED_CHANGES or any(entry.affected_by(c) for c in changes):
+            with self._lock:
+                if self._entries.get(key) is entry:
+                    del self._entries[key]
+            self.misses += 1
+            return None
+        if changes:
+            seq = changes[-1].seq
+        with self._lock:
+            entry.seq = max(entry.seq, seq)
+            if key in self._entries:
+                self._entries.move_to_end(key)
+        self.hits += 1
+        return entry.body, seq
+
+    def put(self, key, seq, matrix, window_start, window_end, resource_ids):
+        """Serializes and stores matrix, built from data as of change seq; returns the body."""
+        body = json.dumps(matrix, separators=(',', ':'))
+        entry = OccupancyEntry(seq, body, window_start, window_end,
+                               frozenset(resource_ids) if resource_ids is not None else None)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return body
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+
+occupancy_cache = OccupancyCache()
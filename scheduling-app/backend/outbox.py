@@ -0,0 +1,155 @@
+import json
+import threading
+
+from flask import current_app
+from sqlalchemy import delete, event, select, update
+from sqlalchemy.orm import Session
+
+from archive import utcnow
+from events import event_publisher, rooms_for
+from metrics import metrics
+from models import OutboxEvent, db
+
+OUTBOX = OutboxEvent.__table__
+
+
+def enqueue_event(event_name, payload, scopes):
+    """
+    Adds a Socket.IO event for the rooms interested in scopes (see events.rooms_for) to the
+    current transaction. It is emitted once the transaction commits, and not at all if it rolls
+    back. Call it right before committing, with db.session flushed so that change seqs are set.
+    """
+    db.session.add(OutboxEvent(event=event_name, payload=json.dumps(payload), rooms=json.dumps(rooms_for(scopes)),
+                               created_at=utcnow(), attempts=0))
+    db.session.info['outbox_written'] = True
+
+
+class OutboxDispatcher:
+    """
+    Emits the events of the event_outbox table in id order, OUTBOX_BATCH_SIZE rows per read, and
+    deletes them once emitted. Delivery is at least once: an emit that fails is retried every
+    OUTBOX_RETRY_DELAY_MS (later events wait, so order is kept) and dropped after
+    OUTBOX_MAX_ATTEMPTS; a crash between emit and delete sends an event twice. Changes carry a
+    seq, so clients skip the ones they already applied and catch up on gaps from
+    /reservations/changes.
+
+    The process that runs the background jobs (worker 0 under serve.py) runs it as a background
+    task: woken by its own commits, and polling every OUTBOX_POLL_INTERVAL_MS for events written
+    by the other workers. A process without a dispatcher task (tests, `flask run`) emits its
+    events itself right after each commit, unless inline is turned off (the other serve.py
+    workers).
+    """
+
+    def __init__(self):
+        self.running = False
+        self.inline = True
+        self.config = {}
+        self._wake = threading.Event()
+        self._drain_lock = threading.Lock()
+        self._listeners = []
+
+    def add_listener(self, listener):
+        """Calls listener(event, payload) for every event emitted, in order, from the draining thread."""
+        self._listeners.append(listener)
+
+    def init_app(self, app):
+        self.config = app.config
+
+    def start(self, app, socketio):
+        if self.running:
+            return
+        self.running = True
+        socketio.start_background_task(self._run, app)
+
+    def _run(self, app):
+        while self.running:
+            self._wake.clear()
+            with app.app_context():
+                try:
+                    failed = not self.drain()
+                except Exception:
+                    app.logger.exception('Outbox dispatch failed')
+                    failed = True
+            delay = app.config['OUTBOX_RETRY_DELAY_MS'] if failed else app.config['OUTBOX_POLL_INTERVAL_MS']
+            self._wake.wait(delay / 1000.0)
+
+    def stop(self):
+        self.running = False
+        self._wake.set()
+
+    def wake(self):
+        """Called after a commit that wrote outbox rows."""
+        if self.running:
+            self._wake.set()
+        elif self.inline:
+            try:
+                self.drain()
+            except Exception:
+                # The rows stay in the outbox; the next commit (or a dispatcher) sends them
+                current_app.logger.exception('Outbox dispatch failed')
+
+    def drain(self):
+        """
+        Emits pending events until the outbox is empty. Requires an app context. Returns False
+        when an emit failed and the rest was left for a retry.
+        """
+        batch_size = self.config.get('OUTBOX_BATCH_SIZE', 100)
+        max_attempts = self.config.get('OUTBOX_MAX_ATTEMPTS', 5)
+        # Core statements on their own connections: this also runs from after_commit, when the
+        # session cannot emit SQL
+        with self._drain_lock:
+            while True:
+                with db.engine.begin() as connection:
+                    rows = connection.execute(select(OUTBOX).order_by(OUTBOX.c.id).limit(batch_size)).all()
+                if not rows:
+                    return True
+                sent, failure = [], None
+                now = utcnow()
+                for row in rows:
+                    payload = json.loads(row.payload)
+                    try:
+                        event_publisher.publish_to_rooms(row.event, payload, json.loads(row.rooms))
+                    except Exception as e:
+                        failure = (row, e)
+                        break
+                    sent.append(row.id)
+                    for listener in self._listeners:
+                        try:
+                            listener(row.event, payload)
+                        except Exception:
+                            # The event was emitted; a listener must not get it sent again
+                            current_app.logger.exception('Outbox listener failed on %s event %d', row.event, row.id)
+                    metrics.outbox_lag.observe((now - row.created_at).total_seconds())
+
+                with db.engine.begin() as connection:
+                    if sent:
+                        connection.execute(delete(OUTBOX).where(OUTBOX.c.id.in_(sent)))
+                    if failure is not None:
+                        row, error = failure
+                        metrics.outbox_failures.inc()
+                        if row.attempts + 1 >= max_attempts:
+                            current_app.logger.error('Dropping %s event %d after %d failed emits: %s',
+                                                     row.event, row.id, max_attempts, error)
+                            connection.execute(delete(OUTBOX).where(OUTBOX.c.id == row.id))
+                        else:
+                            connection.execute(update(OUTBOX).where(OUTBOX.c.id == row.id)
+                                               .values(attempts=row.attempts + 1, last_error=str(error)[:200]))
+                metrics.outbox_dispatched.inc(amount=len(sent))
+                if failure is not None:
+                    return False
+                if len(rows) < batch_size:
+                    return True
+
+
+outbox_dispatcher = OutboxDispatcher()
+
+
+@event.listens_for(Session, 'after_commit')
+def _dispatch_after_commit(session):
+    if session.info.pop('outbox_written', False):
+        outbox_dispatcher.wake()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_outbox_writes(session):
+    session.info.pop('outbox_written', None)
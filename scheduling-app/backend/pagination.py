@@ -0,0 +1,77 @@
+import base64
+import json
+
+from flask import Response, current_app
+from sqlalchemy import tuple_
+
+from models import db, parse_iso_datetime
+
+
+def encode_cursor(key):
+    """Turns a JSON-serializable sort key into an opaque, URL-safe cursor."""
+    return base64.urlsafe_b64encode(json.dumps(key, separators=(',', ':')).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Inverse of encode_cursor; raises ValueError for anything it did not produce."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        return json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError('invalid cursor') from e
+
+
+def is_paginated(args):
+    return 'limit' in args or 'cursor' in args
+
+
+def page_size(args):
+    """Returns the requested page size, capped at MAX_PAGE_SIZE; raises ValueError when invalid."""
+    max_size = current_app.config.get('MAX_PAGE_SIZE', 1000)
+    limit = args.get('limit', current_app.config.get('DEFAULT_PAGE_SIZE', 100))
+    limit = int(limit)
+    if limit <= 0:
+        raise ValueError('limit must be positive')
+    return min(limit, max_size)
+
+
+def after_resource_cursor(statement, cursor, id_column):
+    """Keyset filter for listings ordered by id."""
+    if cursor is None:
+        return statement.order_by(id_column)
+    key = decode_cursor(cursor)
+    if not isinstance(key, int):
+        raise ValueError('invalid cursor')
+    return statement.filter(id_column > key).order_by(id_column)
+
+
+def after_reservation_cursor(statement, cursor, start_column, id_column):
+    """Keyset filter for listings ordered by (start_time, id): constant cost however deep the page."""
+    if cursor is None:
+        return statement.order_by(start_column, id_column)
+    key = decode_cursor(cursor)
+    try:
+        start_iso, last_id = key
+        start_time = parse_iso_datetime(start_iso)
+        last_id = int(last_id)
+    except (TypeError, ValueError) as e:
+        raise ValueError('invalid cursor') from e
+    return statement.filter(tuple_(start_column, id_column) > tuple_(start_time, last_id)) \
+        .order_by(start_column, id_column)
+
+
+def page_rows(statement, limit, cursor_key):
+    """
+    Runs a keyset-ordered select() for one page and returns (rows, next_cursor).
+    One extra row is fetched to tell whether a next page exists; next_cursor is None on the last page.
+    """
+    rows = db.session.execute(statement.limit(limit + 1)).all()
+    next_cursor = encode_cursor(cursor_key(rows[limit - 1])) if len(rows) > limit else None
+    return rows[:limit], next_cursor
+
+
+def page_response(statement, limit, encode, cursor_key):
+    """Returns one page as {"items": [...], "next_cursor": ...} (see page_rows)."""
+    rows, next_cursor = page_rows(statement, limit, cursor_key)
+    body = '{"items":[' + ','.join(encode(row) for row in rows) + '],"next_cursor":' + json.dumps(next_cursor) + '}'
+    return Response(body, mimetype='application/json')
@@ -0,0 +1,153 @@
+import threading
+from bisect import bisect_left, bisect_right, insort
+
+from engine_profiles import primary_reads
+from models import Reservation, db, reservation_dict
+
+
+class ReservationIndex:
+    """
+    In-process interval index over the reservations table, one sorted list per resource.
+
+    Entries are (start_time, end_time, reservation_id) tuples sorted by start time. The booking
+    path never lets two reservations on one resource overlap, so end times are sorted as well and
+    both conflict checks and window lookups are bisections instead of SQL queries.
+
+    The index only sees writes made through this process. It is meant for single-process
+    deployments; use check_consistency() to detect drift caused by other writers.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._intervals = {}    # resource_id -> sorted list of (start_time, end_time, id)
+        self._entries = {}      # reservation id -> (resource_id, start_time, end_time, description)
+        self._built = False
+
+    @property
+    def is_built(self):
+        return self._built
+
+    def invalidate(self):
+        """Drops the index contents; it is rebuilt from the database on next use."""
+        with self._lock:
+            self._intervals = {}
+            self._entries = {}
+            self._built = False
+
+    def build(self):
+        """(Re)loads the index from the reservations table. Requires an app context."""
+        intervals = {}
+        entries = {}
+        # Built on first use, possibly inside a @read_replica view: a lagging replica must not seed it.
+        with primary_reads():
+            rows = db.session.execute(
+                db.select(Reservation.id, Reservation.resource_id, Reservation.start_time,
+                          Reservation.end_time, Reservation.description)
+                .order_by(Reservation.resource_id, Reservation.start_time)
+                .execution_options(yield_per=10000)
+            )
+            for reservation_id, resource_id, start_time, end_time, description in rows:
+                intervals.setdefault(resource_id, []).append((start_time, end_time, reservation_id))
+                entries[reservation_id] = (resource_id, start_time, end_time, description)
+
+        with self._lock:
+            self._intervals = intervals
+            self._entries = entries
+            self._built = True
+
+    def ensure_built(self):
+        if not self._built:
+            with self._lock:
+                if not self._built:
+                    self.build()
+
+    def add(self, reservation_id, resource_id, start_time, end_time, description=None):
+        with self._lock:
+            if not self._built:
+                return  # Picked up by the next build
+            self._remove_locked(reservation_id)
+            insort(self._intervals.setdefault(resource_id, []), (start_time, end_time, reservation_id))
+            self._entries[reservation_id] = (resource_id, start_time, end_time, description)
+
+    def remove(self, reservation_id):
+        with self._lock:
+            if self._built:
+                self._remove_locked(reservation_id)
+
+    def _remove_locked(self, reservation_id):
+        entry = self._entries.pop(reservation_id, None)
+        if entry is None:
+            return
+        resource_id, start_time, end_time, _ = entry
+        intervals = self._intervals.get(resource_id, [])
+        key = (start_time, end_time, reservation_id)
+        position = bisect_left(intervals, key)
+        if position < len(intervals) and intervals[position] == key:
+            del intervals[position]
+        if not intervals:
+            self._intervals.pop(resource_id, None)
+
+    def find_conflict(self, resource_id, start_time, end_time):
+        """Returns the id of a reservation overlapping [start_time, end_time), or None."""
+        with self._lock:
+            intervals = self._intervals.get(resource_id)
+            if not intervals:
+                return None
+            # Last entry starting before end_time; with disjoint intervals it has the latest end.
+            position = bisect_left(intervals, (end_time,))
+            if position and intervals[position - 1][1] > start_time:
+                return intervals[position - 1][2]
+            return None
+
+    def overlapping(self, resource_id, start_time=None, end_time=None):
+        """Returns reservation dicts on resource_id overlapping [start_time, end_time)."""
+        with self._lock:
+            intervals = self._intervals.get(resource_id, [])
+            lo = bisect_right(intervals, start_time, key=lambda entry: entry[1]) if start_time is not None else 0
+            hi = bisect_left(intervals, (end_time,)) if end_time is not None else len(intervals)
+            return [
+                reservation_dict(reservation_id, resource_id, start, end, self._entries[reservation_id][3])
+                for start, end, reservation_id in intervals[lo:hi]
+            ]
+
+    def check_consistency(self):
+        """
+        Compares the index with the reservations table.
+        Returns a dict listing ids missing from the index, ids no longer in the table,
+        ids whose times differ, and ids that overlap another reservation on the same resource.
+        """
+        with self._lock:
+            entries = dict(self._entries)
+            intervals = {resource_id: list(items) for resource_id, items in self._intervals.items()}
+
+        missing, mismatched = [], []
+        seen = set()
+        rows = db.session.execute(
+            db.select(Reservation.id, Reservation.resource_id, Reservation.start_time, Reservation.end_time)
+            .execution_options(yield_per=10000)
+        )
+        for reservation_id, resource_id, start_time, end_time in rows:
+            seen.add(reservation_id)
+            entry = entries.get(reservation_id)
+            if entry is None:
+                missing.append(reservation_id)
+            elif entry[:3] != (resource_id, start_time, end_time):
+                mismatched.append(reservation_id)
+
+        overlapping = []
+        for items in intervals.values():
+            for previous, current in zip(items, items[1:]):
+                if current[0] < previous[1]:
+                    overlapping.append(current[2])
+
+        stale = sorted(set(entries) - seen)
+        return {
+            'consistent': not (missing or stale or mismatched or overlapping),
+            'missing': sorted(missing),
+            'stale': stale,
+            'mismatched': sorted(mismatched),
+            'overlapping': sorted(overlapping),
+        }
+
+
+reservation_index = ReservationIndex()
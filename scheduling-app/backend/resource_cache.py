@@ -0,0 +1,145 @@
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from engine_profiles import primary_reads
+from metrics import metrics
+from models import Resource, db
+from serialization import RESOURCE_COLUMNS, iter_json_array, resource_json
+
+
+class ResourceCache:
+    """
+    Read-through cache of resources for the hot lookups (GET /resources/<id>, /availability/<id>)
+    and a snapshot of the whole inventory for GET /resources.
+
+    Entries are Resource.to_dict() values in an LRU of at most max_entries, each kept for
+    ttl_seconds. The snapshot holds the encoded GET /resources body, and is only kept for
+    inventories of at most max_entries resources. Writes committed through this process
+    invalidate what they touch right away (see the session listeners below); writes from other
+    processes, such as the bulk loader, show up once the TTL runs out.
+
+    Lookups that miss read the primary, so a lagging read replica cannot seed the cache. Each
+    fill carries the generation it started at, and is dropped when an invalidation happened
+    meanwhile: a read racing a commit never stores the old row.
+    """
+
+    def __init__(self, max_entries=1024, ttl_seconds=60):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()   # resource_id -> (expires_at, resource dict)
+        self._snapshot = None           # (expires_at, body, {resource_id: resource dict})
+        self._generation = 0
+
+    def init_app(self, app):
+        self.max_entries = app.config.get('RESOURCE_CACHE_MAX_ENTRIES', 1024)
+        self.ttl_seconds = app.config.get('RESOURCE_CACHE_TTL_SECONDS', 60)
+
+    def get(self, resource_id):
+        """Returns the resource dict for resource_id, or None if it does not exist. Requires an app context."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(resource_id)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(resource_id)
+                metrics.resource_cache_lookups.inc('hit')
+                return entry[1]
+            if self._snapshot is not None and self._snapshot[0] > now:
+                metrics.resource_cache_lookups.inc('hit')
+                return self._snapshot[2].get(resource_id)
+            generation = self._generation
+        metrics.resource_cache_lookups.inc('miss')
+
+        with primary_reads():
+            resource = db.session.get(Resource, resource_id)
+        data = resource.to_dict() if resource is not None else None
+        if data is not None:
+            with self._lock:
+                if generation == self._generation:
+                    self._entries[resource_id] = (now + self.ttl_seconds, data)
+                    self._entries.move_to_end(resource_id)
+                    while len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+        return data
+
+    def snapshot_body(self):
+        """
+        Returns the GET /resources body (a JSON array ordered by id) from the snapshot, loading it
+        when missing or expired; None when there are more than max_entries resources.
+        """
+        now = time.monotonic()
+        with self._lock:
+            if self._snapshot is not None and self._snapshot[0] > now:
+                metrics.resource_cache_lookups.inc('hit')
+                return self._snapshot[1]
+            generation = self._generation
+        metrics.resource_cache_lookups.inc('miss')
+
+        with primary_reads():
+            rows = db.session.execute(
+                db.select(*RESOURCE_COLUMNS).order_by(Resource.id).limit(self.max_entries + 1)).all()
+        if len(rows) > self.max_entries:
+            return None
+        body = ''.join(iter_json_array(rows, resource_json))
+        by_id = {row[0]: {'id': row[0], 'name': row[1], 'ip_address': row[2], 'ssh_port': row[3],
+                          'web_port': row[4]} for row in rows}
+        with self._lock:
+            if generation == self._generation:
+                self._snapshot = (now + self.ttl_seconds, body, by_id)
+        return body
+
+    def invalidate(self, resource_ids=None):
+        """Drops the given resources (all of them when None) and the snapshot."""
+        with self._lock:
+            self._generation += 1
+            self._snapshot = None
+            if resource_ids is None:
+                self._entries.clear()
+            else:
+                for resource_id in resource_ids:
+                    self._entries.pop(resource_id, None)
+
+
+resource_cache = ResourceCache()
+
+
+@event.listens_for(Resource, 'after_insert')
+@event.listens_for(Resource, 'after_update')
+@event.listens_for(Resource, 'after_delete')
+def _collect_resource_write(mapper, connection, target):
+    session = Session.object_session(target)
+    if session is not None:
+        session.info.setdefault('resource_cache', set()).add(target.id)
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _note_bulk_resource_write(orm_execute_state):
+    # Core DML on the resources table (the bulk loader) bypasses the mapper events
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        table = getattr(orm_execute_state.statement, 'table', None)
+        if table is not None and table.name == Resource.__tablename__:
+            orm_execute_state.session.info['resource_cache_clear'] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_after_commit(session):
+    written = session.info.pop('resource_cache', None)
+    if session.info.pop('resource_cache_clear', False):
+        resource_cache.invalidate()
+    elif written:
+        resource_cache.invalidate(written)
+
+
+@event.listens_for(Resource.__table__, 'after_drop')
+def _invalidate_after_drop(target, connection, **kw):
+    resource_cache.invalidate()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_resource_writes(session):
+    session.info.pop('resource_cache', None)
+    session.info.pop('resource_cache_clear', None)
@@ -0,0 +1,289 @@
+import heapq
+import re
+import threading
+import time
+from bisect import bisect_left, insort
+
+from sqlalchemy import and_, event, func, or_, select
+from sqlalchemy.orm import Session
+
+from engine_profiles import primary_reads
+from models import Resource, db
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+
+# Ranks, best first: the whole name or address, a prefix of it, a prefix of a word of the name, a substring
+MATCH_KINDS = ('exact', 'prefix', 'word', 'substring')
+
+COLUMNS = (Resource.id, Resource.name, Resource.ip_address, Resource.ssh_port, Resource.web_port)
+
+_WORD_SEPARATORS = re.compile(r'[^0-9a-z]+')
+
+
+def normalize(text):
+    return (text or '').strip().lower()
+
+
+def words(name_key):
+    """Words of a normalized name after the first one, e.g. 'rack-3 gw' -> ['3', 'gw']."""
+    return [word for word in _WORD_SEPARATORS.split(name_key) if word][1:]
+
+
+def trigrams(key):
+    return {key[i:i + 3] for i in range(len(key) - 2)}
+
+
+def match_rank(query, name_key, ip_key):
+    """Index into MATCH_KINDS of how name/ip_address match query, or None if they do not."""
+    if query in (name_key, ip_key):
+        return 0
+    if name_key.startswith(query) or ip_key.startswith(query):
+        return 1
+    if any(word.startswith(query) for word in words(name_key)):
+        return 2
+    if len(query) >= 3 and (query in name_key or query in ip_key):
+        return 3
+    return None
+
+
+def search_result(row, rank):
+    resource_id, name, ip_address, ssh_port, web_port = row
+    return {'id': resource_id, 'name': name, 'ip_address': ip_address, 'ssh_port': ssh_port,
+            'web_port': web_port, 'match': MATCH_KINDS[rank]}
+
+
+def ranked(query, rows, limit):
+    """The limit best matches among rows, ordered by rank, then shorter names, then name and id."""
+    candidates = []
+    for row in rows:
+        name_key = normalize(row[1])
+        rank = match_rank(query, name_key, normalize(row[2]))
+        if rank is not None:
+            candidates.append(((rank, len(name_key), name_key, row[0]), row))
+    return [search_result(row, key[0]) for key, row in heapq.nsmallest(limit, candidates, key=lambda c: c[0])]
+
+
+class ResourceSearchIndex:
+    """
+    In-process search index over resource names and IP addresses.
+
+    Prefix lookups bisect one sorted list of (term, resource_id, rank), holding each resource's
+    name, address and the words of its name; substring lookups of three or more characters intersect
+    the id sets of the query's trigrams and then check the survivors. Both touch only matching
+    resources, so a keystroke costs the same with ten or fifty thousand devices.
+
+    Writes committed through this process are applied by session events (see the listeners
+    below). Writes made elsewhere (another worker, the bulk loader run as a script) are picked up
+    by rebuilding once the index is older than RESOURCE_SEARCH_REFRESH_SECONDS.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._build_lock = threading.Lock()
+        self._rows = {}         # resource_id -> (id, name, ip_address, ssh_port, web_port)
+        self._keys = {}         # resource_id -> (normalized name, normalized ip_address)
+        self._terms = []        # sorted (term, resource_id, rank of a prefix match)
+        self._trigrams = {}     # trigram -> set of resource ids
+        self._built_at = None
+
+    @property
+    def is_built(self):
+        return self._built_at is not None
+
+    def invalidate(self):
+        """Drops the index contents; it is rebuilt from the database on next use."""
+        with self._lock:
+            self._rows, self._keys, self._terms, self._trigrams = {}, {}, [], {}
+            self._built_at = None
+
+    def build(self):
+        """(Re)loads the index from the resources table. Requires an app context."""
+        rows, keys, terms, grams = {}, {}, [], {}
+        with primary_reads():
+            for row in db.session.execute(select(*COLUMNS).execution_options(yield_per=10000)):
+                row = tuple(row)
+                rows[row[0]] = row
+                keys[row[0]] = name_key, ip_key = normalize(row[1]), normalize(row[2])
+                for term, kind in self._terms_of(name_key, ip_key):
+                    terms.append((term, row[0], kind))
+                for gram in trigrams(name_key) | trigrams(ip_key):
+                    grams.setdefault(gram, set()).add(row[0])
+        terms.sort()
+        with self._lock:
+            self._rows, self._keys, self._terms, self._trigrams = rows, keys, terms, grams
+            self._built_at = time.monotonic()
+
+    def ensure_built(self, max_age=None):
+        """
+        Builds the index if needed, or rebuilds it once older than max_age seconds. Only one
+        thread rebuilds; the others keep searching the current contents meanwhile.
+        """
+        built_at = self._built_at
+        if built_at is not None and (not max_age or time.monotonic() - built_at < max_age):
+            return
+        if not self._build_lock.acquire(blocking=built_at is None):
+            return
+        try:
+            if self._built_at == built_at:
+                self.build()
+        finally:
+            self._build_lock.release()
+
+    @staticmethod
+    def _terms_of(name_key, ip_key):
+        """(term, rank of a prefix match on it): 1 for the name and address, 2 for later words of the name."""
+        terms = {(word, 2) for word in words(name_key)}
+        terms.update((key, 1) for key in (name_key, ip_key) if key)
+        return terms
+
+    def add(self, row):
+        """Adds or replaces an (id, name, ip_address, ssh_port, web_port) row."""
+        with self._lock:
+            if self._built_at is None:
+                return  # Picked up by the next build
+            self._remove_locked(row[0])
+            self._rows[row[0]] = row
+            self._keys[row[0]] = name_key, ip_key = normalize(row[1]), normalize(row[2])
+            for term, kind in self._terms_of(name_key, ip_key):
+                insort(self._terms, (term, row[0], kind))
+            for gram in trigrams(name_key) | trigrams(ip_key):
+                self._trigrams.setdefault(gram, set()).add(row[0])
+
+    def remove(self, resource_id):
+        with self._lock:
+            if self._built_at is not None:
+                self._remove_locked(resource_id)
+
+    def _remove_locked(self, resource_id):
+        if self._rows.pop(resource_id, None) is None:
+            return
+        name_key, ip_key = self._keys.pop(resource_id)
+        for term, kind in self._terms_of(name_key, ip_key):
+            position = bisect_left(self._terms, (term, resource_id, kind))
+            if position < len(self._terms) and self._terms[position] == (term, resource_id, kind):
+                del self._terms[position]
+        for gram in trigrams(name_key) | trigrams(ip_key):
+            ids = self._trigrams.get(gram)
+            if ids is not None:
+                ids.discard(resource_id)
+                if not ids:
+                    del self._trigrams[gram]
+
+    def search(self, query, limit=DEFAULT_LIMIT):
+        """Returns up to limit search_result dicts for query, ranked as ranked() does."""
+        query = normalize(query)
+        if not query:
+            return []
+        with self._lock:
+            # Every term in [query, query + U+10FFFF) starts with query
+            lo = bisect_left(self._terms, (query,))
+            hi = bisect_left(self._terms, (query + '\U0010ffff',), lo)
+            ranks = {}
+            for term, resource_id, kind in self._terms[lo:hi]:
+                rank = 0 if kind == 1 and term == query else kind
+                if rank < ranks.get(resource_id, len(MATCH_KINDS)):
+                    ranks[resource_id] = rank
+            if len(query) >= 3:
+                postings = sorted((self._trigrams.get(gram, ()) for gram in trigrams(query)), key=len)
+                for resource_id in set(postings[0]).intersection(*postings[1:]).difference(ranks):
+                    name_key, ip_key = self._keys[resource_id]
+                    if query in name_key or query in ip_key:
+                        ranks[resource_id] = 3
+            keys = self._keys
+            best = heapq.nsmallest(limit, ((rank, len(keys[resource_id][0]), keys[resource_id][0], resource_id)
+                                           for resource_id, rank in ranks.items()))
+            return [search_result(self._rows[key[3]], key[0]) for key in best]
+
+
+def search_database(query, limit=DEFAULT_LIMIT):
+    """
+    Index-less search, ranked like the in-memory index. Prefix matches are range scans of the
+    ix_resources_name_lower / ix_resources_ip_address_lower indexes; substring matches need a table
+    scan, so they (and word matches) are only looked for when the prefix matches do not fill limit.
+
+    That scan returns every row containing the query, in (length, name, id) order: the ranked
+    order within word matches and within substring matches. Rows match_rank rejects (mid-word
+    hits of queries under three characters) are skipped, and the scan stops once enough word
+    matches, which outrank every substring match, have been seen.
+    """
+    query = normalize(query)
+    if not query:
+        return []
+    name, ip_address = func.lower(Resource.name), func.lower(Resource.ip_address)
+    upper = query + '\U0010ffff'
+    rows = db.session.execute(
+        select(*COLUMNS)
+        .where(or_(and_(name >= query, name < upper), and_(ip_address >= query, ip_address < upper)))
+        .order_by(func.length(Resource.name), name, Resource.id)
+        .limit(limit)
+    ).all()
+    rows = [tuple(row) for row in rows]
+    needed = limit - len(rows)
+    if needed > 0:
+        found = [row[0] for row in rows]
+        result = db.session.execute(
+            select(*COLUMNS)
+            .where(or_(name.contains(query, autoescape=True), ip_address.contains(query, autoescape=True)),
+                   Resource.id.not_in(found))
+            .order_by(func.length(Resource.name), name, Resource.id)
+            .execution_options(yield_per=max(needed, 100))
+        )
+        word_matches = substring_matches = 0
+        try:
+            for row in result:
+                rank = match_rank(query, normalize(row[1]), normalize(row[2]))
+                if rank == 2:
+                    word_matches += 1
+                elif rank == 3 and substring_matches < needed:
+                    substring_matches += 1
+                else:
+                    continue
+                rows.append(tuple(row))
+                if word_matches >= needed:
+                    break
+        finally:
+            result.close()
+    return ranked(query, rows, limit)
+
+
+resource_search_index = ResourceSearchIndex()
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_resource_writes(session, flush_context):
+    pending = session.info.setdefault('resource_search', {})
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, Resource):
+            pending[obj.id] = (obj.id, obj.name, obj.ip_address, obj.ssh_port, obj.web_port)
+    for obj in session.deleted:
+        if isinstance(obj, Resource):
+            pending[obj.id] = None
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _note_bulk_resource_write(orm_execute_state):
+    # insert(Resource.__table__) and friends bypass the flush; rebuild rather than guess
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        table = getattr(orm_execute_state.statement, 'table', None)
+        if table is not None and table.name == Resource.__tablename__:
+            orm_execute_state.session.info['resource_search_rebuild'] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_resource_writes(session):
+    pending = session.info.pop('resource_search', None)
+    if session.info.pop('resource_search_rebuild', False):
+        resource_search_index.invalidate()
+        return
+    for resource_id, row in (pending or {}).items():
+        if row is None:
+            resource_search_index.remove(resource_id)
+        else:
+            resource_search_index.add(row)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_resource_writes(session):
+    session.info.pop('resource_search', None)
+    session.info.pop('resource_search_rebuild', None)
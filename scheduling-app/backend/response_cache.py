@@ -0,0 +1,175 @@
+import threading
+import uuid
+from collections import OrderedDict
+from functools import wraps
+from itertools import chain
+
+from flask import Response, current_app, request
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from serialization import wants_msgpack
+
+# Response headers kept with a cached body
+CACHED_HEADERS = ('X-Change-Seq', 'Vary')
+
+# Tables that no conditional_get endpoint reads, so writing them leaves ETags valid: the health
+# prober rewrites resource_status every cycle, and /resources/status is served without an ETag.
+UNVERSIONED_TABLES = frozenset({'resource_status'})
+
+
+class DataVersion:
+    """
+    Counter bumped after every committed write made through this process.
+
+    ETags combine it with a per-process boot id, so a tag issued before a restart can never
+    match a response built afterwards.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.boot_id = uuid.uuid4().hex[:12]
+        self.value = 0
+
+    def bump(self):
+        with self._lock:
+            self.value += 1
+
+    def etag(self, version=None):
+        return f'{self.boot_id}-{self.value if version is None else version}'
+
+
+class ResponseCache:
+    """Bounded LRU of serialized response bodies, each tagged with the data version it was built at."""
+
+    def __init__(self, max_entries=256):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.max_entries = max_entries
+
+    def get(self, key, version):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key, version, body, mimetype, headers):
+        with self._lock:
+            self._entries[key] = (version, body, mimetype, headers)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+data_version = DataVersion()
+response_cache = ResponseCache()
+
+
+def _is_versioned(table):
+    return getattr(table, 'name', None) not in UNVERSIONED_TABLES
+
+
+@event.listens_for(Session, 'after_flush')
+def _note_flush(session, flush_context):
+    if any(_is_versioned(type(instance).__table__)
+           for instance in chain(session.new, session.dirty, session.deleted)):
+        session.info['data_changed'] = True
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _note_bulk_write(orm_execute_state):
+    if ((orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete)
+            and _is_versioned(orm_execute_state.statement.table)):
+        orm_execute_state.session.info['data_changed'] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _bump_on_commit(session):
+    if session.info.pop('data_changed', False):
+        data_version.bump()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_on_rollback(session):
+    session.info.pop('data_changed', None)
+
+
+def _not_modified(etag):
+    response = Response(status=304)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+def _cached_response(etag, body, mimetype, headers):
+    response = Response(body, mimetype=mimetype)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers.update(headers)
+    return response
+
+
+def conditional_get(view):
+    """
+    Serves a GET view with ETag / If-None-Match support and a response cache that expires on the
+    next write (see DataVersion). A matching If-None-Match gets a 304 and a cached body is replayed
+    as-is; neither touches the database. Streamed bodies are cached only up to
+    RESPONSE_CACHE_MAX_BODY_BYTES; larger ones keep streaming and are rebuilt each time.
+    MessagePack and JSON representations are cached and tagged separately. If-None-Match is
+    compared weakly, since compression (see compression.py) turns ETags weak.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not current_app.config.get('RESPONSE_CACHE_ENABLED'):
+            return view(*args, **kwargs)
+
+        version = data_version.value
+        representation = 'msgpack' if wants_msgpack() else 'json'
+        etag = data_version.etag(version) + ('-msgpack' if representation == 'msgpack' else '')
+        if request.if_none_match.contains_weak(etag):
+            return _not_modified(etag)
+
+        key = (request.path, request.query_string, representation)
+        entry = response_cache.get(key, version)
+        if entry is not None:
+            _, body, mimetype, headers = entry
+            return _cached_response(etag, body, mimetype, headers)
+
+        response = current_app.make_response(view(*args, **kwargs))
+        if response.status_code != 200:
+            return response
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'no-cache'
+        headers = {name: response.headers[name] for name in CACHED_HEADERS if name in response.headers}
+        max_bytes = current_app.config.get('RESPONSE_CACHE_MAX_BODY_BYTES', 8 * 1024 * 1024)
+
+        if not response.is_streamed:
+            body = response.get_data()
+            if len(body) <= max_bytes:
+                response_cache.put(key, version, body, response.mimetype, headers)
+            return response
+
+        # Buffer the stream up to the size limit: small bodies are cached, large ones resume streaming.
+        chunks = iter(response.response)
+        buffered, size = [], 0
+        for chunk in chunks:
+            chunk = chunk.encode() if isinstance(chunk, str) else chunk
+            buffered.append(chunk)
+            size += len(chunk)
+            if size > max_bytes:
+                def resume():
+                    yield from buffered
+                    yield from chunks
+                response.response = resume()
+                return response
+        body = b''.join(buffered)
+        response_cache.put(key, version, body, response.mimetype, headers)
+        return _cached_response(etag, body, response.mimetype, headers)
+
+    return wrapper
@@ -1,6 +1,28 @@
-from flask import Blueprint, jsonify, request
-from models import Resource, Reservation, db
+import json
+
+from flask import Blueprint, current_app, jsonify, request
+from models import Resource, Reservation, ReservationArchive, ReservationSeries, ReservationSeriesException, db, \
+    parse_iso_datetime, isoformat_utc
+from reservation_index import reservation_index
+from slots import SEARCH_MODES, candidate_resource_ids, earliest_slots, all_free_gaps, resources_free_for_window
+from events import event_publisher
+from outbox import enqueue_event
+from response_cache import conditional_get
+from engine_profiles import read_replica
+from pagination import is_paginated, page_size, after_resource_cursor, after_reservation_cursor, page_response, page_rows
+from serialization import (RESOURCE_COLUMNS, RESERVATION_COLUMNS, YIELD_PER, ColumnarReservations, msgpack_response,
+                           resource_json, reservation_json, stream_json_array, wants_msgpack)
+from changes import record_change, record_series_change, latest_seq, changes_since
+from booking import book, book_batch, book_group, book_series, BatchItem, ResourceNotFound, ReservationConflict, StaleRead
+from archive import ARCHIVE_COLUMNS, utcnow
+from series import Rule, occurrences_in_window, occurrence_dict, series_scope
+from occupancy import occupancy_cache, occupancy_matrix
+from health import load_statuses
+from resource_cache import resource_cache
+from resource_search import DEFAULT_LIMIT as SEARCH_DEFAULT_LIMIT, MAX_LIMIT as SEARCH_MAX_LIMIT, \
+    resource_search_index, search_database
 from datetime import datetime, timedelta
+from sqlalchemy import union_all
 from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 
 routes = Blueprint('routes', __name__)
@@ -11,25 +33,239 @@ def init_routes(app, app_db, app_socketio):
     """Initializes the routes blueprint and registers it with the Flask app."""
     global socketio_instance
     socketio_instance = app_socketio
+    event_publisher.init_app(app, app_socketio)
     app.register_blueprint(routes)
 
+def reservation_index_enabled():
+    """Whether conflict checks and availability lookups are served by the in-memory interval index."""
+    if not current_app.config.get('RESERVATION_INDEX_ENABLED'):
+        return False
+    reservation_index.ensure_built()
+    return True
+
+class InvalidReservationRequest(ValueError):
+    pass
+
+def parse_reservation_request(data):
+    """
+    Validates a ReservationRequest body.
+    Returns (resource_id, start_time, end_time, description); raises InvalidReservationRequest.
+    """
+    if not isinstance(data, dict):
+        raise InvalidReservationRequest('Request body must be a JSON object')
+    resource_id = data.get('resource_id')
+    start_time_str = data.get('start_time')
+    duration_minutes_str = data.get('duration_minutes') # Keep as string initially for int conversion
+    description = data.get('description')
+
+    if not all([resource_id, start_time_str, duration_minutes_str]):
+        raise InvalidReservationRequest('Missing data: resource_id, start_time, or duration_minutes')
+
+    try:
+        resource_id = int(resource_id)
+        start_time = parse_iso_datetime(start_time_str)
+        duration_minutes = int(duration_minutes_str) # Convert to int
+    except (TypeError, ValueError) as e:
+        raise InvalidReservationRequest(f'Invalid data format: {e}')
+    if duration_minutes <= 0:
+        raise InvalidReservationRequest('Duration must be positive')
+    end_time = start_time + timedelta(minutes=duration_minutes)
+    return resource_id, start_time, end_time, description
+
+def parse_series_request(data):
+    """
+    Validates a SeriesRequest body: a ReservationRequest for the first occurrence plus `rrule`
+    and optional `exdates`. Returns (resource_id, rule, description, excluded starts);
+    raises InvalidReservationRequest.
+    """
+    resource_id, start_time, end_time, description = parse_reservation_request(data)
+    try:
+        rule = Rule.parse(data.get('rrule'), start_time, end_time - start_time)
+        excluded = [parse_iso_datetime(value) for value in data.get('exdates') or []]
+    except (AttributeError, TypeError, ValueError) as e:
+        raise InvalidReservationRequest(f'Invalid recurrence: {e}')
+    for moment in excluded:
+        if not rule.is_occurrence(moment):
+            raise InvalidReservationRequest(f'{isoformat_utc(moment)} is not an occurrence of the series')
+    return resource_id, rule, description, excluded
+
+def parse_window_args(args):
+    """
+    Reads the optional `start`, `end` and `resource_ids` query parameters.
+    Returns (start, end, resource_ids); raises ValueError on malformed input.
+    """
+    start_str = args.get('start')
+    end_str = args.get('end')
+    resource_ids_str = args.get('resource_ids')
+
+    start = parse_iso_datetime(start_str) if start_str else None
+    end = parse_iso_datetime(end_str) if end_str else None
+    if start and end and end <= start:
+        raise ValueError('end must be after start')
+
+    resource_ids = None
+    if resource_ids_str:
+        resource_ids = [int(part) for part in resource_ids_str.split(',') if part.strip()]
+    return start, end, resource_ids
+
+def get_resource(resource_id):
+    """Returns the Resource dict for resource_id, or None, through the resource cache when it is enabled."""
+    if current_app.config.get('RESOURCE_CACHE_ENABLED'):
+        return resource_cache.get(resource_id)
+    resource = db.session.get(Resource, resource_id)
+    return resource.to_dict() if resource is not None else None
+
+def stale_read_response():
+    """Concurrent bookings kept invalidating our conflict check for BOOKING_MAX_ATTEMPTS attempts."""
+    return jsonify({'error': 'Reservations kept conflicting with concurrent bookings; nothing was booked. '
+                             'Retry the request.'}), 503, {'Retry-After': '1'}
+
+def parse_flag(args, name):
+    return args.get(name, 'false').lower() in ('1', 'true', 'yes')
+
+def filter_reservations_by_window(query, start, end, resource_ids=None, model=Reservation):
+    """
+    Restricts a query or select() over model (Reservation or ReservationArchive) to rows
+    overlapping [start, end) on the given resources.
+    """
+    if resource_ids is not None:
+        query = query.filter(model.resource_id.in_(resource_ids))
+    if end is not None:
+        query = query.filter(model.start_time < end)
+    if start is not None:
+        query = query.filter(model.end_time > start)
+    return query
+
+def reservation_rows(start, end, resource_ids, include_archived=False):
+    """
+    Returns (select, start_time column, id column) for reservation rows in the window, as
+    RESERVATION_COLUMNS; with include_archived, reservations_archive rows are unioned in.
+    """
+    statement = filter_reservations_by_window(db.select(*RESERVATION_COLUMNS), start, end, resource_ids)
+    if not include_archived:
+        return statement, Reservation.start_time, Reservation.id
+    archived = filter_reservations_by_window(db.select(*ARCHIVE_COLUMNS), start, end, resource_ids,
+                                             model=ReservationArchive)
+    rows = union_all(statement, archived).subquery()
+    return db.select(*rows.c), rows.c.start_time, rows.c.id
+
 @routes.route('/resources', methods=['GET'])
+@read_replica
+@conditional_get
 def get_resources():
     """
-    Get all resources
+    Get all resources, or one page of them
+    ---
+    parameters:
+      - name: limit
+        in: query
+        type: integer
+        required: false
+        description: Page size (capped at MAX_PAGE_SIZE). Passing limit or cursor switches to a paged response.
+      - name: cursor
+        in: query
+        type: string
+        required: false
+        description: Opaque next_cursor value from the previous page
+    responses:
+      200:
+        description: >
+          A list of resources ordered by id; with limit/cursor, an object
+          {"items": [...], "next_cursor": "..."} where next_cursor is null on the last page
+        schema:
+          type: array
+          items:
+            $ref: '#/definitions/Resource'
+      400:
+        description: Invalid limit or cursor
+    """
+    if not is_paginated(request.args):
+        body = resource_cache.snapshot_body() if current_app.config.get('RESOURCE_CACHE_ENABLED') else None
+        if body is not None:
+            return current_app.response_class(body, mimetype='application/json')
+        return stream_json_array(db.select(*RESOURCE_COLUMNS).order_by(Resource.id), resource_json)
+
+    try:
+        limit = page_size(request.args)
+        statement = after_resource_cursor(db.select(*RESOURCE_COLUMNS), request.args.get('cursor'), Resource.id)
+    except ValueError as e:
+        return jsonify({'error': f'Invalid query parameters: {e}'}), 400
+    return page_response(statement, limit, resource_json, lambda row: row[0])
+
+@routes.route('/resources/search', methods=['GET'])
+@read_replica
+def search_resources():
+    """
+    Type-ahead search of resources by name or IP address
     ---
+    parameters:
+      - name: q
+        in: query
+        type: string
+        required: true
+        description: Case-insensitive text to look for
+      - name: limit
+        in: query
+        type: integer
+        required: false
+        description: Largest number of results (default 20, at most 100)
     responses:
       200:
-        description: A list of resources
+        description: >
+          Matching resources, best first: the whole name or address (match "exact"), a prefix of
+          it ("prefix"), a prefix of a word of the name ("word"), then any other substring
+          ("substring", three or more characters); ties go to the shorter name. Each item is a
+          Resource plus its match.
         schema:
           type: array
           items:
             $ref: '#/definitions/Resource'
+      400:
+        description: Invalid limit
+    """
+    try:
+        limit = int(request.args.get('limit', SEARCH_DEFAULT_LIMIT))
+        if limit < 1:
+            raise ValueError('limit must be positive')
+    except ValueError as e:
+        return jsonify({'error': f'Invalid query parameters: {e}'}), 400
+    query, limit = request.args.get('q', ''), min(limit, SEARCH_MAX_LIMIT)
+    if current_app.config.get('RESOURCE_SEARCH_INDEX_ENABLED'):
+        resource_search_index.ensure_built(current_app.config.get('RESOURCE_SEARCH_REFRESH_SECONDS'))
+        return jsonify(resource_search_index.search(query, limit))
+    return jsonify(search_database(query, limit))
+
+@routes.route('/resources/status', methods=['GET'])
+@read_replica
+def get_resource_statuses():
     """
-    resources = Resource.query.all()
-    return jsonify([resource.to_dict() for resource in resources])
+    Reachability of the resources' SSH and web ports, as last seen by the health prober
+    ---
+    parameters:
+      - name: resource_ids
+        in: query
+        type: string
+        required: false
+        description: Comma-separated list of resource IDs; all resources when omitted
+    responses:
+      200:
+        description: >
+          One entry per resource in id order: status (up, degraded, down or unknown), ssh and web
+          ({"reachable", "latency_ms"}, null when the port is not configured), checked_at, changed_at
+          and error. Results older than HEALTH_STATUS_TTL_SECONDS are reported as unknown with stale set.
+      400:
+        description: Invalid query parameters
+    """
+    try:
+        _, _, resource_ids = parse_window_args(request.args)
+    except ValueError as e:
+        return jsonify({'error': f'Invalid query parameters: {e}'}), 400
+    ttl = timedelta(seconds=current_app.config.get('HEALTH_STATUS_TTL_SECONDS', 90))
+    return jsonify(load_statuses(resource_ids, ttl))
 
 @routes.route('/resources/<int:resource_id>', methods=['GET'])
+@read_replica
+@conditional_get
 def get_resource_details(resource_id):
     """
     Get a specific resource by ID
@@ -48,10 +284,10 @@ def get_resource_details(resource_id):
       404:
         description: Resource not found
     """
-    resource = Resource.query.get(resource_id)
+    resource = get_resource(resource_id)
     if not resource:
         return jsonify({'error': 'Resource not found'}), 404
-    return jsonify(resource.to_dict())
+    return jsonify(resource)
 
 @routes.route('/reserve', methods=['POST'])
 def reserve_resource():
@@ -78,49 +314,19 @@ def reserve_resource():
       500:
         description: Internal server error
     """
-    data = request.json
-    resource_id = data.get('resource_id')
-    start_time_str = data.get('start_time')
-    duration_minutes_str = data.get('duration_minutes') # Keep as string initially for int conversion
-    description = data.get('description')
-
-    if not all([resource_id, start_time_str, duration_minutes_str]):
-        return jsonify({'error': 'Missing data: resource_id, start_time, or duration_minutes'}), 400
-
     try:
-        start_time = datetime.fromisoformat(start_time_str.replace('Z', '+00:00'))
-        duration_minutes = int(duration_minutes_str) # Convert to int
-        if duration_minutes <= 0:
-            return jsonify({'error': 'Duration must be positive'}), 400
-        end_time = start_time + timedelta(minutes=duration_minutes)
-    except ValueError as e:
-        return jsonify({'error': f'Invalid data format: {e}'}), 400
-
-    resource = Resource.query.get(resource_id)
-    if not resource:
-        return jsonify({'error': 'Resource not found'}), 404
-
-    overlapping = Reservation.query.filter(
-        Reservation.resource_id == resource_id,
-        Reservation.start_time < end_time,
-        Reservation.end_time > start_time
-    ).first()
-
-    if overlapping:
-        return jsonify({'error': 'Time slot is already reserved or overlaps with an existing reservation'}), 409
+        resource_id, start_time, end_time, description = parse_reservation_request(request.json)
+    except InvalidReservationRequest as e:
+        return jsonify({'error': str(e)}), 400
 
     try:
-        reservation = Reservation(
-            resource_id=resource_id,
-            start_time=start_time,
-            end_time=end_time,
-            description=description
-        )
-        db.session.add(reservation)
-        db.session.commit()
-        if socketio_instance: # Use the stored socketio_instance
-            socketio_instance.emit('reservation_update', {'action': 'created', 'reservation': reservation.to_dict()})
+        reservation, _ = book(resource_id, start_time, end_time, description,
+                              use_index=reservation_index_enabled())
         return jsonify(reservation.to_dict()), 201
+    except ResourceNotFound:
+        return jsonify({'error': 'Resource not found'}), 404
+    except ReservationConflict:
+        return jsonify({'error': 'Time slot is already reserved or overlaps with an existing reservation'}), 409
     except IntegrityError:
         db.session.rollback()
         return jsonify({'error': 'Database integrity error. Perhaps the resource ID does not exist?'}), 400
@@ -133,23 +339,342 @@ def reserve_resource():
         # Consider using current_app.logger.error
         return jsonify({'error': 'An unexpected error occurred.'}), 500
 
+@routes.route('/reserve/batch', methods=['POST'])
+def reserve_batch():
+    """
+    Reserve many resource slots in one transaction
+    ---
+    parameters:
+      - name: body
+        in: body
+        required: true
+        schema:
+          type: object
+          required:
+            - reservations
+          properties:
+            reservations:
+              type: array
+              items:
+                $ref: '#/definitions/ReservationRequest'
+            mode:
+              type: string
+              enum: [all_or_nothing, best_effort]
+              default: all_or_nothing
+              description: all_or_nothing books every item or none; best_effort books every item that does not conflict
+    responses:
+      200:
+        description: Best-effort batch processed; per-item results in request order
+      201:
+        description: All reservations created; per-item results in request order
+      400:
+        description: Invalid request data (all_or_nothing) or batch too large
+      409:
+        description: At least one item failed and nothing was booked (all_or_nothing)
+      500:
+        description: Internal server error
+      503:
+        description: Concurrent bookings kept racing this batch; nothing was booked, retry after Retry-After seconds
+    """
+    data = request.json or {}
+    requested = data.get('reservations')
+    mode = data.get('mode', 'all_or_nothing')
+    if not isinstance(requested, list) or not requested:
+        return jsonify({'error': 'Missing data: reservations must be a non-empty list'}), 400
+    if mode not in ('all_or_nothing', 'best_effort'):
+        return jsonify({'error': 'mode must be all_or_nothing or best_effort'}), 400
+    max_size = current_app.config.get('BATCH_MAX_SIZE', 1000)
+    if len(requested) > max_size:
+        return jsonify({'error': f'A batch may contain at most {max_size} reservations'}), 400
+
+    items = []
+    for index, entry in enumerate(requested):
+        try:
+            resource_id, start_time, end_time, description = parse_reservation_request(entry)
+            items.append(BatchItem(index, resource_id, start_time, end_time, description))
+        except InvalidReservationRequest as e:
+            item = BatchItem(index, None, None, None)
+            item.reject('invalid', str(e))
+            items.append(item)
+
+    atomic = mode == 'all_or_nothing'
+    try:
+        reservations = book_batch(items, atomic=atomic)
+    except StaleRead:
+        return stale_read_response()
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        return jsonify({'error': 'Could not process reservations due to a database error.'}), 500
+
+    created = [reservation.to_dict() for reservation in reservations]
+    results = [item.to_dict() for item in items]
+    if atomic:
+        if not reservations:
+            status = 400 if any(item.status == 'invalid' for item in items) else 409
+            return jsonify({'error': 'Batch rejected; no reservations were created', 'results': results}), status
+        return jsonify({'created': len(created), 'results': results}), 201
+    return jsonify({'created': len(created), 'failed': len(items) - len(created), 'results': results}), 200
+
+@routes.route('/reserve/group', methods=['POST'])
+def reserve_group():
+    """
+    Reserve several resources for the same time slot, all or none
+    ---
+    parameters:
+      - name: body
+        in: body
+        required: true
+        schema:
+          type: object
+          required:
+            - resource_ids
+            - start_time
+            - duration_minutes
+          properties:
+            resource_ids:
+              type: array
+              items:
+                type: integer
+              description: Resources to reserve together, e.g. a device under test and its traffic generators
+            start_time:
+              type: string
+              format: date-time
+            duration_minutes:
+              type: integer
+            description:
+              type: string
+              nullable: true
+    responses:
+      201:
+        description: Every resource reserved; the reservations share group_id
+      400:
+        description: Invalid request data
+      404:
+        description: A resource was not found; nothing was booked
+      409:
+        description: A resource is already reserved in the slot; nothing was booked
+      500:
+        description: Internal server error
+      503:
+        description: Concurrent bookings kept racing this group; nothing was booked, retry after Retry-After seconds
+    """
+    data = request.json or {}
+    resource_ids = data.get('resource_ids')
+    if not isinstance(resource_ids, list) or not resource_ids:
+        return jsonify({'error': 'Missing data: resource_ids must be a non-empty list'}), 400
+    max_size = current_app.config.get('BATCH_MAX_SIZE', 1000)
+    if len(resource_ids) > max_size:
+        return jsonify({'error': f'A group may contain at most {max_size} resources'}), 400
+    for resource_id in resource_ids:
+        if isinstance(resource_id, bool) or not isinstance(resource_id, int) or resource_id < 1:
+            return jsonify({'error': f'Invalid resource id {resource_id!r}: resource_ids must be positive integers'}), 400
+    if len(set(resource_ids)) != len(resource_ids):
+        return jsonify({'error': 'resource_ids must not repeat a resource'}), 400
+    try:
+        _, start_time, end_time, description = parse_reservation_request({**data, 'resource_id': resource_ids[0]})
+    except InvalidReservationRequest as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        group_id, items = book_group(resource_ids, start_time, end_time, description)
+    except StaleRead:
+        return stale_read_response()
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        return jsonify({'error': 'Could not process reservations due to a database error.'}), 500
+
+    if all(item.status == 'created' for item in items):
+        return jsonify({'group_id': group_id, 'reservations': [item.reservation.to_dict() for item in items]}), 201
+    failed = [{'resource_id': item.resource_id, 'status': item.status, 'error': item.error}
+              for item in items if item.status != 'skipped']
+    status = 404 if any(item.status == 'not_found' for item in items) else 409
+    return jsonify({'error': 'Group rejected; no reservations were created', 'failed': failed}), status
+
+@routes.route('/reservations/groups/<group_id>', methods=['GET'])
+def get_reservation_group(group_id):
+    """
+    Get the reservations of a group reservation
+    ---
+    parameters:
+      - name: group_id
+        in: path
+        type: string
+        required: true
+    responses:
+      200:
+        description: The group's reservations, by resource id
+        schema:
+          type: array
+          items:
+            $ref: '#/definitions/Reservation'
+      404:
+        description: No reservation belongs to this group (or all of them were cancelled or archived)
+    """
+    reservations = Reservation.query.filter_by(group_id=group_id).order_by(Reservation.resource_id).all()
+    if not reservations:
+        return jsonify({'error': 'Group not found'}), 404
+    return jsonify([reservation.to_dict() for reservation in reservations])
+
 @routes.route('/reservations', methods=['GET'])
+@read_replica
+@conditional_get
 def get_reservations():
     """
-    Get all reservations
+    Get reservations, optionally limited to a time window and a set of resources
     ---
+    produces:
+      - application/json
+      - application/msgpack
+    parameters:
+      - name: start
+        in: query
+        type: string
+        format: date-time
+        required: false
+        description: Only return reservations ending after this time (ISO 8601)
+      - name: end
+        in: query
+        type: string
+        format: date-time
+        required: false
+        description: Only return reservations starting before this time (ISO 8601)
+      - name: resource_ids
+        in: query
+        type: string
+        required: false
+        description: Comma-separated list of resource IDs to restrict the results to
+      - name: limit
+        in: query
+        type: integer
+        required: false
+        description: Page size (capped at MAX_PAGE_SIZE). Passing limit or cursor switches to a paged response.
+      - name: cursor
+        in: query
+        type: string
+        required: false
+        description: Opaque next_cursor value from the previous page
+      - name: include_archived
+        in: query
+        type: boolean
+        required: false
+        description: Also return reservations moved to reservations_archive (history queries)
     responses:
       200:
-        description: A list of all reservations
+        description: >
+          A list of reservations overlapping the requested window. When both start and end are
+          given, occurrences of recurring series in the window follow, with a null id and their
+          series_id. With limit/cursor (stored reservations only), an object
+          {"items": [...], "next_cursor": "..."} ordered by (start_time, id), where next_cursor is null on the last page.
+          With Accept: application/msgpack, the same reservations in columnar form (parallel id, resource_id,
+          start, end, description and series_id arrays, times in epoch seconds) encoded as MessagePack
         schema:
           type: array
           items:
             $ref: '#/definitions/Reservation'
+      400:
+        description: Invalid query parameters
     """
-    reservations = Reservation.query.all()
-    return jsonify([reservation.to_dict() for reservation in reservations])
+    try:
+        start, end, resource_ids = parse_window_args(request.args)
+    except ValueError as e:
+        return jsonify({'error': f'Invalid query parameters: {e}'}), 400
+
+    # Read the change cursor before the rows: a change racing this read is then replayed, never missed.
+    seq = latest_seq()
+    statement, start_column, id_column = reservation_rows(start, end, resource_ids,
+                                                          parse_flag(request.args, 'include_archived'))
+    if is_paginated(request.args):
+        try:
+            limit = page_size(request.args)
+            statement = after_reservation_cursor(statement, request.args.get('cursor'), start_column, id_column)
+        except ValueError as e:
+            return jsonify({'error': f'Invalid query parameters: {e}'}), 400
+        cursor_key = lambda row: [row[2].isoformat(), row[0]]
+        if wants_msgpack():
+            rows, next_cursor = page_rows(statement, limit, cursor_key)
+            response = msgpack_response({'items': ColumnarReservations().add_rows(rows).to_dict(),
+                                         'next_cursor': next_cursor})
+        else:
+            response = page_response(statement, limit, reservation_json, cursor_key)
+    else:
+        occurrences = []
+        if start is not None and end is not None:
+            occurrences = occurrences_in_window(resource_ids, start, end)
+        if wants_msgpack():
+            columns = ColumnarReservations().add_rows(db.session.execute(statement.execution_options(yield_per=YIELD_PER)))
+            response = msgpack_response(columns.add_occurrences(occurrences).to_dict())
+        else:
+            response = stream_json_array(statement, reservation_json,
+                                         extra=[json.dumps(occurrence_dict(*occurrence)) for occurrence in occurrences])
+    response.headers['X-Change-Seq'] = str(seq)
+    response.vary.add('Accept')
+    return response
+
+@routes.route('/reservations/changes', methods=['GET'])
+def get_reservation_changes():
+    """
+    Get reservation changes after a change cursor
+    ---
+    parameters:
+      - name: since
+        in: query
+        type: integer
+        required: true
+        description: Last change seq the client has applied (X-Change-Seq of a full load, or the seq of a socket event)
+      - name: limit
+        in: query
+        type: integer
+        required: false
+        description: Maximum number of changes to return
+    responses:
+      200:
+        description: >
+          Changes in seq order. When resync_required is true the requested changes are no
+          longer retained and the client must reload /reservations.
+        schema:
+          type: object
+          properties:
+            changes:
+              type: array
+              items:
+                type: object
+                properties:
+                  seq:
+                    type: integer
+                  action:
+                    type: string
+                    enum: [created, deleted, released, series_created, series_updated, series_deleted]
+                  reservation:
+                    $ref: '#/definitions/Reservation'
+                  series_id:
+                    type: integer
+                    description: Set instead of reservation for series changes; reload the window to apply them
+            latest_seq:
+              type: integer
+            has_more:
+              type: boolean
+            resync_required:
+              type: boolean
+      400:
+        description: Invalid query parameters
+    """
+    since = request.args.get('since', type=int)
+    if since is None or since < 0:
+        return jsonify({'error': 'Invalid query parameters: since must be a non-negative integer'}), 400
+    max_limit = current_app.config.get('CHANGES_MAX_LIMIT', 1000)
+    limit = max(1, min(request.args.get('limit', max_limit, type=int), max_limit))
+
+    changes, resync_required = changes_since(since, limit + 1)
+    return jsonify({
+        'changes': [change.to_dict() for change in changes[:limit]],
+        'latest_seq': latest_seq(),
+        'has_more': len(changes) > limit,
+        'resync_required': resync_required
+    })
 
 @routes.route('/availability/<int:resource_id>', methods=['GET'])
+@read_replica
+@conditional_get
 def check_availability(resource_id):
     """
     Check availability for a resource
@@ -160,9 +685,28 @@ def check_availability(resource_id):
         type: integer
         required: true
         description: The ID of the resource to check availability for
+      - name: start
+        in: query
+        type: string
+        format: date-time
+        required: false
+        description: Only return reservations ending after this time (ISO 8601)
+      - name: end
+        in: query
+        type: string
+        format: date-time
+        required: false
+        description: Only return reservations starting before this time (ISO 8601)
+      - name: include_archived
+        in: query
+        type: boolean
+        required: false
+        description: Also return reservations moved to reservations_archive
     responses:
       200:
-        description: Availability information for the resource
+        description: >
+          Availability information for the resource; when both start and end are given, the
+          reservations include occurrences of recurring series (null id, with a series_id)
         schema:
           type: object
           properties:
@@ -174,20 +718,200 @@ def check_availability(resource_id):
               type: array
               items:
                 $ref: '#/definitions/Reservation'
+      400:
+        description: Invalid query parameters
       404:
         description: Resource not found
     """
-    resource = Resource.query.get(resource_id)
-    if not resource:
+    try:
+        start, end, _ = parse_window_args(request.args)
+    except ValueError as e:
+        return jsonify({'error': f'Invalid query parameters: {e}'}), 400
+
+    if not get_resource(resource_id):
         return jsonify({'error': 'Resource not found'}), 404
 
-    reservations = Reservation.query.filter_by(resource_id=resource_id).all()
+    if reservation_index_enabled():
+        reservations = reservation_index.overlapping(resource_id, start, end)
+    else:
+        reservations = [r.to_dict() for r in filter_reservations_by_window(Reservation.query, start, end, [resource_id])]
+    if parse_flag(request.args, 'include_archived'):
+        archived = filter_reservations_by_window(ReservationArchive.query, start, end, [resource_id],
+                                                 model=ReservationArchive)
+        reservations = sorted(reservations + [r.to_dict() for r in archived], key=lambda r: (r['start_time'], r['id']))
+    if start is not None and end is not None:
+        occurrences = [occurrence_dict(*occurrence) for occurrence in occurrences_in_window([resource_id], start, end)]
+        if occurrences:
+            reservations = sorted(reservations + occurrences, key=lambda r: r['start_time'])
     return jsonify({
         'resource_id': resource_id,
-        'message': 'This endpoint provides raw reservation data. Availability is best checked on the client or via a more specific query.',
-        'reservations': [r.to_dict() for r in reservations]
+        'message': 'This endpoint provides raw reservation data. Use /availability/free-slots to search for free slots.',
+        'reservations': reservations
     })
 
+@routes.route('/availability/free-slots', methods=['GET'])
+@read_replica
+def search_free_slots():
+    """
+    Search free slots across resources
+    ---
+    parameters:
+      - name: start
+        in: query
+        type: string
+        format: date-time
+        required: true
+        description: Start of the search window (ISO 8601)
+      - name: end
+        in: query
+        type: string
+        format: date-time
+        required: true
+        description: End of the search window (ISO 8601)
+      - name: duration_minutes
+        in: query
+        type: integer
+        required: false
+        description: Required slot length in minutes (ignored by whole_window mode)
+      - name: resource_ids
+        in: query
+        type: string
+        required: false
+        description: Comma-separated list of resource IDs to search; all resources when omitted
+      - name: mode
+        in: query
+        type: string
+        enum: [earliest, all, whole_window]
+        default: earliest
+        required: false
+        description: >
+          earliest returns the earliest free slot per resource, ordered by start time;
+          all returns every free gap of at least duration_minutes per resource;
+          whole_window returns resources free for the entire window
+      - name: limit
+        in: query
+        type: integer
+        required: false
+        description: Maximum number of resources in the result
+    responses:
+      200:
+        description: Free slots computed on the server
+      400:
+        description: Invalid query parameters
+    """
+    try:
+        start, end, resource_ids = parse_window_args(request.args)
+        if start is None or end is None:
+            raise ValueError('start and end are required')
+        mode = request.args.get('mode', 'earliest')
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"mode must be one of {', '.join(SEARCH_MODES)}")
+        limit = request.args.get('limit')
+        if limit is not None:
+            limit = int(limit) if limit.isdigit() else 0
+            if limit < 1:
+                raise ValueError('limit must be a positive integer')
+        duration = None
+        if mode != 'whole_window':
+            duration_minutes = int(request.args.get('duration_minutes', ''))
+            if duration_minutes <= 0:
+                raise ValueError('duration_minutes must be positive')
+            duration = timedelta(minutes=duration_minutes)
+    except ValueError as e:
+        return jsonify({'error': f'Invalid query parameters: {e}'}), 400
+
+    candidates = candidate_resource_ids(resource_ids)
+    response = {'start': isoformat_utc(start), 'end': isoformat_utc(end), 'mode': mode}
+    if mode == 'earliest':
+        response['slots'] = [
+            {'resource_id': resource_id, 'start_time': isoformat_utc(slot_start), 'end_time': isoformat_utc(slot_end)}
+            for resource_id, slot_start, slot_end in earliest_slots(candidates, start, end, duration, limit)
+        ]
+    elif mode == 'all':
+        response['resources'] = [
+            {'resource_id': resource_id,
+             'free': [{'start_time': isoformat_utc(gap_start), 'end_time': isoformat_utc(gap_end)} for gap_start, gap_end in gaps]}
+            for resource_id, gaps in all_free_gaps(candidates, start, end, duration, limit)
+        ]
+    else:
+        response['resource_ids'] = resources_free_for_window(candidates, start, end, limit)
+    return jsonify(response)
+
+@routes.route('/occupancy', methods=['GET'])
+@read_replica
+def get_occupancy():
+    """
+    Occupancy matrix of the schedule grid
+    ---
+    parameters:
+      - name: start
+        in: query
+        type: string
+        format: date-time
+        required: true
+        description: Start of the first slot (ISO 8601)
+      - name: end
+        in: query
+        type: string
+        format: date-time
+        required: true
+        description: End of the window (ISO 8601); the last slot may run past it
+      - name: slot_minutes
+        in: query
+        type: integer
+        required: false
+        default: 30
+        description: Slot size in minutes
+      - name: resource_ids
+        in: query
+        type: string
+        required: false
+        description: Comma-separated list of resource IDs; all resources when omitted
+    responses:
+      200:
+        description: >
+          {"start", "end", "slot_minutes", "slots", "resources": {resource_id: [[first_slot, slot_count, key], ...]},
+          "reservations": {key: Reservation}}. A slot is covered by a reservation when the slot's start lies
+          inside it. key is the reservation id, or "<series_id>@<start_time>" for an occurrence of a series;
+          resources without reservations in the window are left out. X-Change-Seq gives the change cursor.
+      400:
+        description: Invalid query parameters
+    """
+    try:
+        start, end, resource_ids = parse_window_args(request.args)
+        if start is None or end is None:
+            raise ValueError('start and end are required')
+        slot_minutes = int(request.args.get('slot_minutes', 30))
+        if slot_minutes <= 0:
+            raise ValueError('slot_minutes must be positive')
+        slot = timedelta(minutes=slot_minutes)
+        slot_count = -((start - end) // slot)
+        max_slots = current_app.config.get('OCCUPANCY_MAX_SLOTS', 2016)
+        if slot_count > max_slots:
+            raise ValueError(f'the window may span at most {max_slots} slots')
+    except ValueError as e:
+        return jsonify({'error': f'Invalid query parameters: {e}'}), 400
+
+    use_cache = current_app.config.get('OCCUPANCY_CACHE_ENABLED', True)
+    key = (start, end, slot_minutes, tuple(sorted(set(resource_ids))) if resource_ids is not None else None)
+    cached = occupancy_cache.get(key) if use_cache else None
+    if cached is not None:
+        body, seq = cached
+    else:
+        seq = latest_seq()  # Before the rows, as in get_reservations
+        statement, _, _ = reservation_rows(start, end, resource_ids, include_archived=start < utcnow())
+        matrix = occupancy_matrix(db.session.execute(statement), occurrences_in_window(resource_ids, start, end),
+                                  start, slot, slot_count)
+        matrix = {'start': isoformat_utc(start), 'end': isoformat_utc(end), 'slot_minutes': slot_minutes,
+                  'slots': slot_count, **matrix}
+        if use_cache:
+            body = occupancy_cache.put(key, seq, matrix, start, end, resource_ids)
+        else:
+            body = json.dumps(matrix, separators=(',', ':'))
+    response = current_app.response_class(body, mimetype='application/json')
+    response.headers['X-Change-Seq'] = str(seq)
+    return response
+
 @routes.route('/reservations/<int:reservation_id>', methods=['DELETE'])
 def delete_reservation(reservation_id):
     """
@@ -211,10 +935,14 @@ def delete_reservation(reservation_id):
         reservation = Reservation.query.get(reservation_id)
         if reservation:
             reservation_data = reservation.to_dict()
+            scope = (reservation.resource_id, reservation.start_time, reservation.end_time)
+            change = record_change('deleted', reservation)
             db.session.delete(reservation)
+            db.session.flush()
+            enqueue_event('reservation_update', {'action': 'deleted', 'seq': change.seq, 'reservation': reservation_data},
+                          [scope])
             db.session.commit()
-            if socketio_instance: # Use the stored socketio_instance
-                socketio_instance.emit('reservation_update', {'action': 'deleted', 'reservation': reservation_data})
+            reservation_index.remove(reservation_id)
             return jsonify({'message': 'Reservation cancelled successfully'}), 200
         else:
             return jsonify({'error': 'Reservation not found'}), 404
@@ -225,4 +953,249 @@ def delete_reservation(reservation_id):
     except Exception as e:
         db.session.rollback()
         # Consider using current_app.logger.error
-        return jsonify({'error': 'An unexpected error occurred.'}), 500
\ No newline at end of file
+        return jsonify({'error': 'An unexpected error occurred.'}), 500
+
+@routes.route('/reservations/<int:reservation_id>/release', methods=['POST'])
+def release_reservation(reservation_id):
+    """
+    End a reservation in progress now, freeing the rest of its slot
+    ---
+    parameters:
+      - name: reservation_id
+        in: path
+        type: integer
+        required: true
+    responses:
+      200:
+        description: The reservation, with end_time moved to now
+        schema:
+          $ref: '#/definitions/Reservation'
+      404:
+        description: Reservation not found
+      409:
+        description: The reservation has not started yet (cancel it instead) or has already ended
+      500:
+        description: Internal server error
+    """
+    reservation = db.session.get(Reservation, reservation_id)
+    if not reservation:
+        return jsonify({'error': 'Reservation not found'}), 404
+    now = utcnow()
+    if reservation.start_time >= now:
+        return jsonify({'error': 'The reservation has not started yet; cancel it instead'}), 409
+    if reservation.end_time <= now:
+        return jsonify({'error': 'The reservation has already ended'}), 409
+
+    try:
+        scope = (reservation.resource_id, reservation.start_time, reservation.end_time)  # Includes the freed part
+        reservation.end_time = now
+        change = record_change('released', reservation)
+        db.session.flush()
+        enqueue_event('reservation_update', {'action': 'released', 'seq': change.seq, 'reservation': reservation.to_dict()},
+                      [scope])
+        db.session.commit()
+    except SQLAlchemyError:
+        db.session.rollback()
+        return jsonify({'error': 'Could not release the reservation due to a database error.'}), 500
+    reservation_index.add(reservation.id, reservation.resource_id, reservation.start_time,
+                          reservation.end_time, reservation.description)
+    return jsonify(reservation.to_dict())
+
+@routes.route('/series', methods=['POST'])
+def create_series():
+    """
+    Reserve a resource on a recurring schedule
+    ---
+    parameters:
+      - name: body
+        in: body
+        required: true
+        schema:
+          $ref: '#/definitions/SeriesRequest'
+    responses:
+      201:
+        description: Series created
+        schema:
+          $ref: '#/definitions/Series'
+      400:
+        description: Invalid request data or recurrence rule
+      404:
+        description: Resource not found
+      409:
+        description: An occurrence overlaps an existing reservation or series
+      500:
+        description: Internal server error
+    """
+    try:
+        resource_id, rule, description, excluded = parse_series_request(request.json)
+    except InvalidReservationRequest as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        series, _ = book_series(resource_id, rule, description, excluded)
+    except ResourceNotFound:
+        return jsonify({'error': 'Resource not found'}), 404
+    except ReservationConflict:
+        return jsonify({'error': 'An occurrence of the series overlaps an existing reservation or series'}), 409
+    except SQLAlchemyError:
+        db.session.rollback()
+        return jsonify({'error': 'Could not process the series due to a database error.'}), 500
+    return jsonify(series.to_dict()), 201
+
+@routes.route('/series', methods=['GET'])
+@read_replica
+def get_series():
+    """
+    List recurring series
+    ---
+    parameters:
+      - name: resource_id
+        in: query
+        type: integer
+        required: false
+        description: Only return the series of this resource
+    responses:
+      200:
+        description: Series ordered by id
+        schema:
+          type: array
+          items:
+            $ref: '#/definitions/Series'
+    """
+    query = ReservationSeries.query.order_by(ReservationSeries.id)
+    resource_id = request.args.get('resource_id', type=int)
+    if resource_id is not None:
+        query = query.filter(ReservationSeries.resource_id == resource_id)
+    return jsonify([series.to_dict() for series in query])
+
+@routes.route('/series/<int:series_id>', methods=['GET'])
+@read_replica
+def get_series_details(series_id):
+    """
+    Get a recurring series by ID
+    ---
+    parameters:
+      - name: series_id
+        in: path
+        type: integer
+        required: true
+    responses:
+      200:
+        description: The series
+        schema:
+          $ref: '#/definitions/Series'
+      404:
+        description: Series not found
+    """
+    series = db.session.get(ReservationSeries, series_id)
+    if not series:
+        return jsonify({'error': 'Series not found'}), 404
+    return jsonify(series.to_dict())
+
+@routes.route('/series/<int:series_id>/exceptions', methods=['POST'])
+def cancel_series_occurrence(series_id):
+    """
+    Cancel one occurrence of a recurring series
+    ---
+    parameters:
+      - name: series_id
+        in: path
+        type: integer
+        required: true
+      - name: body
+        in: body
+        required: true
+        schema:
+          type: object
+          required:
+            - occurrence_start
+          properties:
+            occurrence_start:
+              type: string
+              format: date-time
+              description: Start time of the occurrence to cancel (ISO 8601)
+    responses:
+      200:
+        description: Occurrence cancelled; the updated series
+        schema:
+          $ref: '#/definitions/Series'
+      400:
+        description: Invalid data, or the time is not an occurrence of the series
+      404:
+        description: Series not found
+    """
+    data = request.json or {}
+    try:
+        occurrence_start = parse_iso_datetime(data.get('occurrence_start') or '')
+    except (AttributeError, ValueError) as e:
+        return jsonify({'error': f'Invalid data format: {e}'}), 400
+    series = db.session.get(ReservationSeries, series_id)
+    if not series:
+        return jsonify({'error': 'Series not found'}), 404
+    if not Rule.of(series).is_occurrence(occurrence_start):
+        return jsonify({'error': f'{isoformat_utc(occurrence_start)} is not an occurrence of the series'}), 400
+    if any(exception.occurrence_start == occurrence_start for exception in series.exceptions):
+        return jsonify(series.to_dict())
+
+    try:
+        series.exceptions.append(ReservationSeriesException(occurrence_start=occurrence_start))
+        change = record_series_change('series_updated', series)
+        db.session.flush()
+        enqueue_event('reservation_update', {'action': 'series_updated', 'seq': change.seq, 'series': series.to_dict()},
+                      series_scope(series))
+        db.session.commit()
+    except IntegrityError:  # Cancelled concurrently
+        db.session.rollback()
+        return jsonify(db.session.get(ReservationSeries, series_id).to_dict())
+    except SQLAlchemyError:
+        db.session.rollback()
+        return jsonify({'error': 'Could not process cancellation due to a database error.'}), 500
+    return jsonify(series.to_dict())
+
+@routes.route('/series/<int:series_id>', methods=['DELETE'])
+def delete_series(series_id):
+    """
+    Delete a recurring series and all its occurrences
+    ---
+    parameters:
+      - name: series_id
+        in: path
+        type: integer
+        required: true
+    responses:
+      200:
+        description: Series deleted
+      404:
+        description: Series not found
+      500:
+        description: Internal server error
+    """
+    series = db.session.get(ReservationSeries, series_id)
+    if not series:
+        return jsonify({'error': 'Series not found'}), 404
+    try:
+        change = record_series_change('series_deleted', series)
+        db.session.flush()
+        enqueue_event('reservation_update', {'action': 'series_deleted', 'seq': change.seq, 'series': series.to_dict()},
+                      series_scope(series))
+        db.session.delete(series)
+        db.session.commit()
+    except SQLAlchemyError:
+        db.session.rollback()
+        return jsonify({'error': 'Could not delete the series due to a database error.'}), 500
+    return jsonify({'message': 'Series deleted successfully'}), 200
+
+@routes.route('/reservation-index/consistency', methods=['GET'])
+def check_reservation_index():
+    """
+    Compare the in-memory interval index with the reservations table
+    ---
+    responses:
+      200:
+        description: Consistency report listing missing, stale, mismatched and overlapping reservation ids
+      404:
+        description: The interval index is disabled
+    """
+    if not reservation_index_enabled():
+        return jsonify({'error': 'Reservation index is disabled'}), 404
+    return jsonify(reservation_index.check_consistency())
\ No newline at end of file
@@ -0,0 +1,165 @@
+import json
+from datetime import datetime, timedelta
+from itertools import chain
+
+from flask import Response, request, stream_with_context
+
+from models import Resource, Reservation, db, parse_iso_datetime
+
+try:
+    import msgpack
+except ImportError:  # Optional: without it, clients asking for MessagePack get JSON
+    msgpack = None
+
+# Rows fetched per database round trip and items per streamed chunk
+YIELD_PER = 2000
+
+MSGPACK_MIMETYPE = 'application/msgpack'
+# Also accepted in Accept headers: names older clients still send
+MSGPACK_MIMETYPES = (MSGPACK_MIMETYPE, 'application/x-msgpack', 'application/vnd.msgpack')
+
+EPOCH = datetime(1970, 1, 1)
+
+RESOURCE_COLUMNS = (Resource.id, Resource.name, Resource.ip_address, Resource.ssh_port, Resource.web_port)
+RESERVATION_COLUMNS = (Reservation.id, Reservation.resource_id, Reservation.start_time,
+                       Reservation.end_time, Reservation.description)
+
+_dumps = json.dumps
+
+
+def _int_or_null(value):
+    return 'null' if value is None else str(int(value))
+
+
+def resource_json(row):
+    """Encodes an (id, name, ip_address, ssh_port, web_port) row exactly like Resource.to_dict()."""
+    resource_id, name, ip_address, ssh_port, web_port = row
+    return (f'{{"id":{resource_id},"name":{_dumps(name)},"ip_address":{_dumps(ip_address)},'
+            f'"ssh_port":{_int_or_null(ssh_port)},"web_port":{_int_or_null(web_port)}}}')
+
+
+def reservation_json(row):
+    """
+    Encodes an (id, resource_id, start_time, end_time, description) row exactly like
+    Reservation.to_dict(). Stored datetimes are naive UTC, so appending the offset to the naive
+    isoformat() gives the same string as isoformat() on an aware value, without building one.
+    """
+    reservation_id, resource_id, start_time, end_time, description = row
+    return (f'{{"id":{reservation_id},"resource_id":{resource_id},'
+            f'"start_time":"{start_time.isoformat()}+00:00","end_time":"{end_time.isoformat()}+00:00",'
+            f'"description":{_dumps(description)}}}')
+
+
+def iter_json_array(rows, encode, chunk_size=YIELD_PER, extra=()):
+    """
+    Yields a JSON array of encode(row) for each row, followed by the already encoded items of
+    extra, in chunks of chunk_size items.
+    """
+    yield '['
+    separator = ''
+    buffer = []
+    for item in chain((encode(row) for row in rows), extra):
+        buffer.append(item)
+        if len(buffer) >= chunk_size:
+            yield separator + ','.join(buffer)
+            separator = ','
+            buffer = []
+    if buffer:
+        yield separator + ','.join(buffer)
+    yield ']'
+
+
+def stream_json_array(statement, encode, extra=()):
+    """
+    Streams the rows of a column-only select() as a JSON array response, with the encoded items
+    of extra appended.
+    Rows are fetched in batches of YIELD_PER while the body is written, so peak memory does not
+    depend on the number of rows and the first bytes go out before the query is exhausted.
+    """
+    def generate():
+        rows = db.session.execute(statement.execution_options(yield_per=YIELD_PER))
+        yield from iter_json_array(rows, encode, extra=extra)
+
+    return Response(stream_with_context(generate()), mimetype='application/json')
+
+
+def wants_msgpack():
+    """True when msgpack is installed and the request's Accept header prefers MessagePack to JSON."""
+    if msgpack is None:
+        return False
+    return request.accept_mimetypes.best_match(('application/json',) + MSGPACK_MIMETYPES) in MSGPACK_MIMETYPES
+
+
+def msgpack_response(data):
+    return Response(msgpack.packb(data, use_bin_type=True), mimetype=MSGPACK_MIMETYPE)
+
+
+def epoch_seconds(value):
+    """Seconds since the epoch for a stored (naive UTC) datetime; an int unless it has microseconds."""
+    delta = value - EPOCH
+    return delta.days * 86400 + delta.seconds if not delta.microseconds else delta / timedelta(seconds=1)
+
+
+class ColumnarReservations:
+    """
+    Reservations as parallel arrays, {"id": [...], "resource_id": [...], "start": [...],
+    "end": [...], "description": [...], "series_id": [...]}, with times in epoch seconds. Field
+    names and ISO strings are not repeated per reservation; as MessagePack, a schedule view is
+    several times smaller than its JSON. Occurrences of series have a null id; stored reservations a null series_id.
+    """
+
+    def __init__(self):
+        self.ids, self.resource_ids, self.starts, self.ends, self.descriptions, self.series_ids = \
+            [], [], [], [], [], []
+
+    def append(self, reservation_id, resource_id, start_time, end_time, description, series_id=None):
+        self.ids.append(reservation_id)
+        self.resource_ids.append(resource_id)
+        self.starts.append(epoch_seconds(start_time))
+        self.ends.append(epoch_seconds(end_time))
+        self.descriptions.append(description)
+        self.series_ids.append(series_id)
+
+    def add_rows(self, rows):
+        """Adds RESERVATION_COLUMNS rows."""
+        for row in rows:
+            self.append(*row)
+        return self
+
+    def add_occurrences(self, occurrences):
+        """Adds (resource_id, start_time, end_time, series) tuples, as from series.occurrences_in_window."""
+        for resource_id, start_time, end_time, series in occurrences:
+            self.append(None, resource_id, start_time, end_time, series.description, series.id)
+        return self
+
+    def add_dicts(self, reservations):
+        """Adds reservations in the JSON representation (Reservation.to_dict(), occurrence_dict())."""
+        for reservation in reservations:
+            self.append(reservation['id'], reservation['resource_id'], parse_iso_datetime(reservation['start_time']),
+                        parse_iso_datetime(reservation['end_time']), reservation.get('description'),
+                        reservation.get('series_id'))
+        return self
+
+    def to_dict(self):
+        return {'id': self.ids, 'resource_id': self.resource_ids, 'start': self.starts, 'end': self.ends,
+                'description': self.descriptions, 'series_id': self.series_ids}
+
+
+def compact_event_payload(payload):
+    """
+    The compact form of a reservation event: its reservation, or reservations, as columnar arrays
+    under "reservations", and "at" in epoch seconds. Other events are sent as they are.
+    """
+    if payload.get('action') == 'batch':
+        return {**payload, 'events': [compact_event_payload(event) for event in payload['events']]}
+    if payload.get('reservation') is not None:
+        reservations = [payload['reservation']]
+    elif payload.get('reservations') is not None:
+        reservations = payload['reservations']
+    else:
+        return payload
+    compact = {key: value for key, value in payload.items() if key not in ('reservation', 'reservations')}
+    compact['reservations'] = ColumnarReservations().add_dicts(reservations).to_dict()
+    if 'at' in compact:
+        compact['at'] = epoch_seconds(parse_iso_datetime(compact['at']))
+    return compact
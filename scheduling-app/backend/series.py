@@ -0,0 +1,333 @@
+from datetime import timedelta
+from math import gcd
+
+from sqlalchemy import or_, select
+
+from archive import utcnow
+from models import Reservation, ReservationArchive, ReservationSeries, ReservationSeriesException, db, \
+    isoformat_utc, parse_iso_datetime
+
+FREQUENCIES = ('DAILY', 'WEEKLY')
+WEEKDAY_CODES = ('MO', 'TU', 'WE', 'TH', 'FR', 'SA', 'SU')
+
+# Keeps the series-against-series check (one period of both rules, see rules_conflict) small.
+MAX_INTERVAL = {'DAILY': 366, 'WEEKLY': 53}
+
+
+class InvalidRule(ValueError):
+    pass
+
+
+class Rule:
+    """
+    The subset of an RFC 5545 RRULE a series supports: FREQ=DAILY|WEEKLY, INTERVAL, BYDAY
+    (weekly rules only), and UNTIL or COUNT. Occurrences start at the time of day of start,
+    in UTC; the first one is start itself, or for BYDAY the first listed weekday on or after it.
+
+    Occurrences are computed arithmetically: expanding a window costs O(occurrences in the
+    window) wherever the window lies, and the n-th occurrence is found without walking the first n.
+    """
+
+    __slots__ = ('start', 'duration', 'freq', 'interval', 'weekdays', 'until', 'count')
+
+    def __init__(self, start, duration, freq='DAILY', interval=1, weekdays=None, until=None, count=None):
+        if freq not in FREQUENCIES:
+            raise InvalidRule(f"FREQ must be one of {', '.join(FREQUENCIES)}")
+        if not 1 <= interval <= MAX_INTERVAL[freq]:
+            raise InvalidRule(f'INTERVAL must be between 1 and {MAX_INTERVAL[freq]} for {freq}')
+        if duration <= timedelta(0):
+            raise InvalidRule('duration must be positive')
+        if weekdays and freq != 'WEEKLY':
+            raise InvalidRule('BYDAY is only supported with FREQ=WEEKLY')
+        if until is not None and count is not None:
+            raise InvalidRule('UNTIL and COUNT cannot be combined')
+        if count is not None and count < 1:
+            raise InvalidRule('COUNT must be positive')
+        if freq == 'WEEKLY' and not weekdays:
+            weekdays = (start.weekday(),)
+        self.start = start
+        self.duration = duration
+        self.freq = freq
+        self.interval = interval
+        self.weekdays = tuple(sorted(set(weekdays))) if weekdays else None
+        self.until = until
+        self.count = count
+        if duration > timedelta(days=self._shortest_gap_days()):
+            raise InvalidRule('occurrences of a series must not overlap each other')
+        if self.last_start() is False:
+            raise InvalidRule('the rule has no occurrences')
+
+    @classmethod
+    def parse(cls, text, start, duration):
+        """Parses an RRULE value such as "FREQ=WEEKLY;BYDAY=MO,TU,WE,TH,FR;COUNT=50"."""
+        parts = {}
+        for part in (text or '').strip().removeprefix('RRULE:').split(';'):
+            if not part:
+                continue
+            name, _, value = part.partition('=')
+            name = name.strip().upper()
+            if name not in ('FREQ', 'INTERVAL', 'BYDAY', 'UNTIL', 'COUNT'):
+                raise InvalidRule(f'unsupported RRULE part {name}')
+            parts[name] = value.strip()
+        if 'FREQ' not in parts:
+            raise InvalidRule('FREQ is required')
+        try:
+            interval = int(parts.get('INTERVAL', 1))
+            count = int(parts['COUNT']) if 'COUNT' in parts else None
+            until = parse_rrule_datetime(parts['UNTIL']) if 'UNTIL' in parts else None
+        except ValueError as e:
+            raise InvalidRule(str(e))
+        weekdays = None
+        if 'BYDAY' in parts:
+            codes = [code.strip().upper() for code in parts['BYDAY'].split(',')]
+            if not all(code in WEEKDAY_CODES for code in codes):
+                raise InvalidRule(f"BYDAY values must be among {','.join(WEEKDAY_CODES)}")
+            weekdays = [WEEKDAY_CODES.index(code) for code in codes]
+        return cls(start, duration, parts['FREQ'].upper(), interval, weekdays, until, count)
+
+    @classmethod
+    def of(cls, series):
+        """Builds the rule of a stored ReservationSeries."""
+        weekdays = [int(day) for day in series.by_weekday.split(',')] if series.by_weekday else None
+        return cls(series.start_time, timedelta(minutes=series.duration_minutes), series.freq,
+                   series.interval, weekdays, series.until, series.count)
+
+    def to_rrule(self):
+        parts = [f'FREQ={self.freq}']
+        if self.interval != 1:
+            parts.append(f'INTERVAL={self.interval}')
+        if self.weekdays is not None:
+            parts.append('BYDAY=' + ','.join(WEEKDAY_CODES[day] for day in self.weekdays))
+        if self.until is not None:
+            parts.append(f"UNTIL={self.until.strftime('%Y%m%dT%H%M%SZ')}")
+        if self.count is not None:
+            parts.append(f'COUNT={self.count}')
+        return ';'.join(parts)
+
+    @property
+    def period_days(self):
+        """Length of one cycle of the rule; the pattern of occurrences repeats every period."""
+        return self.interval if self.freq == 'DAILY' else 7 * self.interval
+
+    def _shortest_gap_days(self):
+        """Fewest days between the starts of two consecutive occurrences."""
+        if self.weekdays is None:
+            return self.period_days
+        days = list(self.weekdays) + [self.weekdays[0] + self.period_days]
+        return min(later - earlier for earlier, later in zip(days, days[1:]))
+
+    def _week0(self):
+        """The Monday of the first week, at the occurrence time of day."""
+        return self.start - timedelta(days=self.start.weekday())
+
+    def _skipped(self):
+        """BYDAY weekdays of the first week that fall before start and are not occurrences."""
+        return sum(1 for day in self.weekdays if day < self.start.weekday())
+
+    def _nth(self, ordinal):
+        """Start of the occurrence numbered ordinal (0 is the first), ignoring UNTIL and COUNT."""
+        if self.weekdays is None:
+            return self.start + timedelta(days=ordinal * self.period_days)
+        cycle, position = divmod(ordinal + self._skipped(), len(self.weekdays))
+        return self._week0() + timedelta(days=cycle * self.period_days + self.weekdays[position])
+
+    def _ordinal_at_or_after(self, moment):
+        """Ordinal of the first occurrence (ignoring UNTIL and COUNT) starting at or after moment."""
+        if moment <= self.start:
+            return 0
+        if self.weekdays is None:
+            period = timedelta(days=self.period_days)
+            return -(-(moment - self.start) // period)
+        cycle = max(0, (moment - self._week0()).days // self.period_days)
+        ordinal = cycle * len(self.weekdays) - self._skipped()
+        while self._nth(max(ordinal, 0)) < moment:
+            ordinal += 1
+        return max(ordinal, 0)
+
+    def last_start(self):
+        """
+        Start of the last occurrence, None for an open-ended rule, or False when UNTIL excludes
+        every occurrence.
+        """
+        if self.count is not None:
+            return self._nth(self.count - 1)
+        if self.until is None:
+            return None
+        ordinal = self._ordinal_at_or_after(self.until)
+        if self._nth(ordinal) > self.until:
+            ordinal -= 1
+        return self._nth(ordinal) if ordinal >= 0 else False
+
+    def last_end(self):
+        """End of the last occurrence, or None for an open-ended rule."""
+        last_start = self.last_start()
+        return None if last_start is None else last_start + self.duration
+
+    def occurrences(self, window_start, window_end):
+        """Yields the start of every occurrence overlapping [window_start, window_end), in order."""
+        ordinal = self._ordinal_at_or_after(window_start - self.duration)
+        while self.count is None or ordinal < self.count:
+            start = self._nth(ordinal)
+            if start >= window_end or (self.until is not None and start > self.until):
+                return
+            if start + self.duration > window_start:
+                yield start
+            ordinal += 1
+
+    def is_occurrence(self, moment):
+        return any(start == moment for start in self.occurrences(moment, moment + timedelta(microseconds=1)))
+
+
+def parse_rrule_datetime(value):
+    """UNTIL in RRULE form (20261231T235959Z) or ISO 8601, as naive UTC."""
+    if len(value) in (15, 16) and value[8] == 'T' and value[:8].isdigit():
+        value = f'{value[:4]}-{value[4:6]}-{value[6:8]}T{value[9:11]}:{value[11:13]}:{value[13:15]}' \
+                + ('Z' if value.endswith('Z') else '')
+    elif len(value) == 8 and value.isdigit():
+        value = f'{value[:4]}-{value[4:6]}-{value[6:8]}T23:59:59'
+    return parse_iso_datetime(value)
+
+
+def series_overlapping(resource_ids, start, end):
+    """
+    Returns the ReservationSeries whose span overlaps [start, end), with their exceptions,
+    optionally restricted to resource_ids.
+    """
+    query = select(ReservationSeries).where(
+        ReservationSeries.start_time < end,
+        or_(ReservationSeries.last_end.is_(None), ReservationSeries.last_end > start)
+    )
+    if resource_ids is not None:
+        query = query.where(ReservationSeries.resource_id.in_(resource_ids))
+    return db.session.scalars(query.order_by(ReservationSeries.resource_id, ReservationSeries.id)).all()
+
+
+def expand(series, start, end):
+    """Yields (occurrence_start, occurrence_end) of series within [start, end), skipping exceptions."""
+    rule = Rule.of(series)
+    excluded = {exception.occurrence_start for exception in series.exceptions}
+    for occurrence_start in rule.occurrences(start, end):
+        if occurrence_start not in excluded:
+            yield occurrence_start, occurrence_start + rule.duration
+
+
+def occurrences_in_window(resource_ids, start, end):
+    """
+    Returns (resource_id, start_time, end_time, series) for every series occurrence overlapping
+    [start, end) on resource_ids (all resources when None), sorted by start time.
+    """
+    found = [(series.resource_id, occurrence_start, occurrence_end, series)
+             for series in series_overlapping(resource_ids, start, end)
+             for occurrence_start, occurrence_end in expand(series, start, end)]
+    found.sort(key=lambda occurrence: (occurrence[1], occurrence[0]))
+    return found
+
+
+def series_scope(series):
+    """Event scope of a series change: open-ended, so every client reloads its window."""
+    return [(series.resource_id, series.start_time, None)]
+
+
+def occurrence_dict(resource_id, start_time, end_time, series):
+    """An occurrence in the Reservation representation; it has no id of its own."""
+    return {
+        'id': None,
+        'resource_id': resource_id,
+        'start_time': isoformat_utc(start_time),
+        'end_time': isoformat_utc(end_time),
+        'description': series.description,
+        'series_id': series.id
+    }
+
+
+def find_series_conflict(resource_id, start, end, exclude_series_id=None):
+    """Returns the id of a series with an occurrence overlapping [start, end) on resource_id, or None."""
+    for series in series_overlapping([resource_id], start, end):
+        if series.id != exclude_series_id and next(expand(series, start, end), None) is not None:
+            return series.id
+    return None
+
+
+def _reservations_in_span(model, resource_id, start, end):
+    query = select(model.id, model.start_time, model.end_time).where(
+        model.resource_id == resource_id, model.end_time > start)
+    if end is not None:
+        query = query.where(model.start_time < end)
+    return db.session.execute(query.order_by(model.start_time).execution_options(yield_per=2000))
+
+
+def rules_conflict(first, first_excluded, second, second_excluded):
+    """
+    Whether two rules have overlapping occurrences. Past the later start and the last exception,
+    both occurrence patterns repeat every lcm of their periods, so checking that stretch (and at
+    most up to the earlier last end) decides it exactly, however long the rules run.
+    """
+    lo = max(first.start, second.start)
+    horizon = lo
+    for moment in (*first_excluded, *second_excluded):
+        horizon = max(horizon, moment)
+    period = first.period_days * second.period_days // gcd(first.period_days, second.period_days)
+    hi = horizon + timedelta(days=period) + first.duration + second.duration
+    for last_end in (first.last_end(), second.last_end()):
+        if last_end is not None:
+            hi = min(hi, last_end)
+    if hi <= lo:
+        return False
+    left = [(s, s + first.duration) for s in first.occurrences(lo, hi) if s not in first_excluded]
+    right = [(s, s + second.duration) for s in second.occurrences(lo, hi) if s not in second_excluded]
+    i = j = 0
+    while i < len(left) and j < len(right):
+        if left[i][0] < right[j][1] and right[j][0] < left[i][1]:
+            return True
+        if left[i][1] <= right[j][1]:
+            i += 1
+        else:
+            j += 1
+    return False
+
+
+def find_rule_conflict(resource_id, rule, excluded=(), exclude_series_id=None):
+    """
+    Checks a new rule on resource_id against everything already booked there, exactly:
+    each reservation in the rule's span is checked against the occurrences inside it, and each
+    other series against one common period (see rules_conflict).
+    Returns ('reservation', id) or ('series', id) for the first conflict found, or None.
+    """
+    excluded = set(excluded)
+    last_end = rule.last_end()
+    models = [Reservation] + ([ReservationArchive] if rule.start < utcnow() else [])
+    for model in models:
+        for reservation_id, start, end in _reservations_in_span(model, resource_id, rule.start, last_end):
+            if any(s not in excluded for s in rule.occurrences(start, end)):
+                return 'reservation', reservation_id
+
+    others = select(ReservationSeries).where(
+        ReservationSeries.resource_id == resource_id,
+        or_(ReservationSeries.last_end.is_(None), ReservationSeries.last_end > rule.start))
+    if last_end is not None:
+        others = others.where(ReservationSeries.start_time < last_end)
+    for series in db.session.scalars(others):
+        if series.id == exclude_series_id:
+            continue
+        other_excluded = {exception.occurrence_start for exception in series.exceptions}
+        if rules_conflict(rule, excluded, Rule.of(series), other_excluded):
+            return 'series', series.id
+    return None
+
+
+def new_series(resource_id, rule, description=None, excluded=()):
+    """Builds (without adding it to the session) the ReservationSeries row storing rule."""
+    return ReservationSeries(
+        resource_id=resource_id,
+        start_time=rule.start,
+        duration_minutes=int(rule.duration.total_seconds() // 60),
+        freq=rule.freq,
+        interval=rule.interval,
+        by_weekday=','.join(str(day) for day in rule.weekdays) if rule.weekdays is not None else None,
+        until=rule.until,
+        count=rule.count,
+        last_end=rule.last_end(),
+        description=description,
+        created_at=utcnow(),
+        exceptions=[ReservationSeriesException(occurrence_start=moment) for moment in sorted(set(excluded))]
+    )
@@ -0,0 +1,73 @@
+"""
+Production entry point: runs several Socket.IO worker processes, one per port.
+
+Each worker serves HTTP and WebSocket traffic with gevent. Put the workers behind a load
+balancer with sticky sessions (Socket.IO long-polling needs every request of a session to reach
+the same worker; see deploy/nginx.conf) and point all of them at the same message queue so an
+event emitted by one worker reaches the clients of all the others:
+
+    SOCKETIO_MESSAGE_QUEUE=redis://localhost:6379/0 python serve.py --workers 4 --base-port 5001
+
+Worker i listens on base-port + i. Periodic background jobs (such as archival) run in worker 0 only.
+"""
+import argparse
+import multiprocessing
+import os
+import signal
+import sys
+
+
+def run_worker(host, port, run_background_jobs=False):
+    async_mode = os.environ.setdefault('SOCKETIO_ASYNC_MODE', 'gevent')
+    if async_mode == 'gevent':
+        # Must happen before anything else imports socket, threading or the database drivers
+        from gevent import monkey
+        monkey.patch_all()
+
+    from app import app, build_indexes, socketio, start_background_jobs
+    build_indexes()
+    if run_background_jobs:
+        start_background_jobs()
+    else:
+        # Events written here are emitted by the background jobs' worker, in order with everyone else's
+        from outbox import outbox_dispatcher
+        outbox_dispatcher.inline = False
+    print(f'Worker {os.getpid()} listening on {host}:{port} ({async_mode})', flush=True)
+    socketio.run(app, host=host, port=port, debug=False, use_reloader=False,
+                 allow_unsafe_werkzeug=async_mode == 'threading')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run the scheduling API as several worker processes.')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='number of worker processes (default: number of CPUs)')
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--base-port', type=int, default=5001, help='port of the first worker')
+    args = parser.parse_args(argv)
+
+    if args.workers > 1 and not os.environ.get('SOCKETIO_MESSAGE_QUEUE'):
+        parser.error('SOCKETIO_MESSAGE_QUEUE must be set when running more than one worker')
+
+    # Spawned (not forked) children so each worker starts with a clean, un-patched interpreter
+    context = multiprocessing.get_context('spawn')
+    workers = [
+        context.Process(target=run_worker, args=(args.host, args.base_port + i, i == 0), name=f'worker-{i}')
+        for i in range(args.workers)
+    ]
+    for worker in workers:
+        worker.start()
+
+    def stop(signum, frame):
+        for worker in workers:
+            if worker.is_alive():
+                worker.terminate()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    for worker in workers:
+        worker.join()
+    return max((worker.exitcode or 0) for worker in workers)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,120 @@
+from itertools import groupby
+
+from models import Resource, Reservation, db
+from series import occurrences_in_window
+
+SEARCH_MODES = ('earliest', 'all', 'whole_window')
+
+# Above this many candidate resources the window is read for all resources and filtered while
+# merging, rather than sending a huge IN (...) list.
+MAX_IN_CLAUSE = 500
+
+
+def _in_clause(resource_ids):
+    """resource_ids, or None (all resources) when the list is too long for an IN (...)."""
+    return resource_ids if len(resource_ids) <= MAX_IN_CLAUSE else None
+
+
+def free_gaps(busy, window_start, window_end):
+    """
+    Yields the (start, end) gaps inside [window_start, window_end) not covered by busy.
+    busy must be an iterable of (start, end) intervals sorted by start; overlaps are tolerated.
+    """
+    cursor = window_start
+    for start, end in busy:
+        if start > cursor:
+            yield cursor, min(start, window_end)
+        if end > cursor:
+            cursor = end
+        if cursor >= window_end:
+            return
+    if cursor < window_end:
+        yield cursor, window_end
+
+
+def candidate_resource_ids(resource_ids=None):
+    """Returns the ids of the resources to search, in ascending order, ignoring unknown ids."""
+    query = db.session.query(Resource.id).order_by(Resource.id)
+    if resource_ids is not None:
+        query = query.filter(Resource.id.in_(resource_ids))
+    return [row[0] for row in query]
+
+
+def busy_intervals_by_resource(resource_ids, window_start, window_end):
+    """
+    Yields (resource_id, [(start, end), ...]) for every candidate resource in id order,
+    from a single query over the window sorted by (resource_id, start_time).
+    Occurrences of recurring series are merged in; resources without reservations in the
+    window get an empty list.
+    """
+    occurrences = {}
+    for resource_id, start, end, _ in occurrences_in_window(_in_clause(resource_ids), window_start, window_end):
+        occurrences.setdefault(resource_id, []).append((start, end))
+    query = db.select(Reservation.resource_id, Reservation.start_time, Reservation.end_time).filter(
+        Reservation.start_time < window_end,
+        Reservation.end_time > window_start
+    )
+    if len(resource_ids) <= MAX_IN_CLAUSE:
+        query = query.filter(Reservation.resource_id.in_(resource_ids))
+    rows = db.session.execute(
+        query.order_by(Reservation.resource_id, Reservation.start_time).execution_options(yield_per=10000)
+    )
+    # Merge join of two id-ordered streams: candidate resources and grouped reservation rows.
+    grouped = groupby(rows, key=lambda row: row[0])
+    current = next(grouped, None)
+    for resource_id in resource_ids:
+        while current is not None and current[0] < resource_id:
+            current = next(grouped, None)
+        busy = []
+        if current is not None and current[0] == resource_id:
+            busy = [(start, end) for _, start, end in current[1]]
+            current = next(grouped, None)
+        if resource_id in occurrences:
+            busy = sorted(busy + occurrences[resource_id])
+        yield resource_id, busy
+
+
+def earliest_slots(resource_ids, window_start, window_end, duration, limit=None):
+    """
+    Returns the earliest free slot of the given duration per resource, as
+    (resource_id, start, end) tuples ordered by start time (ties by resource id).
+    """
+    found = []
+    for resource_id, busy in busy_intervals_by_resource(resource_ids, window_start, window_end):
+        for gap_start, gap_end in free_gaps(busy, window_start, window_end):
+            if gap_end - gap_start >= duration:
+                found.append((resource_id, gap_start, gap_start + duration))
+                break
+    found.sort(key=lambda slot: (slot[1], slot[0]))
+    return found[:limit] if limit is not None else found
+
+
+def all_free_gaps(resource_ids, window_start, window_end, duration, limit=None):
+    """Returns (resource_id, [(start, end), ...]) for every resource with at least one gap >= duration."""
+    found = []
+    for resource_id, busy in busy_intervals_by_resource(resource_ids, window_start, window_end):
+        gaps = [gap for gap in free_gaps(busy, window_start, window_end) if gap[1] - gap[0] >= duration]
+        if gaps:
+            found.append((resource_id, gaps))
+            if limit is not None and len(found) >= limit:
+                break
+    return found
+
+
+def resources_free_for_window(resource_ids, window_start, window_end, limit=None):
+    """Returns up to limit resource ids, in id order, with no reservation overlapping the window."""
+    query = db.session.query(Reservation.resource_id).filter(
+        Reservation.start_time < window_end,
+        Reservation.end_time > window_start
+    )
+    if len(resource_ids) <= MAX_IN_CLAUSE:
+        query = query.filter(Reservation.resource_id.in_(resource_ids))
+    busy = {row[0] for row in query.distinct()}
+    busy.update(row[0] for row in occurrences_in_window(_in_clause(resource_ids), window_start, window_end))
+    free = []
+    for resource_id in resource_ids:
+        if resource_id not in busy:
+            free.append(resource_id)
+            if limit is not None and len(free) >= limit:
+                break
+    return free
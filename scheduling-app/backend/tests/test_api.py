@@ -79,5 +79,39 @@ class APITestCase(unittest.TestCase):
             self.assertIsInstance(reservation['start_time'], str) # Dates are serialized to strings
             self.assertIsInstance(reservation['end_time'], str)
 
+    def test_get_reservations_window(self):
+        print("\n--- Testing GET /reservations with a time window ---")
+        response = self.client.get('/reservations?start=2025-05-28T09:00:00Z&end=2025-05-28T11:30:00Z')
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data.decode('utf-8'))
+        self.assertEqual(len(data), 1)
+        self.assertEqual(data[0]['start_time'], '2025-05-28T10:00:00+00:00')
+
+        # Touching intervals do not overlap: a window ending at 12:00 excludes the 12:00 reservation.
+        response = self.client.get('/reservations?start=2025-05-28T11:00:00Z&end=2025-05-28T12:00:00Z')
+        self.assertEqual(json.loads(response.data.decode('utf-8')), [])
+
+        with app.app_context():
+            resource2_id = Resource.query.filter_by(name='Test Device 2').first().id
+        response = self.client.get(f'/reservations?start=2025-05-28T00:00:00Z&end=2025-05-29T00:00:00Z&resource_ids={resource2_id}')
+        data = json.loads(response.data.decode('utf-8'))
+        self.assertEqual([r['resource_id'] for r in data], [resource2_id])
+
+        response = self.client.get('/reservations?start=not-a-date')
+        self.assertEqual(response.status_code, 400)
+
+    def test_availability_window(self):
+        print("\n--- Testing GET /availability/<id> with a time window ---")
+        with app.app_context():
+            resource1_id = Resource.query.filter_by(name='Test Device 1').first().id
+        response = self.client.get(f'/availability/{resource1_id}?start=2025-05-28T10:30:00Z&end=2025-05-28T10:45:00Z')
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data.decode('utf-8'))
+        self.assertEqual(len(data['reservations']), 1)
+
+        response = self.client.get(f'/availability/{resource1_id}?start=2025-05-29T00:00:00Z')
+        data = json.loads(response.data.decode('utf-8'))
+        self.assertEqual(data['reservations'], [])
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,113 @@
+import unittest
+import json
+from datetime import datetime, timedelta, timezone
+from app import app, db
+from models import Resource, Reservation, ReservationArchive, ReservationChange
+from archive import ArchiveConflict, archive_reservations, retention_cutoff
+
+def iso(value):
+    return value.isoformat() + 'Z'
+
+class ArchiveTestCase(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+        self.now = datetime.now(timezone.utc).replace(tzinfo=None, microsecond=0)
+
+        with app.app_context():
+            db.create_all()
+            resource = Resource(name='Archive Device')
+            db.session.add(resource)
+            db.session.commit()
+            self.resource_id = resource.id
+            old = self.now - timedelta(days=200)
+            db.session.add_all(
+                [Reservation(resource_id=resource.id, start_time=old + timedelta(days=i),
+                             end_time=old + timedelta(days=i, hours=1)) for i in range(5)]
+                + [Reservation(resource_id=resource.id, start_time=self.now - timedelta(days=1),
+                               end_time=self.now - timedelta(days=1) + timedelta(hours=1)),
+                   Reservation(resource_id=resource.id, start_time=self.now + timedelta(days=1),
+                               end_time=self.now + timedelta(days=1, hours=1))]
+            )
+            db.session.commit()
+
+    def tearDown(self):
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def archive(self, days=90):
+        with app.app_context():
+            return archive_reservations(retention_cutoff(days), batch_size=2)
+
+    def test_old_reservations_move_in_batches(self):
+        self.assertEqual(self.archive(), 5)
+        self.assertEqual(self.archive(), 0)
+        with app.app_context():
+            self.assertEqual(Reservation.query.count(), 2)
+            self.assertEqual(ReservationArchive.query.count(), 5)
+
+    def test_archived_ids_are_never_reused(self):
+        with app.app_context():
+            Reservation.query.filter(Reservation.start_time > self.now - timedelta(days=10)).delete()
+            db.session.commit()
+        self.assertEqual(self.archive(), 5)  # The newest reservation too
+        response = self.client.post('/reserve', json={
+            'resource_id': self.resource_id, 'start_time': iso(self.now - timedelta(days=150)), 'duration_minutes': 30})
+        with app.app_context():
+            self.assertGreater(json.loads(response.data)['id'], max(row.id for row in ReservationArchive.query))
+        self.assertEqual(self.archive(days=100), 1)
+
+    def test_id_collisions_are_reported(self):
+        with app.app_context():
+            oldest = Reservation.query.order_by(Reservation.start_time).first()
+            db.session.add(ReservationArchive(id=oldest.id, resource_id=self.resource_id, start_time=oldest.start_time,
+                                              end_time=oldest.end_time, archived_at=self.now))
+            db.session.commit()
+            with self.assertRaises(ArchiveConflict) as raised:
+                archive_reservations(retention_cutoff(90), batch_size=2)
+            self.assertEqual(raised.exception.ids, [oldest.id])
+
+    def test_history_queries_include_archived_rows_on_request(self):
+        self.archive()
+        self.assertEqual(len(json.loads(self.client.get('/reservations').data)), 2)
+        everything = json.loads(self.client.get('/reservations?include_archived=true').data)
+        self.assertEqual(len(everything), 7)
+
+        items, cursor = [], None
+        while True:
+            page = json.loads(self.client.get('/reservations?include_archived=1&limit=3'
+                                              + (f'&cursor={cursor}' if cursor else '')).data)
+            items.extend(page['items'])
+            cursor = page['next_cursor']
+            if not cursor:
+                break
+        self.assertEqual([item['start_time'] for item in items], sorted(item['start_time'] for item in everything))
+
+        window = f'start={iso(self.now - timedelta(days=201))}&end={iso(self.now - timedelta(days=150))}'
+        availability = json.loads(self.client.get(f'/availability/{self.resource_id}?{window}&include_archived=true').data)
+        self.assertEqual(len(availability['reservations']), 5)
+
+    def test_bookings_in_the_past_still_conflict_with_archived_rows(self):
+        self.archive()
+        response = self.client.post('/reserve', json={
+            'resource_id': self.resource_id, 'duration_minutes': 30,
+            'start_time': iso(self.now - timedelta(days=200) + timedelta(minutes=15)),
+        })
+        self.assertEqual(response.status_code, 409)
+
+    def test_cli_command(self):
+        with app.app_context():
+            for days in (60, 45, 40):  # The newest entry is kept even though it is old
+                reservation = Reservation.query.first()
+                db.session.add(ReservationChange(action='created', reservation_id=reservation.id,
+                                                 resource_id=self.resource_id, start_time=reservation.start_time,
+                                                 end_time=reservation.end_time, created_at=self.now - timedelta(days=days)))
+            db.session.commit()
+        result = app.test_cli_runner().invoke(args=['archive-reservations', '--older-than-days', '90', '--batch-size', '10'])
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn('Archived 5 reservations', result.output)
+        self.assertIn('Pruned 2 change-log entries older than 30 days', result.output)
+
+if __name__ == '__main__':
+    unittest.main()
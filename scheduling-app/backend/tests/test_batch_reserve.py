@@ -0,0 +1,107 @@
+import unittest
+import json
+from datetime import datetime
+from sqlalchemy.exc import IntegrityError
+from unittest import mock
+import booking
+from app import app, db
+from booking import NO_OVERLAP_CONSTRAINT, StaleRead
+from models import Resource, Reservation
+
+class BatchReserveTestCase(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+
+        with app.app_context():
+            db.create_all()
+            resources = [Resource(name='Rig A'), Resource(name='Rig B')]
+            db.session.add_all(resources)
+            db.session.commit()
+            self.rig_a, self.rig_b = [resource.id for resource in resources]
+            db.session.add(Reservation(
+                resource_id=self.rig_a,
+                start_time=datetime(2025, 5, 28, 10, 0, 0),
+                end_time=datetime(2025, 5, 28, 11, 0, 0)
+            ))
+            db.session.commit()
+
+    def tearDown(self):
+        app.config['BOOKING_MAX_ATTEMPTS'] = 5
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def reservation_count(self):
+        with app.app_context():
+            return Reservation.query.count()
+
+    def slot(self, resource_id, start_time, duration_minutes=60):
+        return {'resource_id': resource_id, 'start_time': start_time, 'duration_minutes': duration_minutes}
+
+    def test_all_or_nothing_books_every_item(self):
+        response = self.client.post('/reserve/batch', json={'reservations': [
+            self.slot(self.rig_a, '2025-05-28T11:00:00Z'),
+            self.slot(self.rig_a, '2025-05-28T12:00:00Z'),
+            self.slot(self.rig_b, '2025-05-28T10:00:00Z'),
+        ]})
+        self.assertEqual(response.status_code, 201)
+        data = json.loads(response.data)
+        self.assertEqual(data['created'], 3)
+        self.assertEqual([result['index'] for result in data['results']], [0, 1, 2])
+        self.assertEqual(self.reservation_count(), 4)
+
+    def test_all_or_nothing_rejects_whole_batch(self):
+        response = self.client.post('/reserve/batch', json={'reservations': [
+            self.slot(self.rig_b, '2025-05-28T10:00:00Z'),
+            self.slot(self.rig_a, '2025-05-28T10:30:00Z'),  # Overlaps the existing reservation
+        ]})
+        self.assertEqual(response.status_code, 409)
+        statuses = [result['status'] for result in json.loads(response.data)['results']]
+        self.assertEqual(statuses, ['skipped', 'conflict'])
+        self.assertEqual(self.reservation_count(), 1)
+
+    def test_best_effort_detects_conflicts_within_the_batch(self):
+        response = self.client.post('/reserve/batch', json={'mode': 'best_effort', 'reservations': [
+            self.slot(self.rig_b, '2025-05-28T10:30:00Z'),
+            self.slot(self.rig_b, '2025-05-28T10:00:00Z'),  # Earlier start wins the overlap
+            self.slot(self.rig_a, '2025-05-28T09:30:00Z'),
+            self.slot(999, '2025-05-28T10:00:00Z'),
+            {'resource_id': self.rig_b},
+        ]})
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        statuses = [result['status'] for result in data['results']]
+        self.assertEqual(statuses, ['conflict', 'created', 'conflict', 'not_found', 'invalid'])
+        self.assertEqual((data['created'], data['failed']), (1, 4))
+        self.assertEqual(self.reservation_count(), 2)
+
+    def test_racing_writers_get_a_retry_hint(self):
+        app.config['BOOKING_MAX_ATTEMPTS'] = 1
+        with mock.patch.object(booking, '_book_batch_locked', side_effect=StaleRead()):
+            response = self.client.post('/reserve/batch', json={'reservations': [
+                self.slot(self.rig_b, '2025-05-28T10:00:00Z')]})
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.headers['Retry-After'], '1')
+        self.assertIn('Retry', json.loads(response.data)['error'])
+        self.assertEqual(self.reservation_count(), 1)
+
+    def test_exclusion_violation_at_insert_is_retried(self):
+        # PostgreSQL checks reservations_no_overlap at the INSERT (flush), not at COMMIT
+        violation = IntegrityError('INSERT INTO reservations ...', {}, Exception(f'violates {NO_OVERLAP_CONSTRAINT}'))
+        real_flush, calls = db.session.flush, []
+
+        def flush(*args, **kwargs):
+            calls.append(flush)
+            if len(calls) == 1:
+                raise violation
+            return real_flush(*args, **kwargs)
+
+        with mock.patch.object(db.session, 'flush', flush):
+            response = self.client.post('/reserve/batch', json={'reservations': [
+                self.slot(self.rig_b, '2025-05-28T10:00:00Z')]})
+        self.assertEqual(response.status_code, 201)  # Retried as a StaleRead
+        self.assertEqual(self.reservation_count(), 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+import unittest
+import os
+import sys
+from app import app, db
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks'))
+import bench_api
+import compare
+
+class BenchmarkTestCase(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        with app.app_context():
+            self.resource_ids = bench_api.seed_database(db, resources=5, reservations=200, chunk_size=64)
+
+    def tearDown(self):
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def test_seeded_reservations_do_not_overlap(self):
+        from models import Reservation
+        with app.app_context():
+            self.assertEqual(Reservation.query.count(), 200)
+            for resource_id in self.resource_ids:
+                rows = Reservation.query.filter_by(resource_id=resource_id).order_by(Reservation.start_time).all()
+                for previous, current in zip(rows, rows[1:]):
+                    self.assertLessEqual(previous.end_time, current.start_time)
+
+    def test_run_reports_every_scenario_and_deletes_what_it_booked(self):
+        results = bench_api.run_benchmark(lambda: bench_api.TestClientDriver(app), self.resource_ids,
+                                          clients=2, requests_per_client=5)
+        self.assertEqual(list(results), list(bench_api.SCENARIOS))
+        for summary in results.values():
+            self.assertEqual(summary['errors'], 0)
+            self.assertGreater(summary['requests'], 0)
+            self.assertLessEqual(summary['latency_ms']['p50'], summary['latency_ms']['p99'])
+        self.assertEqual(results['delete']['statuses'], {'200': results['reserve']['statuses'].get('201', 0)})
+
+    def test_compare_flags_latency_and_throughput_regressions(self):
+        def report(p95, rps):
+            return {'scenarios': {'reserve': {'errors': 0, 'throughput_rps': rps,
+                                              'latency_ms': {'p50': 1.0, 'p95': p95, 'p99': p95}}}}
+        _, regressions = compare.compare(report(10.0, 100.0), report(10.5, 98.0), threshold=10)
+        self.assertEqual(regressions, [])
+        _, regressions = compare.compare(report(10.0, 100.0), report(20.0, 50.0), threshold=10)
+        self.assertEqual({label for _, label, _ in regressions},
+                         {'latency p95 (ms)', 'latency p99 (ms)', 'throughput (req/s)'})
+
+if __name__ == '__main__':
+    unittest.main()
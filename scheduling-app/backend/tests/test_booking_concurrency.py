@@ -0,0 +1,77 @@
+import unittest
+import random
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from app import app, db
+from models import Resource, Reservation
+
+THREADS = 16
+ATTEMPTS_PER_THREAD = 25
+RESOURCE_COUNT = 4
+BASE_TIME = datetime(2025, 6, 2, 8, 0, 0)
+
+class BookingConcurrencyTestCase(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        with app.app_context():
+            db.create_all()
+            resources = [Resource(name=f'Stress Device {i}') for i in range(RESOURCE_COUNT)]
+            db.session.add_all(resources)
+            db.session.commit()
+            self.resource_ids = [resource.id for resource in resources]
+
+    def tearDown(self):
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def assert_no_double_bookings(self):
+        with app.app_context():
+            rows = db.session.query(Reservation.resource_id, Reservation.start_time, Reservation.end_time) \
+                .order_by(Reservation.resource_id, Reservation.start_time).all()
+        for previous, current in zip(rows, rows[1:]):
+            if previous.resource_id == current.resource_id:
+                self.assertLessEqual(previous.end_time, current.start_time,
+                                     f'Double booking on resource {current.resource_id}')
+        return len(rows)
+
+    def test_concurrent_bookings_never_overlap(self):
+        statuses = Counter()
+        statuses_lock = threading.Lock()
+        barrier = threading.Barrier(THREADS)
+
+        def worker(seed):
+            rng = random.Random(seed)
+            client = app.test_client()
+            barrier.wait()
+            for _ in range(ATTEMPTS_PER_THREAD):
+                # Few, overlapping candidate slots so that threads collide constantly
+                start = BASE_TIME + timedelta(minutes=15 * rng.randrange(24))
+                response = client.post('/reserve', json={
+                    'resource_id': rng.choice(self.resource_ids),
+                    'start_time': start.isoformat() + 'Z',
+                    'duration_minutes': rng.choice([30, 45, 60])
+                })
+                with statuses_lock:
+                    statuses[response.status_code] += 1
+
+        threads = [threading.Thread(target=worker, args=(seed,)) for seed in range(THREADS)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        total = THREADS * ATTEMPTS_PER_THREAD
+        print(f"\n--- Booking stress: {total} requests in {elapsed:.2f}s "
+              f"({total / elapsed:.0f} req/s), statuses {dict(statuses)} ---")
+
+        self.assertEqual(set(statuses) - {201, 409}, set())
+        self.assertGreater(statuses[409], 0)
+        self.assertEqual(self.assert_no_double_bookings(), statuses[201])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+import unittest
+import json
+import os
+import sys
+import tempfile
+from datetime import datetime
+from app import app, db
+from models import Resource, Reservation
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'db_scripts'))
+import bulk_import
+import generate_data
+
+class BulkImportTestCase(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.tmpdir = tempfile.TemporaryDirectory()
+        with app.app_context():
+            db.create_all()
+            resource = Resource(name='Existing Device')
+            db.session.add(resource)
+            db.session.commit()
+            db.session.add(Reservation(resource_id=resource.id, start_time=datetime(2025, 5, 28, 10, 0),
+                                       end_time=datetime(2025, 5, 28, 11, 0)))
+            db.session.commit()
+            self.resource_id = resource.id
+
+    def tearDown(self):
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+        self.tmpdir.cleanup()
+
+    def write(self, name, content):
+        path = os.path.join(self.tmpdir.name, name)
+        with open(path, 'w') as f:
+            f.write(content)
+        return path
+
+    def test_resources_are_deduplicated_against_database_and_input(self):
+        path = self.write('resources.csv', 'name,ip_address,ssh_port,web_port\n'
+                                           'Existing Device,10.0.0.1,22,80\n'
+                                           'New Device,10.0.0.2,22,\n'
+                                           'New Device,10.0.0.3,22,443\n'
+                                           ',10.0.0.4,22,80\n'
+                                           'Other Device,10.0.0.5,not-a-port,80\n')
+        with app.app_context():
+            report = bulk_import.import_resources(bulk_import.read_records(path), chunk_size=2)
+            self.assertEqual(report.to_dict(), {'read': 5, 'inserted': 1, 'duplicates': 2, 'rejected': 2})
+            self.assertEqual([line for line, _, _ in report.rejected], [5, 6])
+            new = Resource.query.filter_by(name='New Device').one()
+            self.assertEqual((new.ip_address, new.ssh_port, new.web_port), ('10.0.0.2', 22, None))
+            self.assertEqual(Resource.query.count(), 2)
+
+    def test_overlapping_reservations_are_rejected(self):
+        records = [
+            {'resource_name': 'Existing Device', 'start_time': '2025-05-28T10:30:00Z', 'duration_minutes': 30},
+            {'resource_name': 'Existing Device', 'start_time': '2025-05-28T11:00:00Z', 'end_time': '2025-05-28T12:00:00Z'},
+            {'resource_id': self.resource_id, 'start_time': '2025-05-28T11:30:00Z', 'duration_minutes': 60},
+            {'resource_id': self.resource_id, 'start_time': '2025-05-28T12:00:00Z', 'duration_minutes': 15, 'description': 'ok'},
+            {'resource_name': 'Missing Device', 'start_time': '2025-05-28T10:00:00Z', 'duration_minutes': 30},
+            {'resource_id': self.resource_id, 'start_time': 'yesterday', 'duration_minutes': 30},
+        ]
+        path = self.write('reservations.jsonl', '\n'.join(json.dumps(record) for record in records) + '\n')
+        with app.app_context():
+            # A chunk size of 2 also checks rows against those committed by earlier chunks.
+            report = bulk_import.import_reservations(bulk_import.read_records(path), chunk_size=2)
+            self.assertEqual(report.inserted, 2)
+            self.assertEqual([line for line, _, _ in report.rejected], [1, 3, 5, 6])
+            self.assertEqual(report.rejected[2][1], 'resource not found')
+            starts = [r.start_time for r in Reservation.query.order_by(Reservation.start_time)]
+            self.assertEqual(starts, [datetime(2025, 5, 28, 10), datetime(2025, 5, 28, 11), datetime(2025, 5, 28, 12)])
+
+    def test_generated_dataset_is_deterministic_and_loads_cleanly(self):
+        first = list(generate_data.generate_reservations(20, 500, seed=7))
+        self.assertEqual(first, list(generate_data.generate_reservations(20, 500, seed=7)))
+        self.assertEqual(len(first), 500)
+        with app.app_context():
+            bulk_import.import_resources(enumerate(generate_data.generate_resources(20, seed=7), start=1))
+            report = bulk_import.import_reservations(enumerate(first, start=1), chunk_size=128)
+            self.assertEqual((report.inserted, report.rejected), (500, []))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+import unittest
+import json
+from datetime import timedelta
+from app import app, db
+from archive import utcnow
+from changes import latest_seq, prune_changes
+from models import Resource, ReservationChange
+
+class ChangeSyncTestCase(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+
+        with app.app_context():
+            db.create_all()
+            resource = Resource(name='Synced Device')
+            db.session.add(resource)
+            db.session.commit()
+            self.resource_id = resource.id
+
+    def tearDown(self):
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def reserve(self, start_time):
+        response = self.client.post('/reserve', json={
+            'resource_id': self.resource_id, 'start_time': start_time, 'duration_minutes': 30
+        })
+        return json.loads(response.data)
+
+    def changes(self, since, **params):
+        query = '&'.join(f'{key}={value}' for key, value in params.items())
+        return json.loads(self.client.get(f'/reservations/changes?since={since}&{query}').data)
+
+    def test_changes_are_sequenced_in_write_order(self):
+        cursor = int(self.client.get('/reservations').headers['X-Change-Seq'])
+        first = self.reserve('2025-05-28T10:00:00Z')
+        second = self.reserve('2025-05-28T11:00:00Z')
+        self.client.delete(f"/reservations/{first['id']}")
+
+        data = self.changes(cursor)
+        self.assertFalse(data['resync_required'])
+        self.assertEqual([change['action'] for change in data['changes']], ['created', 'created', 'deleted'])
+        self.assertEqual([change['reservation']['id'] for change in data['changes']], [first['id'], second['id'], first['id']])
+        seqs = [change['seq'] for change in data['changes']]
+        self.assertEqual(seqs, sorted(seqs))
+        self.assertEqual(data['latest_seq'], seqs[-1])
+
+        self.assertEqual(self.changes(seqs[-1])['changes'], [])
+        self.assertEqual(int(self.client.get('/reservations').headers['X-Change-Seq']), seqs[-1])
+
+    def test_paging_and_resync(self):
+        for hour in range(10, 14):
+            self.reserve(f'2025-05-28T{hour}:00:00Z')
+        page = self.changes(0, limit=3)
+        self.assertEqual(len(page['changes']), 3)
+        self.assertTrue(page['has_more'])
+
+        with app.app_context():
+            oldest = db.session.query(db.func.min(ReservationChange.seq)).scalar()
+            ReservationChange.query.filter(ReservationChange.seq <= oldest + 1).delete()
+            db.session.commit()
+        self.assertTrue(self.changes(oldest)['resync_required'])
+        self.assertFalse(self.changes(oldest + 1)['resync_required'])
+
+    def test_pruning_makes_stale_clients_resync(self):
+        for hour in range(10, 14):
+            self.reserve(f'2025-05-28T{hour}:00:00Z')
+        with app.app_context():
+            seqs = [change.seq for change in ReservationChange.query.order_by(ReservationChange.seq)]
+            ReservationChange.query.filter(ReservationChange.seq <= seqs[1]) \
+                .update({'created_at': utcnow() - timedelta(days=40)})
+            db.session.commit()
+            self.assertEqual(prune_changes(utcnow() - timedelta(days=30), batch_size=1), 2)
+        self.assertTrue(self.changes(0)['resync_required'])
+        self.assertFalse(self.changes(seqs[1])['resync_required'])
+
+        with app.app_context():
+            self.assertEqual(prune_changes(utcnow() + timedelta(days=1)), 1)  # The newest entry stays
+            self.assertEqual(latest_seq(), seqs[-1])
+        self.assertTrue(self.changes(seqs[1])['resync_required'])
+        self.reserve('2025-05-28T15:00:00Z')
+        self.assertEqual(self.changes(seqs[-1])['changes'][0]['seq'], seqs[-1] + 1)
+
+if __name__ == '__main__':
+    unittest.main()
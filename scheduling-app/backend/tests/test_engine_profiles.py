@@ -0,0 +1,85 @@
+import unittest
+import os
+import tempfile
+from flask import Flask, jsonify
+from sqlalchemy import text
+from app import app, db
+from models import Resource
+from engine_profiles import configure, primary_reads, read_replica, sqlite_pragmas
+
+class EngineProfilesTestCase(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.saved_pragmas = dict(sqlite_pragmas)
+        with app.app_context():
+            db.create_all()
+
+    def tearDown(self):
+        sqlite_pragmas.clear()
+        sqlite_pragmas.update(self.saved_pragmas)
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def test_sqlite_connections_get_the_tuned_pragmas(self):
+        with app.app_context():
+            if db.engine.dialect.name != 'sqlite' or app.config['DB_ENGINE_PROFILE'] != 'tuned':
+                self.skipTest('needs the tuned profile on SQLite')
+            pragma = lambda name: db.session.execute(text(f'PRAGMA {name}')).scalar()
+            self.assertEqual(pragma('journal_mode'), 'wal')
+            self.assertEqual(pragma('synchronous'), 1)  # NORMAL
+            self.assertEqual(pragma('busy_timeout'), 5000)
+
+    def test_profiles_set_engine_options_per_backend(self):
+        other = Flask('profiles')
+        other.config['SQLALCHEMY_DATABASE_URI'] = 'postgresql://localhost/scheduler'
+        configure(other, {'DB_POOL_SIZE': '4', 'DATABASE_READ_URL': 'postgresql://replica/scheduler'})
+        options = other.config['SQLALCHEMY_ENGINE_OPTIONS']
+        self.assertEqual((options['pool_size'], options['max_overflow'], options['pool_pre_ping']), (4, 20, True))
+        self.assertEqual(other.config['SQLALCHEMY_BINDS']['read']['url'], 'postgresql://replica/scheduler')
+        self.assertTrue(other.config['READ_REPLICA_ENABLED'])
+
+        configure(other, {'DB_ENGINE_PROFILE': 'default'})
+        self.assertEqual(other.config['SQLALCHEMY_ENGINE_OPTIONS'], {})
+        with self.assertRaises(ValueError):
+            configure(other, {'DB_ENGINE_PROFILE': 'fast'})
+
+    def test_read_replica_views_read_from_the_replica_and_write_to_the_primary(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            routed = Flask('routed')
+            routed.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(tmpdir, 'primary.db')}"
+            configure(routed, {'DATABASE_READ_URL': f"sqlite:///{os.path.join(tmpdir, 'replica.db')}"})
+            db.init_app(routed)
+
+            @routed.route('/names')
+            @read_replica
+            def names():
+                with primary_reads():
+                    primary = [r.name for r in Resource.query.all()]
+                return jsonify(replica=[r.name for r in Resource.query.all()], primary=primary)
+
+            @routed.route('/add', methods=['POST'])
+            @read_replica
+            def add():
+                db.session.add(Resource(name='Written'))
+                db.session.commit()
+                return jsonify(ok=True)
+
+            with routed.app_context():
+                db.create_all()
+                with db.engines['read'].begin() as connection:
+                    Resource.__table__.create(connection)
+                    connection.execute(Resource.__table__.insert(), {'name': 'Replica Only'})
+
+            client = routed.test_client()
+            self.assertEqual(client.get('/names').get_json(), {'replica': ['Replica Only'], 'primary': []})
+            client.post('/add')
+            self.assertEqual(client.get('/names').get_json(), {'replica': ['Replica Only'], 'primary': ['Written']})
+            with routed.app_context():
+                for engine in db.engines.values():
+                    engine.dispose()
+            # init_app registered metadata for the 'read' bind on the shared db; the main app has no such bind.
+            db.metadatas.pop('read', None)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+import unittest
+import json
+from datetime import datetime, timedelta
+from app import app, db
+from models import Resource, Reservation
+from slots import earliest_slots, free_gaps
+
+class FreeSlotSearchTestCase(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+
+        with app.app_context():
+            db.create_all()
+            resources = [Resource(name='Busy Rig'), Resource(name='Half Rig'), Resource(name='Idle Rig')]
+            db.session.add_all(resources)
+            db.session.commit()
+            self.busy, self.half, self.idle = [resource.id for resource in resources]
+            db.session.add_all([
+                Reservation(resource_id=self.busy, start_time=datetime(2025, 5, 28, 8, 0), end_time=datetime(2025, 5, 28, 12, 0)),
+                Reservation(resource_id=self.busy, start_time=datetime(2025, 5, 28, 12, 30), end_time=datetime(2025, 5, 28, 18, 0)),
+                Reservation(resource_id=self.half, start_time=datetime(2025, 5, 28, 9, 0), end_time=datetime(2025, 5, 28, 10, 0)),
+            ])
+            db.session.commit()
+
+    def tearDown(self):
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def search(self, **params):
+        params.setdefault('start', '2025-05-28T08:00:00Z')
+        params.setdefault('end', '2025-05-28T18:00:00Z')
+        query = '&'.join(f'{key}={value}' for key, value in params.items())
+        response = self.client.get(f'/availability/free-slots?{query}')
+        return response.status_code, json.loads(response.data)
+
+    def test_free_gaps_merges_overlapping_busy_intervals(self):
+        busy = [(1, 4), (2, 3), (6, 8)]
+        self.assertEqual(list(free_gaps(busy, 0, 10)), [(0, 1), (4, 6), (8, 10)])
+        self.assertEqual(list(free_gaps([(0, 10)], 0, 10)), [])
+
+    def test_earliest_slot_per_resource(self):
+        status, data = self.search(duration_minutes=60)
+        self.assertEqual(status, 200)
+        slots = [(slot['resource_id'], slot['start_time']) for slot in data['slots']]
+        self.assertEqual(slots, [
+            (self.half, '2025-05-28T08:00:00+00:00'),
+            (self.idle, '2025-05-28T08:00:00+00:00'),
+        ])
+
+        status, data = self.search(duration_minutes=30, resource_ids=self.busy)
+        self.assertEqual(data['slots'], [{
+            'resource_id': self.busy,
+            'start_time': '2025-05-28T12:00:00+00:00',
+            'end_time': '2025-05-28T12:30:00+00:00',
+        }])
+
+    def test_all_free_gaps(self):
+        status, data = self.search(duration_minutes=90, mode='all', resource_ids=f'{self.busy},{self.half}')
+        self.assertEqual(data['resources'], [{
+            'resource_id': self.half,
+            'free': [{'start_time': '2025-05-28T10:00:00+00:00', 'end_time': '2025-05-28T18:00:00+00:00'}],
+        }])
+
+    def test_resources_free_for_whole_window(self):
+        status, data = self.search(mode='whole_window', start='2025-05-28T10:00:00Z', end='2025-05-28T12:00:00Z')
+        self.assertEqual(data['resource_ids'], [self.half, self.idle])
+        status, data = self.search(mode='whole_window', limit=1)
+        self.assertEqual(data['resource_ids'], [self.idle])
+
+    def test_invalid_parameters(self):
+        self.assertEqual(self.search(mode='earliest')[0], 400)
+        self.assertEqual(self.search(duration_minutes=30, mode='bogus')[0], 400)
+        for limit in (0, -1, 'ten'):
+            status, data = self.search(duration_minutes=30, limit=limit)
+            self.assertEqual(status, 400)
+            self.assertIn('limit', data['error'])
+
+        with app.app_context():
+            self.assertEqual(earliest_slots([self.idle], datetime(2025, 5, 28, 8, 0), datetime(2025, 5, 28, 18, 0),
+                                            timedelta(minutes=30), limit=0), [])
+
+if __name__ == '__main__':
+    unittest.main()
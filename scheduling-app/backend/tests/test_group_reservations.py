@@ -0,0 +1,128 @@
+import unittest
+import json
+import random
+import threading
+from collections import Counter
+from datetime import datetime, timedelta
+from unittest import mock
+import booking
+from app import app, db, socketio
+from booking import StaleRead
+from models import Resource, Reservation
+
+THREADS = 12
+ATTEMPTS_PER_THREAD = 20
+RESOURCE_COUNT = 5
+BASE_TIME = datetime(2033, 1, 10, 8, 0, 0)
+
+def iso(value):
+    return value.isoformat() + 'Z'
+
+class GroupReservationTestCase(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+        with app.app_context():
+            db.create_all()
+            resources = [Resource(name=f'Group Device {i}') for i in range(RESOURCE_COUNT)]
+            db.session.add_all(resources)
+            db.session.commit()
+            self.resource_ids = [resource.id for resource in resources]
+
+    def tearDown(self):
+        app.config['BOOKING_MAX_ATTEMPTS'] = 5
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def reserve_group(self, resource_ids, start, minutes=60, client=None):
+        return (client or self.client).post('/reserve/group', json={
+            'resource_ids': resource_ids, 'start_time': iso(start), 'duration_minutes': minutes,
+            'description': 'DUT + traffic generators'})
+
+    def test_group_is_booked_and_announced_together(self):
+        socket_client = socketio.test_client(app)
+        dut, generator, other = self.resource_ids[:3]
+        response = self.reserve_group([generator, dut], BASE_TIME)
+        self.assertEqual(response.status_code, 201)
+        data = json.loads(response.data)
+        self.assertEqual([r['resource_id'] for r in data['reservations']], [generator, dut])
+
+        events = [e['args'][0] for e in socket_client.get_received() if e['name'] == 'reservation_update']
+        self.assertEqual(len(events), 1)
+        self.assertEqual((events[0]['action'], events[0]['group_id']), ('group_created', data['group_id']))
+        self.assertEqual(len(events[0]['reservations']), 2)
+        socket_client.disconnect()
+
+        group = json.loads(self.client.get(f"/reservations/groups/{data['group_id']}").data)
+        self.assertEqual(sorted(r['id'] for r in group), sorted(r['id'] for r in data['reservations']))
+        self.assertEqual(self.client.get('/reservations/groups/nope').status_code, 404)
+
+        # One busy resource rejects the whole group
+        response = self.reserve_group([other, dut], BASE_TIME + timedelta(minutes=30))
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(json.loads(response.data)['failed'],
+                         [{'resource_id': dut, 'status': 'conflict',
+                           'error': 'Time slot is already reserved or overlaps with an existing reservation'}])
+        self.assertEqual(self.reserve_group([other, 9999], BASE_TIME).status_code, 404)
+        with app.app_context():
+            self.assertEqual(Reservation.query.count(), 2)
+
+        self.assertEqual(self.reserve_group([dut, dut], BASE_TIME).status_code, 400)
+        self.assertEqual(self.reserve_group([], BASE_TIME).status_code, 400)
+        for bad_id in (0, -3, '7', True):
+            response = self.reserve_group([dut, bad_id], BASE_TIME)
+            self.assertEqual(response.status_code, 400)
+            self.assertIn(f'Invalid resource id {bad_id!r}', json.loads(response.data)['error'])
+        self.assertEqual(self.reserve_group([dut], BASE_TIME, minutes=0).status_code, 400)
+
+    def test_racing_writers_get_a_retry_hint(self):
+        app.config['BOOKING_MAX_ATTEMPTS'] = 1
+        with mock.patch.object(booking, '_book_batch_locked', side_effect=StaleRead()):
+            response = self.reserve_group(self.resource_ids[:2], BASE_TIME)
+        self.assertEqual((response.status_code, response.headers['Retry-After']), (503, '1'))
+        with app.app_context():
+            self.assertEqual(Reservation.query.count(), 0)
+
+    def test_concurrent_groups_are_all_or_nothing(self):
+        statuses = Counter()
+        statuses_lock = threading.Lock()
+        barrier = threading.Barrier(THREADS)
+
+        def worker(seed):
+            rng = random.Random(seed)
+            client = app.test_client()
+            barrier.wait()
+            for _ in range(ATTEMPTS_PER_THREAD):
+                # Overlapping groups listed in random order: locking in request order would deadlock
+                group = rng.sample(self.resource_ids, rng.randint(2, 4))
+                start = BASE_TIME + timedelta(minutes=30 * rng.randrange(16))
+                response = self.reserve_group(group, start, rng.choice([30, 60]), client)
+                with statuses_lock:
+                    statuses[response.status_code] += 1
+
+        threads = [threading.Thread(target=worker, args=(seed,), daemon=True) for seed in range(THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=60)
+        self.assertFalse(any(thread.is_alive() for thread in threads), 'Group bookings deadlocked')
+
+        self.assertEqual(set(statuses) - {201, 409}, set())
+        self.assertGreater(statuses[409], 0)
+
+        with app.app_context():
+            rows = db.session.query(Reservation.resource_id, Reservation.start_time, Reservation.end_time,
+                                    Reservation.group_id).order_by(Reservation.resource_id, Reservation.start_time).all()
+        for previous, current in zip(rows, rows[1:]):
+            if previous.resource_id == current.resource_id:
+                self.assertLessEqual(previous.end_time, current.start_time,
+                                     f'Double booking on resource {current.resource_id}')
+        groups = {}
+        for row in rows:
+            groups.setdefault(row.group_id, set()).add((row.start_time, row.end_time))
+        self.assertEqual(len(groups), statuses[201])
+        self.assertTrue(all(len(windows) == 1 for windows in groups.values()))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,129 @@
+import unittest
+import asyncio
+import json
+import socket
+from unittest import mock
+from app import app, db, socketio
+from models import Resource, ResourceStatus
+import health
+from health import HealthProber, probe_targets
+
+def listening_socket():
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.bind(('127.0.0.1', 0))
+    server.listen(16)
+    return server
+
+def closed_port():
+    probe = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    probe.bind(('127.0.0.1', 0))
+    port = probe.getsockname()[1]
+    probe.close()
+    return port
+
+class HealthProberTestCase(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+        self.config = dict(app.config, HEALTH_PROBE_INTERVAL_SECONDS=30, HEALTH_PROBE_TIMEOUT_MS=1000,
+                           HEALTH_PROBE_MAX_BACKOFF_SECONDS=300)
+        self.ssh_server, self.web_server = listening_socket(), listening_socket()
+        self.down_port = closed_port()
+        with app.app_context():
+            db.create_all()
+            resources = [
+                Resource(name='Healthy', ip_address='127.0.0.1', ssh_port=self.ssh_server.getsockname()[1],
+                         web_port=self.web_server.getsockname()[1]),
+                Resource(name='Web down', ip_address='127.0.0.1', ssh_port=self.ssh_server.getsockname()[1],
+                         web_port=self.down_port),
+                Resource(name='No address'),
+            ]
+            db.session.add_all(resources)
+            db.session.commit()
+            self.healthy, self.web_down, self.unaddressed = [resource.id for resource in resources]
+
+    def tearDown(self):
+        self.ssh_server.close()
+        self.web_server.close()
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def statuses(self):
+        return {status['resource_id']: status for status in json.loads(self.client.get('/resources/status').data)}
+
+    def test_probes_store_statuses_and_push_changes(self):
+        socket_client = socketio.test_client(app)
+        prober = HealthProber()
+        with app.app_context():
+            changed = prober.run_cycle(self.config, now=0)
+        self.assertEqual(sorted(status['resource_id'] for status in changed), [self.healthy, self.web_down])
+
+        statuses = self.statuses()
+        self.assertEqual(statuses[self.healthy]['status'], 'up')
+        self.assertEqual(statuses[self.web_down]['status'], 'degraded')
+        self.assertEqual(statuses[self.web_down]['web'], {'reachable': False, 'latency_ms': None})
+        self.assertTrue(statuses[self.web_down]['ssh']['reachable'])
+        self.assertEqual(statuses[self.unaddressed]['status'], 'unknown')
+        pushed = [e['args'][0] for e in socket_client.get_received() if e['name'] == 'resource_status']
+        self.assertEqual(len(pushed), 1)
+        self.assertEqual(len(pushed[0]['statuses']), 2)
+
+        # Nothing changed: the next cycle stores the probe but pushes nothing
+        with app.app_context():
+            self.assertEqual(prober.run_cycle(self.config, now=30), [])
+        self.assertEqual(socket_client.get_received(), [])
+
+        # The web server goes away: one push for the resource that changed
+        self.web_server.close()
+        with app.app_context():
+            changed = prober.run_cycle(self.config, now=60)
+            self.assertEqual(db.session.get(ResourceStatus, self.healthy).failures, 1)
+        self.assertEqual([(status['resource_id'], status['status']) for status in changed], [(self.healthy, 'degraded')])
+        socket_client.disconnect()
+
+    def test_probe_cycles_keep_etags_valid(self):
+        prober = HealthProber()
+        with app.app_context():
+            prober.run_cycle(self.config, now=0)
+        etag = self.client.get(f'/resources/{self.healthy}').headers['ETag']
+        with app.app_context():
+            self.assertEqual(prober.run_cycle(self.config, now=30), [])
+        response = self.client.get(f'/resources/{self.healthy}', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertIsNotNone(self.statuses()[self.healthy]['checked_at'])
+
+    def test_unreachable_devices_are_backed_off(self):
+        prober = HealthProber()
+        self.assertEqual([prober.backoff_seconds(n, self.config) for n in range(7)], [30, 30, 60, 120, 240, 300, 300])
+        with app.app_context():
+            prober.run_cycle(self.config, now=0)                      # web_down: 1 failure
+            prober.run_cycle(self.config, now=30)                     # 2 failures, next probe at 90
+            prober.run_cycle(self.config, now=60)
+            self.assertEqual(db.session.get(ResourceStatus, self.web_down).failures, 2)
+            self.assertEqual(db.session.get(ResourceStatus, self.healthy).failures, 0)
+            prober.run_cycle(self.config, now=90)
+            self.assertEqual(db.session.get(ResourceStatus, self.web_down).failures, 3)
+
+    def test_concurrency_is_bounded_and_slow_hosts_time_out(self):
+        in_flight = peak = 0
+
+        async def slow_connect(host, port):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            try:
+                await asyncio.sleep(0.2 if port == 1 else 0.01)
+            finally:
+                in_flight -= 1
+            raise ConnectionRefusedError(111, 'Connection refused')
+
+        targets = [(resource_id, '10.0.0.1', {'ssh': 22, 'web': 1 if resource_id == 0 else 80}) for resource_id in range(20)]
+        with mock.patch.object(health.asyncio, 'open_connection', slow_connect):
+            results = asyncio.run(probe_targets(targets, concurrency=4, timeout=0.1))
+        self.assertEqual(peak, 4)
+        self.assertEqual(results[0]['web'], (False, None, 'timeout'))
+        self.assertEqual(results[5]['ssh'], (False, None, 'Connection refused'))
+
+if __name__ == '__main__':
+    unittest.main()
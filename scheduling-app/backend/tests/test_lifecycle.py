@@ -0,0 +1,113 @@
+import unittest
+import json
+from datetime import datetime, timedelta
+from app import app, db, socketio
+from archive import utcnow
+from metrics import metrics
+from models import Resource, Reservation
+from lifecycle import lifecycle_scheduler
+from series import Rule, new_series
+
+T = datetime(2032, 4, 5, 9, 0)
+CONFIG = {'LIFECYCLE_HORIZON_MINUTES': 60}
+
+def minutes(n):
+    return T + timedelta(minutes=n)
+
+def iso(value):
+    return value.isoformat() + 'Z'
+
+class LifecycleTestCase(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+        with app.app_context():
+            db.create_all()
+            resource = Resource(name='Lifecycle Rig')
+            db.session.add(resource)
+            db.session.commit()
+            self.resource_id = resource.id
+
+    def tearDown(self):
+        lifecycle_scheduler.stop()
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def add(self, start, end):
+        with app.app_context():
+            reservation = Reservation(resource_id=self.resource_id, start_time=start, end_time=end)
+            db.session.add(reservation)
+            db.session.commit()
+            return reservation.id
+
+    def run_due(self, now):
+        with app.app_context():
+            announced, timeout = lifecycle_scheduler.run_due(CONFIG, now)
+        return [(name, reservation['id'] or 'series') for name, reservation in announced], timeout
+
+    def test_boundaries_fire_in_order_across_horizons(self):
+        first = self.add(minutes(10), minutes(40))
+        second = self.add(minutes(40), minutes(70))
+        self.add(minutes(200), minutes(230))
+        with app.app_context():
+            db.session.add(new_series(self.resource_id, Rule(minutes(20), timedelta(minutes=5), 'DAILY'), None, ()))
+            db.session.commit()
+
+        self.assertEqual(self.run_due(T), ([], 600))  # Sleeps until the first start
+        self.assertEqual(self.run_due(minutes(10)), ([('reservation_started', first)], 600))
+
+        queries = metrics.sql_queries.value()
+        self.assertEqual(self.run_due(minutes(40)), ([
+            ('reservation_started', 'series'), ('reservation_ended', 'series'),
+            ('reservation_ended', first), ('reservation_started', second)
+        ], 1200))  # Next: the end of the horizon, where second's end gets loaded
+        self.assertEqual(metrics.sql_queries.value(), queries)  # Within the horizon: no SQL at all
+
+        self.assertEqual(self.run_due(minutes(70)), ([('reservation_ended', second)], 3600))
+
+    def test_writes_and_early_release_move_boundaries(self):
+        socket_client = socketio.test_client(app)
+        with app.app_context():
+            other = Resource(name='Other Rig')
+            db.session.add(other)
+            db.session.commit()
+            other_id = other.id
+        now = utcnow()
+        self.run_due(now)
+        response = self.client.post('/reserve', json={
+            'resource_id': self.resource_id, 'start_time': iso(now - timedelta(minutes=30)), 'duration_minutes': 60})
+        reservation_id = json.loads(response.data)['id']
+        soon = json.loads(self.client.post('/reserve', json={
+            'resource_id': other_id, 'start_time': iso(now + timedelta(minutes=5)), 'duration_minutes': 10}).data)['id']
+        _, timeout = self.run_due(now)
+        self.assertAlmostEqual(timeout, 300, delta=1)  # Woken for the new booking, not the next horizon
+
+        self.assertEqual(self.client.post(f'/reservations/{soon}/release').status_code, 409)
+        self.assertEqual(self.client.post('/reservations/999/release').status_code, 404)
+        response = self.client.post(f'/reservations/{reservation_id}/release')
+        self.assertEqual(response.status_code, 200)
+        released_end = json.loads(response.data)['end_time']
+        self.assertEqual(self.client.post(f'/reservations/{reservation_id}/release').status_code, 409)
+
+        # The freed slot can be booked right away
+        self.assertEqual(self.client.post('/reserve', json={
+            'resource_id': self.resource_id, 'start_time': iso(now + timedelta(minutes=20)),
+            'duration_minutes': 5}).status_code, 201)
+        self.assertEqual(self.run_due(utcnow())[0], [('reservation_ended', reservation_id)])
+
+        events = socket_client.get_received()
+        released = [e['args'][0] for e in events if e['name'] == 'reservation_update' and e['args'][0]['action'] == 'released']
+        self.assertEqual(released[0]['reservation']['end_time'], released_end)
+        ended = [e['args'][0] for e in events if e['name'] == 'reservation_ended']
+        self.assertEqual(ended[0]['at'], released_end)
+        changes = json.loads(self.client.get('/reservations/changes?since=0').data)['changes']
+        self.assertIn('released', [change['action'] for change in changes])
+
+        # Cancelled before it starts: nothing is announced
+        self.client.delete(f'/reservations/{soon}')
+        self.assertEqual(self.run_due(now + timedelta(minutes=16))[0], [])
+        socket_client.disconnect()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import unittest
+import re
+from app import app, db, socketio
+from models import Resource
+from metrics import metrics
+
+class MetricsTestCase(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+        metrics.reset()
+
+        with app.app_context():
+            db.create_all()
+            resource = Resource(name='Metrics Device')
+            db.session.add(resource)
+            db.session.commit()
+            self.resource_id = resource.id
+
+    def tearDown(self):
+        metrics.slow_request_seconds = 0
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def sample(self, text, name, **labels):
+        label_text = ','.join(f'{key}="{value}"' for key, value in labels.items())
+        match = re.search(rf'^{re.escape(name)}{re.escape("{" + label_text + "}" if labels else "")} (\S+)$', text, re.M)
+        return float(match.group(1)) if match else None
+
+    def test_requests_are_recorded_per_route_with_their_sql(self):
+        self.client.get(f'/resources/{self.resource_id}')
+        self.client.get('/resources/999999')
+        self.client.get('/reservations?start=2025-05-28T00:00:00Z&end=2025-05-29T00:00:00Z')
+
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.mimetype.startswith('text/plain'))
+        text = response.get_data(as_text=True)
+        route = '/resources/<int:resource_id>'
+        self.assertEqual(self.sample(text, 'http_request_duration_seconds_count', method='GET', endpoint=route, status='200'), 1)
+        self.assertEqual(self.sample(text, 'http_request_duration_seconds_count', method='GET', endpoint=route, status='404'), 1)
+        self.assertEqual(self.sample(text, 'http_request_duration_seconds_bucket', method='GET', endpoint=route, status='200', le='+Inf'), 1)
+        # The reservation listing is streamed; its query still counts against the request.
+        self.assertGreaterEqual(self.sample(text, 'http_request_sql_queries_sum', method='GET', endpoint='/reservations'), 1)
+        self.assertGreater(self.sample(text, 'sql_queries_total'), 0)
+        self.assertNotIn('endpoint="/metrics"', text)
+
+    def test_socket_emits_and_clients_are_counted(self):
+        socket_client = socketio.test_client(app)
+        self.assertEqual(metrics.socketio_clients.value(), 1)
+        response = self.client.post('/reserve', json={
+            'resource_id': self.resource_id, 'start_time': '2025-05-28T10:00:00Z', 'duration_minutes': 30
+        })
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(metrics.socketio_emits.value('reservation_update'), 1)
+        self.assertEqual(metrics.socketio_emit_duration.count('reservation_update'), 1)
+        socket_client.disconnect()
+        self.assertEqual(metrics.socketio_clients.value(), 0)
+
+    def test_slow_requests_are_logged_with_their_sql(self):
+        metrics.slow_request_seconds = 1e-9
+        with self.assertLogs(app.logger, level='WARNING') as logs:
+            self.client.get(f'/availability/{self.resource_id}')
+        self.assertIn('Slow request: GET /availability/', logs.output[0])
+        self.assertIn('SELECT', logs.output[0])
+
+if __name__ == '__main__':
+    unittest.main()
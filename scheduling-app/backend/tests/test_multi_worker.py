@@ -0,0 +1,116 @@
+import unittest
+import importlib.util
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REQUIRED_MODULES = ('redis', 'fakeredis', 'socketio', 'requests', 'gevent', 'geventwebsocket')
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def free_port_pair():
+    """Returns a port p such that p and p + 1 are both free."""
+    while True:
+        port = free_port()
+        with socket.socket() as s:
+            try:
+                s.bind(('127.0.0.1', port + 1))
+                return port
+            except OSError:
+                continue
+
+def wait_for_port(port, timeout=20):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise TimeoutError(f'Nothing listening on port {port}')
+
+@unittest.skipUnless(all(importlib.util.find_spec(name) for name in REQUIRED_MODULES),
+                     'multi-worker integration test needs ' + ', '.join(REQUIRED_MODULES))
+class MultiWorkerTestCase(unittest.TestCase):
+    """
+    Runs serve.py with two gevent workers sharing a message queue. A fakeredis TCP server stands
+    in for the Redis broker, so a booking on worker A must reach a client connected to worker B.
+    """
+
+    def setUp(self):
+        from fakeredis import TcpFakeServer
+
+        self.tmpdir = tempfile.TemporaryDirectory()
+        broker_port = free_port()
+        self.broker = TcpFakeServer(('127.0.0.1', broker_port))
+        threading.Thread(target=self.broker.serve_forever, daemon=True).start()
+
+        self.env = dict(os.environ,
+                        DATABASE_URL=f"sqlite:///{os.path.join(self.tmpdir.name, 'workers.db')}",
+                        SOCKETIO_MESSAGE_QUEUE=f'redis://127.0.0.1:{broker_port}/0',
+                        SOCKETIO_ASYNC_MODE='gevent')
+        subprocess.run([sys.executable, '-c', (
+            'from app import app, db\n'
+            'from models import Resource\n'
+            'with app.app_context():\n'
+            '    db.create_all()\n'
+            '    db.session.add(Resource(name="Shared Device"))\n'
+            '    db.session.commit()\n'
+        )], cwd=BACKEND_DIR, env=self.env, check=True)
+
+        self.base_port = free_port_pair()
+        self.server = subprocess.Popen(
+            [sys.executable, 'serve.py', '--workers', '2', '--host', '127.0.0.1', '--base-port', str(self.base_port)],
+            cwd=BACKEND_DIR, env=self.env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        wait_for_port(self.base_port)
+        wait_for_port(self.base_port + 1)
+
+    def tearDown(self):
+        self.server.terminate()
+        self.server.wait(timeout=10)
+        self.broker.shutdown()
+        self.broker.server_close()
+        self.tmpdir.cleanup()
+
+    def test_booking_on_one_worker_reaches_clients_of_another(self):
+        import socketio
+
+        received = threading.Event()
+        updates = []
+        client = socketio.Client()
+
+        @client.on('reservation_update')
+        def on_update(data):
+            updates.append(data)
+            received.set()
+
+        client.connect(f'http://127.0.0.1:{self.base_port + 1}', transports=['polling'])
+        try:
+            time.sleep(0.5)  # Let worker B's queue listener subscribe
+            request = urllib.request.Request(
+                f'http://127.0.0.1:{self.base_port}/reserve',
+                data=json.dumps({'resource_id': 1, 'start_time': '2025-05-28T10:00:00Z', 'duration_minutes': 30}).encode(),
+                headers={'Content-Type': 'application/json'}, method='POST'
+            )
+            with urllib.request.urlopen(request, timeout=10) as response:
+                self.assertEqual(response.status, 201)
+
+            self.assertTrue(received.wait(10), 'worker B never relayed the event')
+            self.assertEqual(updates[0]['action'], 'created')
+            self.assertEqual(updates[0]['reservation']['resource_id'], 1)
+        finally:
+            client.disconnect()
+
+if __name__ == '__main__':
+    unittest.main()
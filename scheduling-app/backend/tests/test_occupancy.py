@@ -0,0 +1,98 @@
+import unittest
+import json
+from datetime import datetime, timedelta
+from app import app, db
+from models import Resource
+from occupancy import occupancy_cache, slot_range
+
+DAY = datetime(2031, 5, 5)
+
+def iso(value):
+    return value.isoformat() + 'Z'
+
+class OccupancyTestCase(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+        occupancy_cache.clear()
+        with app.app_context():
+            db.create_all()
+            resources = [Resource(name=f'Grid Device {i}') for i in range(3)]
+            db.session.add_all(resources)
+            db.session.commit()
+            self.ids = [resource.id for resource in resources]
+
+    def tearDown(self):
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def reserve(self, resource_id, start, minutes):
+        response = self.client.post('/reserve', json={
+            'resource_id': resource_id, 'start_time': iso(start), 'duration_minutes': minutes
+        })
+        self.assertEqual(response.status_code, 201)
+        return json.loads(response.data)['id']
+
+    def occupancy(self, start=DAY, hours=24, **params):
+        query = '&'.join(f'{name}={value}' for name, value in params.items())
+        response = self.client.get(f'/occupancy?start={iso(start)}&end={iso(start + timedelta(hours=hours))}&{query}')
+        self.assertEqual(response.status_code, 200)
+        return json.loads(response.data)
+
+    def test_slot_range_matches_grid_cells(self):
+        slot = timedelta(minutes=30)
+        # A cell is reserved when its start lies inside the reservation
+        self.assertEqual(slot_range(DAY + timedelta(minutes=10), DAY + timedelta(minutes=70), DAY, slot, 48), (1, 3))
+        self.assertEqual(slot_range(DAY - timedelta(hours=1), DAY + timedelta(minutes=30), DAY, slot, 48), (0, 1))
+        self.assertEqual(slot_range(DAY + timedelta(minutes=5), DAY + timedelta(minutes=25), DAY, slot, 48), (1, 1))
+        self.assertEqual(slot_range(DAY + timedelta(hours=23), DAY + timedelta(hours=30), DAY, slot, 48), (46, 48))
+
+    def test_runs_per_resource(self):
+        first = self.reserve(self.ids[0], DAY + timedelta(hours=9), 90)
+        second = self.reserve(self.ids[0], DAY + timedelta(hours=11), 30)
+        third = self.reserve(self.ids[2], DAY - timedelta(hours=1), 120)
+        series = json.loads(self.client.post('/series', json={
+            'resource_id': self.ids[1], 'start_time': iso(DAY + timedelta(hours=8)), 'duration_minutes': 60,
+            'rrule': 'FREQ=DAILY'
+        }).data)
+
+        matrix = self.occupancy(slot_minutes=30)
+        self.assertEqual(matrix['slots'], 48)
+        self.assertEqual(matrix['resources'], {
+            str(self.ids[0]): [[18, 3, str(first)], [22, 1, str(second)]],
+            str(self.ids[1]): [[16, 2, f"{series['id']}@{DAY.isoformat()[:10]}T08:00:00+00:00"]],
+            str(self.ids[2]): [[0, 2, str(third)]],
+        })
+        self.assertEqual(matrix['reservations'][str(first)]['resource_id'], self.ids[0])
+
+        only = self.occupancy(slot_minutes=60, resource_ids=self.ids[0])
+        self.assertEqual(list(only['resources']), [str(self.ids[0])])
+        self.assertEqual(only['resources'][str(self.ids[0])], [[9, 2, str(first)], [11, 1, str(second)]])
+
+        self.assertEqual(self.client.get(f'/occupancy?start={iso(DAY)}&end={iso(DAY + timedelta(days=30))}'
+                                         '&slot_minutes=1').status_code, 400)
+        self.assertEqual(self.client.get('/occupancy').status_code, 400)
+
+    def test_cache_is_invalidated_only_by_changes_in_its_window(self):
+        self.reserve(self.ids[0], DAY + timedelta(hours=9), 60)
+        self.occupancy()
+        self.occupancy()
+        self.assertEqual((occupancy_cache.hits, occupancy_cache.misses), (1, 1))
+
+        # A write to another day keeps the entry
+        self.reserve(self.ids[0], DAY + timedelta(days=3), 60)
+        self.occupancy()
+        self.assertEqual((occupancy_cache.hits, occupancy_cache.misses), (2, 1))
+
+        # A write inside the window rebuilds it
+        added = self.reserve(self.ids[1], DAY + timedelta(hours=12), 60)
+        matrix = self.occupancy()
+        self.assertEqual(occupancy_cache.misses, 2)
+        self.assertIn(str(added), matrix['reservations'])
+
+        self.client.delete(f'/reservations/{added}')
+        self.assertNotIn(str(added), self.occupancy()['reservations'])
+
+if __name__ == '__main__':
+    unittest.main()
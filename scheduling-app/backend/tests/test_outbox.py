@@ -0,0 +1,111 @@
+import unittest
+import json
+import time
+from app import app, db, socketio
+from models import Resource, OutboxEvent
+from outbox import outbox_dispatcher
+
+def iso_hour(hour):
+    return f'2031-02-03T{hour:02d}:00:00Z'
+
+class OutboxTestCase(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+        with app.app_context():
+            db.create_all()
+            resource = Resource(name='Outbox Rig')
+            db.session.add(resource)
+            db.session.commit()
+            self.resource_id = resource.id
+        self.socket_client = socketio.test_client(app)
+
+    def tearDown(self):
+        self.socket_client.disconnect()
+        outbox_dispatcher.inline = True
+        app.config['OUTBOX_MAX_ATTEMPTS'] = 5
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def reserve(self, hour):
+        return self.client.post('/reserve', json={
+            'resource_id': self.resource_id, 'start_time': iso_hour(hour), 'duration_minutes': 60
+        })
+
+    def received(self):
+        return [e['args'][0] for e in self.socket_client.get_received() if e['name'] == 'reservation_update']
+
+    def outbox(self):
+        with app.app_context():
+            return [(row.event, json.loads(row.payload)['action'], row.attempts)
+                    for row in OutboxEvent.query.order_by(OutboxEvent.id)]
+
+    def test_event_is_committed_with_the_change(self):
+        outbox_dispatcher.inline = False  # As on a serve.py worker without the dispatcher
+        self.assertEqual(self.reserve(9).status_code, 201)
+        self.assertEqual(self.reserve(9).status_code, 409)  # Rolled back: no event
+        reservation_id = json.loads(self.reserve(11).data)['id']
+        self.client.delete(f'/reservations/{reservation_id}')
+        self.assertEqual(self.outbox(), [('reservation_update', 'created', 0), ('reservation_update', 'created', 0),
+                                         ('reservation_update', 'deleted', 0)])
+        self.assertEqual(self.received(), [])
+
+        with app.app_context():
+            self.assertTrue(outbox_dispatcher.drain())
+        events = self.received()
+        self.assertEqual([e['action'] for e in events], ['created', 'created', 'deleted'])
+        self.assertEqual([e['seq'] for e in events], sorted(e['seq'] for e in events))
+        self.assertEqual(self.outbox(), [])
+
+    def test_failed_emits_are_retried_in_order(self):
+        outbox_dispatcher.inline = False
+        self.reserve(9)
+        self.reserve(10)
+        real_emit = socketio.emit
+        failures = [RuntimeError('message queue unavailable')]
+
+        def flaky_emit(*args, **kwargs):
+            if failures:
+                raise failures.pop()
+            return real_emit(*args, **kwargs)
+
+        socketio.emit = flaky_emit
+        try:
+            with app.app_context():
+                self.assertFalse(outbox_dispatcher.drain())
+                self.assertEqual(self.received(), [])  # The second event waits for the first
+                self.assertEqual([attempts for _, _, attempts in self.outbox()], [1, 0])
+                self.assertTrue(outbox_dispatcher.drain())
+            self.assertEqual(len(self.received()), 2)
+
+            # An event that keeps failing is dropped after OUTBOX_MAX_ATTEMPTS
+            app.config['OUTBOX_MAX_ATTEMPTS'] = 2
+            self.reserve(12)
+            failures.extend([RuntimeError('down'), RuntimeError('down')])
+            with app.app_context():
+                self.assertFalse(outbox_dispatcher.drain())
+                self.assertFalse(outbox_dispatcher.drain())
+                self.assertTrue(outbox_dispatcher.drain())
+            self.assertEqual(self.outbox(), [])
+        finally:
+            socketio.emit = real_emit
+
+    def test_background_dispatcher_emits_after_the_request(self):
+        app.config['OUTBOX_POLL_INTERVAL_MS'] = 50
+        outbox_dispatcher.start(app, socketio)
+        try:
+            self.assertEqual(self.reserve(9).status_code, 201)
+            deadline = time.time() + 5
+            events = []
+            while not events and time.time() < deadline:
+                time.sleep(0.02)
+                events = self.received()
+            self.assertEqual([e['action'] for e in events], ['created'])
+        finally:
+            outbox_dispatcher.stop()
+            app.config['OUTBOX_POLL_INTERVAL_MS'] = 200
+            time.sleep(0.1)
+
+if __name__ == '__main__':
+    unittest.main()
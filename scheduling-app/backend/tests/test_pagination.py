@@ -0,0 +1,72 @@
+import unittest
+import json
+from datetime import datetime, timedelta
+from app import app, db
+from models import Resource, Reservation
+
+class PaginationTestCase(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+
+        with app.app_context():
+            db.create_all()
+            resources = [Resource(name=f'Paged Device {i}') for i in range(5)]
+            db.session.add_all(resources)
+            db.session.commit()
+            base = datetime(2025, 5, 28, 8, 0, 0)
+            # Pairs of reservations share a start time, so the id tie-breaker matters.
+            db.session.add_all([
+                Reservation(resource_id=resources[i % 5].id, start_time=base + timedelta(hours=i // 2),
+                            end_time=base + timedelta(hours=i // 2, minutes=30))
+                for i in range(11)
+            ])
+            db.session.commit()
+
+    def tearDown(self):
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def collect(self, path, limit):
+        items, cursor, pages = [], None, 0
+        while True:
+            url = f'{path}limit={limit}' + (f'&cursor={cursor}' if cursor else '')
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            page = json.loads(response.data)
+            self.assertLessEqual(len(page['items']), limit)
+            items.extend(page['items'])
+            pages += 1
+            cursor = page['next_cursor']
+            if cursor is None:
+                return items, pages
+
+    def test_reservations_are_paged_in_start_time_order(self):
+        items, pages = self.collect('/reservations?', 3)
+        self.assertEqual(pages, 4)
+        keys = [(item['start_time'], item['id']) for item in items]
+        self.assertEqual(keys, sorted(keys))
+        self.assertEqual(len(set(item['id'] for item in items)), 11)
+
+        window_items, _ = self.collect('/reservations?start=2025-05-28T10:00:00Z&end=2025-05-28T12:00:00Z&', 2)
+        self.assertEqual(len(window_items), 4)
+
+    def test_resources_are_paged_by_id(self):
+        items, pages = self.collect('/resources?', 2)
+        self.assertEqual(pages, 3)
+        self.assertEqual([item['id'] for item in items], sorted(item['id'] for item in items))
+
+    def test_page_size_is_capped_and_validated(self):
+        app.config['MAX_PAGE_SIZE'] = 4
+        try:
+            page = json.loads(self.client.get('/reservations?limit=50').data)
+            self.assertEqual(len(page['items']), 4)
+        finally:
+            app.config['MAX_PAGE_SIZE'] = 1000
+        self.assertEqual(self.client.get('/reservations?limit=0').status_code, 400)
+        self.assertEqual(self.client.get('/reservations?cursor=garbage').status_code, 400)
+        self.assertEqual(self.client.get('/resources?cursor=WyJ4Il0').status_code, 400)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import unittest
+import json
+from datetime import datetime
+from app import app, db
+from models import Resource, Reservation
+from reservation_index import reservation_index
+
+class ReservationIndexTestCase(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        app.config['RESERVATION_INDEX_ENABLED'] = True
+        self.client = app.test_client()
+
+        with app.app_context():
+            db.create_all()
+            resource = Resource(name='Indexed Device')
+            db.session.add(resource)
+            db.session.commit()
+            self.resource_id = resource.id
+            db.session.add(Reservation(
+                resource_id=resource.id,
+                start_time=datetime(2025, 5, 28, 10, 0, 0),
+                end_time=datetime(2025, 5, 28, 11, 0, 0)
+            ))
+            db.session.commit()
+        reservation_index.invalidate()
+
+    def tearDown(self):
+        app.config['RESERVATION_INDEX_ENABLED'] = False
+        reservation_index.invalidate()
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def reserve(self, start_time, duration_minutes):
+        return self.client.post('/reserve', json={
+            'resource_id': self.resource_id,
+            'start_time': start_time,
+            'duration_minutes': duration_minutes
+        })
+
+    def test_conflicts_are_detected_from_the_index(self):
+        self.assertEqual(self.reserve('2025-05-28T10:30:00Z', 60).status_code, 409)
+        self.assertEqual(self.reserve('2025-05-28T09:00:00Z', 120).status_code, 409)
+        self.assertEqual(self.reserve('2025-05-28T11:00:00Z', 30).status_code, 201)
+        self.assertEqual(self.reserve('2025-05-28T11:15:00Z', 30).status_code, 409)
+
+    def test_index_tracks_creates_and_deletes(self):
+        created = json.loads(self.reserve('2025-05-28T12:00:00Z', 60).data)
+        response = self.client.get(f'/availability/{self.resource_id}?start=2025-05-28T11:30:00Z')
+        data = json.loads(response.data)
+        self.assertEqual([r['id'] for r in data['reservations']], [created['id']])
+
+        self.assertEqual(self.client.delete(f"/reservations/{created['id']}").status_code, 200)
+        self.assertEqual(self.reserve('2025-05-28T12:00:00Z', 60).status_code, 201)
+
+        report = json.loads(self.client.get('/reservation-index/consistency').data)
+        self.assertTrue(report['consistent'])
+
+    def test_consistency_check_reports_drift(self):
+        self.reserve('2025-05-28T12:00:00Z', 60)  # Builds the index
+        with app.app_context():
+            external = Reservation(
+                resource_id=self.resource_id,
+                start_time=datetime(2025, 5, 29, 10, 0, 0),
+                end_time=datetime(2025, 5, 29, 11, 0, 0)
+            )
+            db.session.add(external)
+            db.session.commit()
+            external_id = external.id
+
+        report = json.loads(self.client.get('/reservation-index/consistency').data)
+        self.assertFalse(report['consistent'])
+        self.assertEqual(report['missing'], [external_id])
+
+    def test_disabled_index_falls_back_to_sql(self):
+        app.config['RESERVATION_INDEX_ENABLED'] = False
+        self.assertEqual(self.reserve('2025-05-28T10:30:00Z', 60).status_code, 409)
+        self.assertFalse(reservation_index.is_built)
+        self.assertEqual(self.client.get('/reservation-index/consistency').status_code, 404)
+
+if __name__ == '__main__':
+    unittest.main()
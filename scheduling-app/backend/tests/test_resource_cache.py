@@ -0,0 +1,91 @@
+import unittest
+import json
+from sqlalchemy import insert
+from app import app, db
+from metrics import metrics
+from models import Resource
+from resource_cache import ResourceCache
+
+class ResourceCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        app.config['RESPONSE_CACHE_ENABLED'] = False  # As in multi-worker mode: every request reaches the view
+        self.client = app.test_client()
+        with app.app_context():
+            db.create_all()
+            resources = [Resource(name=f'Cache Device {i}', ip_address=f'10.7.0.{i}') for i in range(3)]
+            db.session.add_all(resources)
+            db.session.commit()
+            self.ids = [resource.id for resource in resources]
+
+    def tearDown(self):
+        app.config['RESPONSE_CACHE_ENABLED'] = True
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def lookups(self):
+        return metrics.resource_cache_lookups.value('hit'), metrics.resource_cache_lookups.value('miss')
+
+    def test_lookups_are_served_from_the_cache(self):
+        hits, misses = self.lookups()
+        self.assertEqual(json.loads(self.client.get(f'/resources/{self.ids[0]}').data)['name'], 'Cache Device 0')
+        queries = metrics.sql_queries.value()
+        self.assertEqual(self.client.get(f'/resources/{self.ids[0]}').status_code, 200)
+        self.assertEqual(self.client.get(f'/availability/{self.ids[0]}').status_code, 200)
+        self.assertEqual(metrics.sql_queries.value() - queries, 1)  # Only availability's reservations read
+        self.assertEqual(self.lookups(), (hits + 2, misses + 1))
+        self.assertEqual(self.client.get('/resources/999').status_code, 404)
+        self.assertEqual(self.client.get('/availability/999').status_code, 404)
+
+        listed = json.loads(self.client.get('/resources').data)
+        queries = metrics.sql_queries.value()
+        self.assertEqual(json.loads(self.client.get('/resources').data), listed)
+        self.assertEqual(json.loads(self.client.get(f'/resources/{self.ids[2]}').data), listed[2])  # From the snapshot
+        self.assertEqual(metrics.sql_queries.value(), queries)
+        with app.app_context():
+            self.assertEqual(listed, [resource.to_dict() for resource in Resource.query.order_by(Resource.id)])
+
+    def test_committed_writes_invalidate(self):
+        self.client.get(f'/resources/{self.ids[0]}')
+        self.client.get(f'/resources/{self.ids[1]}')
+        self.client.get('/resources')
+        with app.app_context():
+            db.session.get(Resource, self.ids[0]).name = 'Renamed'
+            db.session.delete(db.session.get(Resource, self.ids[1]))
+            db.session.add(Resource(name='Added'))
+            db.session.commit()
+
+            db.session.get(Resource, self.ids[2]).name = 'Rolled back'
+            db.session.flush()
+            db.session.rollback()
+        self.assertEqual(json.loads(self.client.get(f'/resources/{self.ids[0]}').data)['name'], 'Renamed')
+        self.assertEqual(self.client.get(f'/resources/{self.ids[1]}').status_code, 404)
+        names = [resource['name'] for resource in json.loads(self.client.get('/resources').data)]
+        self.assertEqual(names, ['Renamed', 'Cache Device 2', 'Added'])
+
+        # Core inserts (the bulk loader) skip the mapper events and clear the whole cache
+        with app.app_context():
+            db.session.execute(insert(Resource.__table__), [{'name': 'Bulk'}])
+            db.session.commit()
+        self.assertIn('Bulk', [resource['name'] for resource in json.loads(self.client.get('/resources').data)])
+
+    def test_lru_and_ttl_bounds(self):
+        cache = ResourceCache(max_entries=2, ttl_seconds=60)
+        with app.app_context():
+            for resource_id in self.ids:
+                cache.get(resource_id)
+            hits, misses = self.lookups()
+            cache.get(self.ids[2])
+            cache.get(self.ids[0])  # Least recently used: evicted
+            self.assertEqual(self.lookups(), (hits + 1, misses + 1))
+            self.assertIsNone(cache.snapshot_body())  # Three resources do not fit (a miss)
+
+            cache.ttl_seconds = 0
+            cache.invalidate()
+            cache.get(self.ids[0])
+            cache.get(self.ids[0])
+            self.assertEqual(self.lookups(), (hits + 1, misses + 4))
+
+if __name__ == '__main__':
+    unittest.main()
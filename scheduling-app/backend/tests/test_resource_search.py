@@ -0,0 +1,96 @@
+import unittest
+import json
+from urllib.parse import urlencode
+from sqlalchemy import insert
+from app import app, db
+from models import Resource
+from resource_search import resource_search_index, search_database
+
+NAMES = [('Lab Rack 3', '10.0.3.1'), ('Rack', '10.0.0.9'), ('rack-30 gateway', '10.0.3.30'),
+         ('Bench scope', '192.168.1.13'), ('Backrack switch', '10.0.4.2'), ('Dev 100%', None)]
+
+class ResourceSearchTestCase(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        app.config['RESOURCE_SEARCH_INDEX_ENABLED'] = True
+        self.client = app.test_client()
+        with app.app_context():
+            db.create_all()
+            resources = [Resource(name=name, ip_address=ip) for name, ip in NAMES]
+            db.session.add_all(resources)
+            db.session.commit()
+            self.ids = {resource.name: resource.id for resource in resources}
+        resource_search_index.invalidate()
+
+    def tearDown(self):
+        app.config['RESOURCE_SEARCH_INDEX_ENABLED'] = True
+        resource_search_index.invalidate()
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def search(self, q, **params):
+        response = self.client.get(f"/resources/search?{urlencode({'q': q, **params})}")
+        self.assertEqual(response.status_code, 200)
+        return [(item['name'], item['match']) for item in json.loads(response.data)]
+
+    def test_ranked_matches(self):
+        self.assertEqual(self.search('rack'), [
+            ('Rack', 'exact'), ('rack-30 gateway', 'prefix'), ('Lab Rack 3', 'word'), ('Backrack switch', 'substring')])
+        self.assertEqual(self.search('RACK', limit=2), [('Rack', 'exact'), ('rack-30 gateway', 'prefix')])
+        self.assertEqual(self.search('3'), [('Lab Rack 3', 'word'), ('rack-30 gateway', 'word')])
+        self.assertEqual(self.search('10.0.3'), [('Lab Rack 3', 'prefix'), ('rack-30 gateway', 'prefix')])
+        self.assertEqual(self.search('.1.13'), [('Bench scope', 'substring')])
+        self.assertEqual(self.search('ck'), [])  # Substrings need three characters
+        self.assertEqual(self.search('100%'), [('Dev 100%', 'substring')])  # Not a LIKE wildcard
+        self.assertEqual(self.search(''), [])
+        self.assertEqual(self.client.get('/resources/search?q=a&limit=0').status_code, 400)
+
+    def test_database_fallback_ranks_like_the_index(self):
+        with app.app_context():
+            resource_search_index.build()
+            for q in ('rack', 'RACK', '3', '10.0.3', '.1.13', 'ck', '100%', 'b', 'ateway', 'zzz'):
+                self.assertEqual(search_database(q), resource_search_index.search(q), q)
+            self.assertEqual(len(search_database('rack', limit=2)), 2)
+
+        app.config['RESOURCE_SEARCH_INDEX_ENABLED'] = False
+        resource_search_index.invalidate()
+        self.assertEqual(self.search('gate'), [('rack-30 gateway', 'word')])
+        self.assertFalse(resource_search_index.is_built)
+
+    def test_database_fallback_fills_limit_like_the_index(self):
+        # Short queries: mid-word hits are fetched by the substring scan but never match
+        with app.app_context():
+            db.session.add_all(Resource(name=name) for name in ('xaby', 'zab1', 'rack ab-gateway', 'xgate'))
+            db.session.commit()
+            resource_search_index.build()
+            for q, limit in (('ab', 1), ('ab', 2), ('a', 3), ('3', 1), ('gate', 1), ('rack', 3), ('ck', 2)):
+                self.assertEqual(search_database(q, limit), resource_search_index.search(q, limit), (q, limit))
+            self.assertEqual([item['name'] for item in search_database('ab', 2)], ['rack ab-gateway'])
+
+    def test_index_follows_committed_writes(self):
+        self.assertEqual(self.search('scope'), [('Bench scope', 'word')])
+        with app.app_context():
+            db.session.add(Resource(name='Scope 2', ip_address='10.9.9.9'))
+            bench = db.session.get(Resource, self.ids['Bench scope'])
+            bench.name = 'Bench meter'
+            db.session.delete(db.session.get(Resource, self.ids['Rack']))
+            db.session.commit()
+
+            db.session.add(Resource(name='Scope rolled back'))
+            db.session.flush()
+            db.session.rollback()
+        self.assertTrue(resource_search_index.is_built)  # Applied in place, no rebuild
+        self.assertEqual(self.search('scope'), [('Scope 2', 'prefix')])
+        self.assertEqual(self.search('meter'), [('Bench meter', 'word')])
+        self.assertNotIn(('Rack', 'exact'), self.search('rack'))
+
+        # Core inserts (the bulk loader) bypass the flush: the index is rebuilt on next use
+        with app.app_context():
+            db.session.execute(insert(Resource.__table__), [{'name': 'Scope 3'}])
+            db.session.commit()
+        self.assertFalse(resource_search_index.is_built)
+        self.assertEqual(self.search('scope'), [('Scope 2', 'prefix'), ('Scope 3', 'prefix')])
+
+if __name__ == '__main__':
+    unittest.main()
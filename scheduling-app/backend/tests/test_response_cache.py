@@ -0,0 +1,80 @@
+import unittest
+import json
+from contextlib import contextmanager
+from sqlalchemy import event
+from app import app, db
+from models import Resource
+from response_cache import response_cache
+
+class ResponseCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        app.config['RESPONSE_CACHE_ENABLED'] = True
+        self.client = app.test_client()
+        response_cache.clear()
+
+        with app.app_context():
+            db.create_all()
+            resource = Resource(name='Cached Device')
+            db.session.add(resource)
+            db.session.commit()
+            self.resource_id = resource.id
+
+    def tearDown(self):
+        app.config['RESPONSE_CACHE_MAX_BODY_BYTES'] = 8 * 1024 * 1024
+        app.config['RESOURCE_CACHE_ENABLED'] = True
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    @contextmanager
+    def count_queries(self):
+        statements = []
+        with app.app_context():
+            engine = db.engine
+        listener = lambda conn, cursor, statement, *args: statements.append(statement)
+        event.listen(engine, 'before_cursor_execute', listener)
+        try:
+            yield statements
+        finally:
+            event.remove(engine, 'before_cursor_execute', listener)
+
+    def test_conditional_get_and_cache_skip_the_database(self):
+        first = self.client.get('/reservations')
+        etag = first.headers['ETag']
+        self.assertEqual(first.status_code, 200)
+
+        with self.count_queries() as statements:
+            not_modified = self.client.get('/reservations', headers={'If-None-Match': etag})
+            cached = self.client.get('/reservations')
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(cached.data, first.data)
+        self.assertEqual(cached.headers['X-Change-Seq'], first.headers['X-Change-Seq'])
+        self.assertEqual(statements, [])
+
+    def test_writes_expire_etags_and_cached_bodies(self):
+        etag = self.client.get('/reservations').headers['ETag']
+        self.client.post('/reserve', json={
+            'resource_id': self.resource_id, 'start_time': '2025-05-28T10:00:00Z', 'duration_minutes': 30
+        })
+        response = self.client.get('/reservations', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers['ETag'], etag)
+        self.assertEqual(len(json.loads(response.data)), 1)
+
+        # Query strings are cached separately
+        empty = self.client.get('/reservations?start=2030-01-01T00:00:00Z')
+        self.assertEqual(json.loads(empty.data), [])
+
+    def test_large_streamed_bodies_are_not_cached(self):
+        app.config['RESPONSE_CACHE_MAX_BODY_BYTES'] = 10
+        app.config['RESOURCE_CACHE_ENABLED'] = False  # Stream from the database rather than the resource snapshot
+        first = self.client.get('/resources')
+        self.assertEqual(json.loads(first.data)[0]['name'], 'Cached Device')
+        with self.count_queries() as statements:
+            second = self.client.get('/resources')
+        self.assertEqual(second.data, first.data)
+        self.assertNotEqual(statements, [])
+
+if __name__ == '__main__':
+    unittest.main()
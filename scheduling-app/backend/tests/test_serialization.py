@@ -0,0 +1,65 @@
+import unittest
+import json
+from datetime import datetime
+from app import app, db
+from models import Resource, Reservation
+from serialization import iter_json_array, reservation_json, resource_json
+
+class SerializationTestCase(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+
+        with app.app_context():
+            db.create_all()
+            resources = [
+                Resource(name='Quoted "Device" é\n', ip_address='fe80::1', ssh_port=22),
+                Resource(name='Bare Device'),
+            ]
+            db.session.add_all(resources)
+            db.session.commit()
+            db.session.add_all([
+                Reservation(resource_id=resources[0].id, start_time=datetime(2025, 5, 28, 10, 0, 0),
+                            end_time=datetime(2025, 5, 28, 11, 0, 0, 250000), description='Run \\ "nightly"'),
+                Reservation(resource_id=resources[1].id, start_time=datetime(2025, 5, 28, 12, 0, 0),
+                            end_time=datetime(2025, 5, 28, 13, 0, 0)),
+            ])
+            db.session.commit()
+
+    def tearDown(self):
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def test_fast_encoders_match_to_dict(self):
+        with app.app_context():
+            for resource in Resource.query.all():
+                row = (resource.id, resource.name, resource.ip_address, resource.ssh_port, resource.web_port)
+                self.assertEqual(json.loads(resource_json(row)), resource.to_dict())
+            for reservation in Reservation.query.all():
+                row = (reservation.id, reservation.resource_id, reservation.start_time,
+                       reservation.end_time, reservation.description)
+                self.assertEqual(json.loads(reservation_json(row)), reservation.to_dict())
+
+    def test_list_endpoints_stream_the_same_payload(self):
+        with app.app_context():
+            expected_resources = [resource.to_dict() for resource in Resource.query.order_by(Resource.id)]
+            expected_reservations = sorted((r.to_dict() for r in Reservation.query.all()), key=lambda r: r['id'])
+
+        response = self.client.get('/resources')
+        self.assertTrue(response.is_streamed)
+        self.assertEqual(json.loads(response.data), expected_resources)
+
+        response = self.client.get('/reservations')
+        self.assertEqual(response.content_type, 'application/json')
+        self.assertEqual(sorted(json.loads(response.data), key=lambda r: r['id']), expected_reservations)
+
+    def test_json_array_chunking(self):
+        encode = str
+        self.assertEqual(''.join(iter_json_array([], encode, chunk_size=2)), '[]')
+        chunks = list(iter_json_array(range(5), encode, chunk_size=2))
+        self.assertEqual(chunks, ['[', '0,1', ',2,3', ',4', ']'])
+        self.assertEqual(json.loads(''.join(chunks)), [0, 1, 2, 3, 4])
+
+if __name__ == '__main__':
+    unittest.main()
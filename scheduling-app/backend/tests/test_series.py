@@ -0,0 +1,178 @@
+import unittest
+import json
+import random
+from datetime import datetime, timedelta
+from app import app, db, socketio
+from models import Resource, ReservationSeries
+from series import Rule, InvalidRule, rules_conflict
+
+# A Monday
+MONDAY = datetime(2030, 1, 7, 9, 0)
+
+def iso(value):
+    return value.isoformat() + 'Z'
+
+class RuleTestCase(unittest.TestCase):
+    def test_expansion_matches_day_by_day_walk(self):
+        rng = random.Random(17)
+        hour = timedelta(hours=1)
+        for _ in range(300):
+            start = MONDAY + timedelta(days=rng.randint(0, 13), hours=rng.randint(0, 12))
+            weekdays = rng.sample(range(7), rng.randint(1, 4)) if rng.random() < 0.6 else None
+            freq = 'WEEKLY' if weekdays or rng.random() < 0.5 else 'DAILY'
+            count = rng.randint(1, 30) if rng.random() < 0.4 else None
+            until = start + timedelta(days=rng.randint(0, 90)) if count is None and rng.random() < 0.5 else None
+            try:
+                rule = Rule(start, hour, freq, rng.randint(1, 3), weekdays, until, count)
+            except InvalidRule:  # UNTIL falls before the first listed weekday
+                continue
+
+            expected = []
+            week0 = (start - timedelta(days=start.weekday())).date()
+            day = start.date()
+            while day < start.date() + timedelta(days=1500) and (count is None or len(expected) < count):
+                moment = datetime.combine(day, start.time())
+                if until is not None and moment > until:
+                    break
+                if freq == 'DAILY':
+                    matches = (day - start.date()).days % rule.interval == 0
+                else:
+                    matches = day.weekday() in rule.weekdays and (day - week0).days // 7 % rule.interval == 0
+                if matches and moment >= start:
+                    expected.append(moment)
+                day += timedelta(days=1)
+
+            window_start = start + timedelta(days=rng.randint(-3, 120), minutes=rng.randint(0, 120))
+            window_end = window_start + timedelta(days=rng.randint(1, 40))
+            self.assertEqual(list(rule.occurrences(window_start, window_end)),
+                             [s for s in expected if s < window_end and s + hour > window_start], rule.to_rrule())
+            if count is not None or until is not None:
+                self.assertEqual(rule.last_start(), expected[-1])
+
+    def test_parse_and_validation(self):
+        rule = Rule.parse('FREQ=WEEKLY;BYDAY=MO,WE,FR;UNTIL=20300131T000000Z', MONDAY, timedelta(hours=1))
+        self.assertEqual(rule.to_rrule(), 'FREQ=WEEKLY;BYDAY=MO,WE,FR;UNTIL=20300131T000000Z')
+        self.assertEqual(rule.last_end(), datetime(2030, 1, 30, 10, 0))
+        self.assertIsNone(Rule.parse('FREQ=DAILY', MONDAY, timedelta(hours=1)).last_end())
+        for text in ('', 'FREQ=MONTHLY', 'FREQ=DAILY;BYDAY=MO', 'FREQ=DAILY;COUNT=2;UNTIL=20300201',
+                     'FREQ=DAILY;BYMONTH=1', 'FREQ=WEEKLY;BYDAY=XX'):
+            with self.assertRaises(ValueError, msg=text):
+                Rule.parse(text, MONDAY, timedelta(hours=1))
+        with self.assertRaises(ValueError):  # Longer than the gap between Monday and Tuesday
+            Rule.parse('FREQ=WEEKLY;BYDAY=MO,TU', MONDAY, timedelta(hours=25))
+
+    def test_series_against_series_is_exact(self):
+        hour = timedelta(hours=1)
+        every_third_day = Rule(MONDAY, hour, 'DAILY', 3)
+        # Wednesdays every other week: meets the 3-day rhythm only every 42 days
+        fortnightly = Rule(MONDAY + timedelta(days=2), hour, 'WEEKLY', 2)
+        self.assertTrue(rules_conflict(every_third_day, set(), fortnightly, set()))
+        twelve_weeks = Rule(MONDAY + timedelta(days=2), hour, 'WEEKLY', 2, count=6)
+        clashes = {s for s in twelve_weeks.occurrences(MONDAY, MONDAY + timedelta(days=200))
+                   if every_third_day.is_occurrence(s)}
+        self.assertEqual(len(clashes), 2)
+        self.assertFalse(rules_conflict(every_third_day, set(), twelve_weeks, clashes))
+        self.assertTrue(rules_conflict(every_third_day, set(), fortnightly, clashes))
+        self.assertFalse(rules_conflict(every_third_day, set(), Rule(MONDAY + hour, hour, 'DAILY'), set()))
+
+class SeriesApiTestCase(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+        with app.app_context():
+            db.create_all()
+            resource = Resource(name='Series Rig')
+            db.session.add(resource)
+            db.session.commit()
+            self.resource_id = resource.id
+
+    def tearDown(self):
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def create_series(self, rrule, start=MONDAY, duration_minutes=60, **extra):
+        return self.client.post('/series', json={
+            'resource_id': self.resource_id, 'start_time': iso(start), 'duration_minutes': duration_minutes,
+            'rrule': rrule, **extra
+        })
+
+    def reserve(self, start, duration_minutes=30):
+        return self.client.post('/reserve', json={
+            'resource_id': self.resource_id, 'start_time': iso(start), 'duration_minutes': duration_minutes
+        })
+
+    def window(self, start, end):
+        return json.loads(self.client.get(f'/reservations?start={iso(start)}&end={iso(end)}').data)
+
+    def test_series_is_one_row_expanded_per_window(self):
+        response = self.create_series('FREQ=WEEKLY;BYDAY=MO,TU,WE,TH,FR', description='Nightly rig')
+        self.assertEqual(response.status_code, 201)
+        series = json.loads(response.data)
+        self.assertIsNone(series['last_end_time'])
+        with app.app_context():
+            self.assertEqual(ReservationSeries.query.count(), 1)
+
+        # Ten years later, one week still holds exactly five occurrences
+        week = MONDAY + timedelta(weeks=520)
+        occurrences = self.window(week, week + timedelta(days=7))
+        self.assertEqual(len(occurrences), 5)
+        self.assertTrue(all(o['id'] is None and o['series_id'] == series['id'] for o in occurrences))
+        self.assertEqual(occurrences[0]['description'], 'Nightly rig')
+
+        availability = json.loads(self.client.get(
+            f'/availability/{self.resource_id}?start={iso(week)}&end={iso(week + timedelta(days=1))}').data)
+        self.assertEqual([r['start_time'] for r in availability['reservations']], [week.isoformat() + '+00:00'])
+
+    def test_conflicts_with_reservations_both_ways(self):
+        self.assertEqual(self.reserve(MONDAY + timedelta(weeks=30, days=2, minutes=30)).status_code, 201)
+        self.assertEqual(self.create_series('FREQ=WEEKLY;BYDAY=MO,WE').status_code, 409)
+        # Leaving out the clashing occurrence makes the series bookable
+        clash = MONDAY + timedelta(weeks=30, days=2)
+        self.assertEqual(self.create_series('FREQ=WEEKLY;BYDAY=MO,WE', exdates=[iso(clash)]).status_code, 201)
+
+        self.assertEqual(self.reserve(MONDAY + timedelta(weeks=60, minutes=45)).status_code, 409)
+        self.assertEqual(self.reserve(clash).status_code, 201)
+        self.assertEqual(self.reserve(MONDAY + timedelta(weeks=60, hours=1)).status_code, 201)
+        self.assertEqual(self.create_series('FREQ=DAILY;INTERVAL=5', start=MONDAY + timedelta(minutes=30)).status_code, 409)
+
+        batch = self.client.post('/reserve/batch', json={'mode': 'best_effort', 'reservations': [
+            {'resource_id': self.resource_id, 'start_time': iso(MONDAY + timedelta(weeks=2)), 'duration_minutes': 30},
+            {'resource_id': self.resource_id, 'start_time': iso(MONDAY + timedelta(weeks=2, days=1)), 'duration_minutes': 30},
+        ]})
+        self.assertEqual([r['status'] for r in json.loads(batch.data)['results']], ['conflict', 'created'])
+
+        slots = json.loads(self.client.get(
+            f'/availability/free-slots?start={iso(MONDAY + timedelta(weeks=3))}'
+            f'&end={iso(MONDAY + timedelta(weeks=3, hours=3))}&duration_minutes=60').data)
+        self.assertEqual(slots['slots'][0]['start_time'], (MONDAY + timedelta(weeks=3, hours=1)).isoformat() + '+00:00')
+
+    def test_cancel_occurrence_and_delete_series(self):
+        series = json.loads(self.create_series('FREQ=DAILY;COUNT=10').data)
+        seq_before = json.loads(self.client.get('/reservations/changes?since=0').data)['latest_seq']
+        third = MONDAY + timedelta(days=2)
+
+        self.assertEqual(self.client.post(f"/series/{series['id']}/exceptions",
+                                          json={'occurrence_start': iso(third + timedelta(minutes=5))}).status_code, 400)
+        response = self.client.post(f"/series/{series['id']}/exceptions", json={'occurrence_start': iso(third)})
+        self.assertEqual(json.loads(response.data)['exdates'], [third.isoformat() + '+00:00'])
+        self.assertEqual(len(self.window(MONDAY, MONDAY + timedelta(days=30))), 9)
+        self.assertEqual(self.reserve(third).status_code, 201)
+
+        self.assertEqual(self.client.delete(f"/series/{series['id']}").status_code, 200)
+        self.assertEqual(len(self.window(MONDAY, MONDAY + timedelta(days=30))), 1)
+        changes = json.loads(self.client.get(f'/reservations/changes?since={seq_before}').data)['changes']
+        self.assertEqual([c['action'] for c in changes], ['series_updated', 'created', 'series_deleted'])
+        self.assertEqual(changes[0]['series_id'], series['id'])
+        self.assertEqual(self.client.get(f"/series/{series['id']}").status_code, 404)
+
+    def test_series_events_reach_subscribed_clients(self):
+        socket_client = socketio.test_client(app)
+        socket_client.emit('subscribe', {'start': '2031-03-03T00:00:00Z', 'end': '2031-03-04T00:00:00Z'}, callback=True)
+        self.create_series('FREQ=DAILY')
+        events = [e['args'][0] for e in socket_client.get_received() if e['name'] == 'reservation_update']
+        self.assertEqual([e['action'] for e in events], ['series_created'])
+        socket_client.disconnect()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import unittest
+import time
+from app import app, db, socketio
+from models import Resource
+from events import event_publisher
+
+class SocketRoomsTestCase(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+
+        with app.app_context():
+            db.create_all()
+            resources = [Resource(name='Room Device 1'), Resource(name='Room Device 2')]
+            db.session.add_all(resources)
+            db.session.commit()
+            self.device1, self.device2 = [resource.id for resource in resources]
+
+    def tearDown(self):
+        event_publisher.coalesce_seconds = 0
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def reserve(self, resource_id, start_time):
+        return self.client.post('/reserve', json={
+            'resource_id': resource_id, 'start_time': start_time, 'duration_minutes': 30
+        })
+
+    def updates(self, socket_client):
+        return [event['args'][0] for event in socket_client.get_received() if event['name'] == 'reservation_update']
+
+    def test_events_reach_only_matching_rooms(self):
+        everyone = socketio.test_client(app)
+        by_resource = socketio.test_client(app)
+        by_day = socketio.test_client(app)
+        self.assertEqual(by_resource.emit('subscribe', {'resource_ids': [self.device1]}, callback=True),
+                         {'rooms': [f'resource:{self.device1}']})
+        by_day.emit('subscribe', {'start': '2025-05-29T00:00:00Z', 'end': '2025-05-30T00:00:00Z'}, callback=True)
+
+        self.reserve(self.device1, '2025-05-28T10:00:00Z')
+        self.reserve(self.device2, '2025-05-29T10:00:00Z')
+
+        self.assertEqual(len(self.updates(everyone)), 2)
+        self.assertEqual([e['reservation']['resource_id'] for e in self.updates(by_resource)], [self.device1])
+        self.assertEqual([e['reservation']['resource_id'] for e in self.updates(by_day)], [self.device2])
+
+        # Reservations spanning midnight reach both day rooms; a client in several matching rooms gets one copy.
+        both = socketio.test_client(app)
+        both.emit('subscribe', {'resource_ids': [self.device2], 'start': '2025-05-29T00:00:00Z', 'end': '2025-05-29T12:00:00Z'}, callback=True)
+        self.reserve(self.device2, '2025-05-28T23:45:00Z')
+        self.assertEqual(len(self.updates(both)), 1)
+        self.assertEqual(len(self.updates(by_day)), 1)
+
+        for socket_client in (everyone, by_resource, by_day, both):
+            socket_client.disconnect()
+
+    def test_invalid_subscription(self):
+        socket_client = socketio.test_client(app)
+        response = socket_client.emit('subscribe', {'start': '2025-01-01T00:00:00Z', 'end': '2026-01-01T00:00:00Z'}, callback=True)
+        self.assertIn('error', response)
+        socket_client.disconnect()
+
+    def test_bursts_are_coalesced_per_room(self):
+        event_publisher.coalesce_seconds = 0.05
+        socket_client = socketio.test_client(app)
+        socket_client.emit('subscribe', {'resource_ids': [self.device1]}, callback=True)
+
+        for hour in (10, 11, 12):
+            self.reserve(self.device1, f'2025-05-28T{hour}:00:00Z')
+        self.assertEqual(self.updates(socket_client), [])
+
+        time.sleep(0.3)
+        updates = self.updates(socket_client)
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(updates[0]['action'], 'batch')
+        self.assertEqual(len(updates[0]['events']), 3)
+        self.assertEqual(updates[0]['seq'] - updates[0]['first_seq'], 2)
+        socket_client.disconnect()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+import unittest
+import gzip
+import json
+from datetime import datetime, timedelta
+from app import app, db, socketio
+from events import event_publisher
+from models import Resource, Reservation
+from serialization import ColumnarReservations, epoch_seconds, msgpack
+from series import Rule, new_series
+
+BASE_TIME = datetime(2034, 3, 6, 8, 0, 0)
+
+class WireFormatTestCase(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+        with app.app_context():
+            db.create_all()
+            resources = [Resource(name=f'Wire Device {i}') for i in range(4)]
+            db.session.add_all(resources)
+            db.session.flush()
+            self.resource_ids = [resource.id for resource in resources]
+            db.session.add_all(Reservation(resource_id=resource.id, start_time=BASE_TIME + timedelta(hours=hour),
+                                           end_time=BASE_TIME + timedelta(hours=hour, minutes=45),
+                                           description=f'Run {hour}')
+                               for resource in resources for hour in range(50))
+            db.session.add(new_series(self.resource_ids[0], Rule(BASE_TIME + timedelta(minutes=50), timedelta(minutes=5),
+                                                                 'DAILY'), 'Daily check', ()))
+            db.session.commit()
+
+    def tearDown(self):
+        app.config['RESPONSE_CACHE_ENABLED'] = True
+        event_publisher.compact_enabled = False
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def window(self, **params):
+        query = '&'.join(f'{name}={value}' for name, value in params.items())
+        return f'/reservations?start=2034-03-06T00:00:00Z&end=2034-03-07T00:00:00Z&{query}'
+
+    def test_large_json_is_gzipped(self):
+        plain = self.client.get(self.window())
+        self.assertNotIn('Content-Encoding', plain.headers)
+        for cache_enabled in (True, False):  # Replayed from the response cache, then streamed
+            app.config['RESPONSE_CACHE_ENABLED'] = cache_enabled
+            response = self.client.get(self.window(), headers={'Accept-Encoding': 'gzip'})
+            self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+            self.assertIn('Accept-Encoding', response.headers['Vary'])
+            self.assertEqual(json.loads(gzip.decompress(response.data)), json.loads(plain.data))
+            self.assertLess(len(response.data), len(plain.data) / 4)
+
+        app.config['RESPONSE_CACHE_ENABLED'] = True
+        response = self.client.get(self.window(), headers={'Accept-Encoding': 'gzip'})
+        self.assertTrue(response.headers['ETag'].startswith('W/'))
+        revalidated = self.client.get(self.window(), headers={'Accept-Encoding': 'gzip',
+                                                              'If-None-Match': response.headers['ETag']})
+        self.assertEqual(revalidated.status_code, 304)
+
+        small = self.client.get(f'/resources/{self.resource_ids[0]}', headers={'Accept-Encoding': 'gzip'})
+        self.assertNotIn('Content-Encoding', small.headers)  # Below COMPRESSION_MIN_BYTES
+
+    def test_columnar_form_matches_json(self):
+        listed = json.loads(self.client.get(self.window()).data)
+        with app.app_context():
+            columns = ColumnarReservations().add_dicts(listed).to_dict()
+        self.assertEqual(columns['id'][:2], [listed[0]['id'], listed[1]['id']])
+        self.assertEqual(columns['series_id'][-1], listed[-1]['series_id'])
+        self.assertEqual(columns['start'][0], epoch_seconds(BASE_TIME))
+        self.assertEqual(epoch_seconds(datetime(1970, 1, 1, 0, 0, 1, 500000)), 1.5)
+
+        response = self.client.get(self.window(), headers={'Accept': 'application/msgpack'})
+        self.assertIn('Accept', response.headers['Vary'])
+        if msgpack is None:
+            self.assertEqual(response.mimetype, 'application/json')  # Not installed: JSON as before
+            return
+        self.assertEqual(response.mimetype, 'application/msgpack')
+        self.assertEqual(msgpack.unpackb(response.data), columns)
+        self.assertLess(len(response.data), len(json.dumps(listed)) / 2)
+        page = msgpack.unpackb(self.client.get(self.window(limit=3), headers={'Accept': 'application/msgpack'}).data)
+        self.assertEqual(page['items']['id'], columns['id'][:3])
+        self.assertIsNotNone(page['next_cursor'])
+
+    def test_compact_socket_events(self):
+        event_publisher.compact_enabled = True
+        compact = socketio.test_client(app)
+        full = socketio.test_client(app)
+        self.assertEqual(compact.emit('subscribe', {'resource_ids': [self.resource_ids[1]], 'compact': True},
+                                      callback=True), {'rooms': [f'resource:{self.resource_ids[1]}'], 'compact': True})
+        start = BASE_TIME + timedelta(days=5)
+        response = self.client.post('/reserve', json={'resource_id': self.resource_ids[1],
+                                                      'start_time': start.isoformat() + 'Z', 'duration_minutes': 30})
+        reservation = json.loads(response.data)
+
+        [event] = [e['args'][0] for e in compact.get_received() if e['name'] == 'reservation_update']
+        self.assertEqual(event['action'], 'created')
+        self.assertEqual(event['reservations'], {
+            'id': [reservation['id']], 'resource_id': [self.resource_ids[1]], 'start': [epoch_seconds(start)],
+            'end': [epoch_seconds(start + timedelta(minutes=30))], 'description': [None], 'series_id': [None]})
+        [event] = [e['args'][0] for e in full.get_received() if e['name'] == 'reservation_update']
+        self.assertEqual(event['reservation'], reservation)
+
+        event_publisher.compact_enabled = False
+        self.assertEqual(compact.emit('subscribe', {'compact': True}, callback=True), {'rooms': ['all'], 'compact': False})
+        for socket_client in (compact, full):
+            socket_client.disconnect()
+
+if __name__ == '__main__':
+    unittest.main()
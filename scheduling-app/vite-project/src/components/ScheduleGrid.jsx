@@ -1,4 +1,4 @@
-import React, { useState, useEffect, useRef, useCallback } from 'react'; // Added useCallback
+import React, { useState, useEffect, useRef, useCallback, useMemo } from 'react'; // Added useCallback
 import { Link } from 'react-router-dom';
 import ReservationModal from './ReservationModal';
 import '../styles/ScheduleGrid.css';
@@ -12,33 +12,43 @@ const ScheduleGrid = ({ resources, reservations, timeSlots, displayDate, onReser
     const gridContainerRef = useRef(null);
     const prevScrollLeft = useRef(0); // To track scroll direction
 
-    const getReservationForCell = (resourceId, timeSlot) => {
-        return reservations.find(reservation => {
-            const reservationStart = new Date(reservation.start_time);
-            const reservationEnd = new Date(reservation.end_time);
-            const slotTime = new Date(timeSlot);
-            return reservation.resource_id === resourceId &&
-                   slotTime >= reservationStart && slotTime < reservationEnd;
+    // Reservation covering each cell, keyed by `${resourceId}:${slotIndex}`. A cell is reserved when its
+    // start lies inside a reservation (the same rule as GET /occupancy); built once per change of
+    // reservations or slots in O(reservations + reserved cells), instead of scanning every reservation per cell.
+    const reservationsByCell = useMemo(() => {
+        const cells = new Map();
+        if (timeSlots.length === 0) return cells;
+        const firstSlot = timeSlots[0].getTime();
+        const slotMs = timeSlots.length > 1 ? timeSlots[1].getTime() - firstSlot : 30 * 60 * 1000;
+        reservations.forEach(reservation => {
+            const first = Math.max(0, Math.ceil((new Date(reservation.start_time).getTime() - firstSlot) / slotMs));
+            const last = Math.min(timeSlots.length, Math.ceil((new Date(reservation.end_time).getTime() - firstSlot) / slotMs));
+            for (let index = first; index < last; index++) {
+                cells.set(`${reservation.resource_id}:${index}`, reservation);
+            }
         });
-    };
+        return cells;
+    }, [reservations, timeSlots]);
 
-    const isReserved = (resourceId, timeSlot) => {
-        return reservations.some(reservation => {
-            const reservationStart = new Date(reservation.start_time);
-            const reservationEnd = new Date(reservation.end_time);
-            const slotTime = new Date(timeSlot);
-            return reservation.resource_id === resourceId &&
-                   slotTime >= reservationStart && slotTime < reservationEnd;
-        });
-    };
+    const getReservationForCell = (resourceId, slotIndex) => reservationsByCell.get(`${resourceId}:${slotIndex}`);
 
-    const handleCellClick = (resource, timeSlot) => {
-        const existingReservation = getReservationForCell(resource.id, timeSlot);
+    const handleCellClick = (resource, timeSlot, slotIndex) => {
+        const existingReservation = getReservationForCell(resource.id, slotIndex);
 
         if (existingReservation) {
+            const now = new Date();
+            const inProgress = !existingReservation.series_id
+                && new Date(existingReservation.start_time) < now && now < new Date(existingReservation.end_time);
+            // A reservation in progress can be ended early, freeing the rest of its slot
+            if (inProgress) {
+                if (window.confirm(`Do you want to release "${existingReservation.description || 'this reservation'}" on ${resource.name} now?`)) {
+                    handleReleaseReservation(existingReservation);
+                }
+                return;
+            }
             // If the cell is part of an existing reservation, ask to cancel
             if (window.confirm(`Do you want to cancel the reservation for "${existingReservation.description || 'this slot'}" on ${resource.name}?`)) {
-                handleCancelReservation(existingReservation.id);
+                handleCancelReservation(existingReservation);
             }
         } else {
             // If the cell is available, open the reservation modal
@@ -90,12 +100,19 @@ const ScheduleGrid = ({ resources, reservations, timeSlots, displayDate, onReser
         }
     };
 
-    const handleCancelReservation = async (reservationId) => {
-        console.log(`Attempting to cancel reservation ${reservationId}`);
+    const handleCancelReservation = async (reservation) => {
+        console.log(`Attempting to cancel reservation ${reservation.id ?? `of series ${reservation.series_id}`}`);
         try {
-            const response = await fetch(`/reservations/${reservationId}`, {
-                method: 'DELETE',
-            });
+            // An occurrence of a recurring series is cancelled by adding an exception to the series
+            const response = reservation.series_id
+                ? await fetch(`/series/${reservation.series_id}/exceptions`, {
+                    method: 'POST',
+                    headers: { 'Content-Type': 'application/json' },
+                    body: JSON.stringify({ occurrence_start: reservation.start_time }),
+                })
+                : await fetch(`/reservations/${reservation.id}`, {
+                    method: 'DELETE',
+                });
 
             const responseData = await response.json();
 
@@ -114,6 +131,25 @@ const ScheduleGrid = ({ resources, reservations, timeSlots, displayDate, onReser
         }
     };
 
+    const handleReleaseReservation = async (reservation) => {
+        try {
+            const response = await fetch(`/reservations/${reservation.id}/release`, { method: 'POST' });
+            const responseData = await response.json();
+
+            if (!response.ok) {
+                const errorMessage = responseData.error || `HTTP error! status: ${response.status}`;
+                throw new Error(errorMessage);
+            }
+
+            if (onReservationCreated) {
+                onReservationCreated(); // Refresh reservations in MainView
+            }
+        } catch (error) {
+            console.error('Failed to release reservation:', error);
+            alert(`Failed to release reservation: ${error.message}`);
+        }
+    };
+
     const checkAndHandleDateChange = useCallback(() => {
         if (!gridContainerRef.current || !timeSlots || timeSlots.length === 0 || !displayDate) {
             return;
@@ -181,12 +217,8 @@ const ScheduleGrid = ({ resources, reservations, timeSlots, displayDate, onReser
                                 </Link>
                             </td>
                             {timeSlots.map((slot, index) => {
-                                const reserved = isReserved(resource.id, slot);
-                                const reservationInfo = reservations.find(r =>
-                                    r.resource_id === resource.id &&
-                                    new Date(r.start_time) <= slot &&
-                                    new Date(r.end_time) > slot
-                                );                                
+                                const reservationInfo = getReservationForCell(resource.id, index);
+                                const reserved = Boolean(reservationInfo);
 
                                 let cellContent = '\u00A0'; // Default to non-breaking space for empty cells
                                 let cellClassName = `time-slot-cell ${reserved ? 'reserved' : 'available'}`;
@@ -222,7 +254,7 @@ const ScheduleGrid = ({ resources, reservations, timeSlots, displayDate, onReser
                                     <td
                                         key={`${resource.id}-${slot.toISOString()}`}
                                         className={cellClassName}
-                                        onClick={() => handleCellClick(resource, slot)} 
+                                        onClick={() => handleCellClick(resource, slot, index)} 
                                         colSpan={colSpan > 1 ? colSpan : undefined}
                                     >
                                         {cellContent}
@@ -1,5 +1,6 @@
 import React, { useEffect, useState } from 'react';
 import { useParams, Link } from 'react-router-dom';
+import io from 'socket.io-client';
 import '../styles/DeviceInfoPage.css';
 
 const DeviceInfoPage = () => {
@@ -7,6 +8,7 @@ const DeviceInfoPage = () => {
     const [resource, setResource] = useState(null);
     const [loading, setLoading] = useState(true);
     const [error, setError] = useState(null);
+    const [health, setHealth] = useState(null);
 
     useEffect(() => {
         const fetchResourceDetails = async () => {
@@ -31,6 +33,22 @@ const DeviceInfoPage = () => {
         }
     }, [resourceId]);
 
+    // Reachability of the device's SSH/web ports, kept current by resource_status pushes
+    useEffect(() => {
+        if (!resourceId) return;
+        fetch(`/resources/status?resource_ids=${resourceId}`)
+            .then((response) => (response.ok ? response.json() : []))
+            .then((statuses) => setHealth(statuses[0] || null))
+            .catch((err) => console.error('Failed to fetch device status:', err));
+
+        const socket = io();
+        socket.on('resource_status', ({ statuses }) => {
+            const status = statuses.find((s) => String(s.resource_id) === String(resourceId));
+            if (status) setHealth(status);
+        });
+        return () => socket.disconnect();
+    }, [resourceId]);
+
     if (loading) {
         return <div>Loading device information...</div>;
     }
@@ -78,6 +96,11 @@ const DeviceInfoPage = () => {
 
                 <section className="info-section data-section">
                     <h2>Details</h2>
+                    <div className="data-item">
+                        <strong>Status:</strong> {health ? health.status : 'unknown'}
+                        {health && health.ssh && ` (SSH ${health.ssh.reachable ? `${health.ssh.latency_ms} ms` : 'down'})`}
+                        {health && health.web && ` (Web ${health.web.reachable ? `${health.web.latency_ms} ms` : 'down'})`}
+                    </div>
                     <div className="data-item"><strong>IP Address:</strong> {resource.ip_address || 'N/A'}</div>
                     <div className="data-item"><strong>SSH Port:</strong> {resource.ssh_port || 'N/A'}</div>
                     <div className="data-item"><strong>Web Port:</strong> {resource.web_port || 'N/A'}</div>
@@ -1,10 +1,13 @@
-import React, { useEffect, useState, useCallback } from 'react';
+import React, { useEffect, useState, useCallback, useRef } from 'react';
 import ScheduleGrid from '../components/ScheduleGrid';
 import io from 'socket.io-client'; // Import socket.io-client
 import '../styles/MainView.css';
 
 const INITIAL_SLOTS_COUNT = 72; // e.g., 24 hours * 3 slots/hour (20 min slots)
 const SLOTS_PER_LOAD = 12; // Load 4 more hours (12 slots of 20 mins)
+const SLOT_DURATION_MS = 30 * 60 * 1000;
+const SEARCH_DEBOUNCE_MS = 150;
+const SEARCH_LIMIT = 100;
 
 const MainView = () => {
     const [resources, setResources] = useState([]);
@@ -14,7 +17,17 @@ const MainView = () => {
     const [isLoading, setIsLoading] = useState(true);
     const [error, setError] = useState(null);
     const [searchTerm, setSearchTerm] = useState('');
+    // Resources matching searchTerm, ranked by the server (null while the search box is empty)
+    const [searchResults, setSearchResults] = useState(null);
     const [socket, setSocket] = useState(null); // State for socket instance
+    // Visible time window; kept in a ref so the socket handler always fetches the current window
+    const visibleWindowRef = useRef(null);
+    // Seq of the last reservation change applied to `reservations` (null until the first full load)
+    const lastSeqRef = useRef(null);
+    const socketRef = useRef(null);
+    // Events that arrive while a full reload is in flight are replayed from the change log afterwards
+    const fetchInFlightRef = useRef(false);
+    const missedDuringFetchRef = useRef(false);
 
     // Function to get the appropriate start time for the day
     const getBaseStartTime = useCallback((date) => {
@@ -33,7 +46,7 @@ const MainView = () => {
     const generateSlots = useCallback((startDateTime, numSlots) => {
         const slots = [];
         for (let i = 0; i < numSlots; i++) {
-            const time = new Date(startDateTime.getTime() + i * 30 * 60 * 1000);
+            const time = new Date(startDateTime.getTime() + i * SLOT_DURATION_MS);
             slots.push(time);
         }
         return slots;
@@ -43,6 +56,10 @@ const MainView = () => {
     useEffect(() => {
         const baseStart = getBaseStartTime(displayDate);
         const initialSlotsArray = generateSlots(baseStart, INITIAL_SLOTS_COUNT);
+        visibleWindowRef.current = {
+            start: initialSlotsArray[0],
+            end: new Date(initialSlotsArray[initialSlotsArray.length - 1].getTime() + SLOT_DURATION_MS),
+        };
         setTimeSlots(initialSlotsArray);
     }, [displayDate, getBaseStartTime, generateSlots, INITIAL_SLOTS_COUNT]);
 
@@ -59,16 +76,85 @@ const MainView = () => {
         }
     };
 
-    // Function to fetch reservations
+    // Function to fetch reservations overlapping the visible window only
     const fetchReservations = async () => {
+        fetchInFlightRef.current = true;
+        missedDuringFetchRef.current = false;
         try {
-            const reservationsResponse = await fetch('/reservations');
+            const params = new URLSearchParams();
+            if (visibleWindowRef.current) {
+                params.set('start', visibleWindowRef.current.start.toISOString());
+                params.set('end', visibleWindowRef.current.end.toISOString());
+                // Past windows may reach reservations the backend has already archived
+                if (visibleWindowRef.current.start < new Date()) params.set('include_archived', 'true');
+            }
+            const reservationsResponse = await fetch(`/reservations?${params.toString()}`);
             if (!reservationsResponse.ok) throw new Error('Network response for reservations was not ok');
+            const seqHeader = reservationsResponse.headers.get('X-Change-Seq');
             const reservationsData = await reservationsResponse.json();
+            lastSeqRef.current = seqHeader !== null ? Number(seqHeader) : null;
             setReservations(reservationsData);
         } catch (error) {
             setError(prevError => prevError || `Error fetching reservations: ${error.message}`);
             console.error('Error fetching reservations:', error);
+        } finally {
+            fetchInFlightRef.current = false;
+        }
+        if (missedDuringFetchRef.current && lastSeqRef.current !== null) {
+            missedDuringFetchRef.current = false;
+            syncChanges();
+        }
+    };
+
+    const overlapsVisibleWindow = (reservation) => {
+        const visibleWindow = visibleWindowRef.current;
+        if (!visibleWindow) return true;
+        return new Date(reservation.start_time) < visibleWindow.end && new Date(reservation.end_time) > visibleWindow.start;
+    };
+
+    // Occurrences of recurring series have no id of their own
+    const reservationKey = (reservation) => reservation.id ?? `${reservation.series_id}@${reservation.start_time}`;
+
+    // Series are expanded per window on the server, so any series change means reloading the window
+    const isSeriesChange = (action) => action.startsWith('series_');
+
+    // Apply a list of {action, reservation} changes to the reservations in state
+    const applyChanges = (changes) => {
+        setReservations(prevReservations => {
+            const byId = new Map(prevReservations.map(reservation => [reservationKey(reservation), reservation]));
+            changes.forEach(({ action, reservation }) => {
+                if (action === 'deleted') {
+                    byId.delete(reservation.id);
+                } else if (overlapsVisibleWindow(reservation)) {
+                    byId.set(reservation.id, reservation);
+                }
+            });
+            return Array.from(byId.values());
+        });
+    };
+
+    // Fetch only the changes after the last applied seq; fall back to a full reload when they are gone
+    const syncChanges = async () => {
+        if (lastSeqRef.current === null) {
+            return fetchReservations();
+        }
+        try {
+            const changesResponse = await fetch(`/reservations/changes?since=${lastSeqRef.current}`);
+            if (!changesResponse.ok) throw new Error('Network response for reservation changes was not ok');
+            const changesData = await changesResponse.json();
+            if (changesData.resync_required || changesData.changes.some(change => isSeriesChange(change.action))) {
+                return fetchReservations();
+            }
+            applyChanges(changesData.changes);
+            if (changesData.changes.length) {
+                lastSeqRef.current = changesData.changes[changesData.changes.length - 1].seq;
+            }
+            if (changesData.has_more) {
+                return syncChanges();
+            }
+        } catch (error) {
+            console.error('Error syncing reservation changes:', error);
+            return fetchReservations();
         }
     };
 
@@ -77,8 +163,7 @@ const MainView = () => {
             setIsLoading(true);
             setError(null); // Clear previous errors
             try {
-                await fetchResources();
-                await fetchReservations();
+                await fetchResources(); // Reservations are fetched per visible window below
             } catch (error) {
                 setError(`Error fetching initial data: ${error.message}`);
                 console.error('Error fetching initial data:', error);
@@ -87,20 +172,66 @@ const MainView = () => {
             }
         };
         fetchData();
-    }, []); // Removed displayDate from here, reservations are global for now
+    }, []);
+
+    // Only receive socket events for the visible window (UTC day rooms on the server)
+    const subscribeToVisibleWindow = () => {
+        const visibleWindow = visibleWindowRef.current;
+        if (!socketRef.current || !visibleWindow) return;
+        socketRef.current.emit('subscribe', {
+            start: visibleWindow.start.toISOString(),
+            end: visibleWindow.end.toISOString(),
+        });
+    };
+
+    // Fetch reservations whenever the visible window is (re)initialised
+    useEffect(() => {
+        if (timeSlots.length === 0) return;
+        subscribeToVisibleWindow();
+        fetchReservations();
+    }, [timeSlots]);
+
+    const handleReservationUpdate = (data) => {
+        if (data.action === 'batch') { // Several events coalesced by the server, in order
+            data.events.forEach(handleReservationUpdate);
+            return;
+        }
+        if (fetchInFlightRef.current || lastSeqRef.current === null) {
+            missedDuringFetchRef.current = true;
+            return;
+        }
+        if (data.seq !== undefined && data.seq <= lastSeqRef.current) return; // Already applied
+        if (isSeriesChange(data.action)) {
+            fetchReservations();
+            return;
+        }
+        // Events are scoped to our window, so seq gaps are expected and the event can be applied directly
+        const changes = data.reservations
+            ? data.reservations.map(reservation => ({ action: 'created', reservation }))
+            : [{ action: data.action, reservation: data.reservation }];
+        applyChanges(changes);
+        if (data.seq !== undefined) lastSeqRef.current = data.seq;
+    };
 
     // Socket.IO setup
     useEffect(() => {
         // Initialize socket connection
         const newSocket = io(); // Connect to the backend Socket.IO server
+        socketRef.current = newSocket;
         setSocket(newSocket);
 
+        // (Re)subscribe on every connection; after a reconnect, fetch the deltas missed while offline
+        newSocket.on('connect', () => {
+            subscribeToVisibleWindow();
+            if (lastSeqRef.current !== null && !fetchInFlightRef.current) {
+                syncChanges();
+            }
+        });
+
         // Listen for reservation updates
         newSocket.on('reservation_update', (data) => {
             console.log('Reservation update received:', data);
-            // Refetch reservations to update the view
-            // More sophisticated updates could be done here (e.g., updating state directly)
-            fetchReservations(); 
+            handleReservationUpdate(data);
         });
 
         // Clean up the connection when the component unmounts
@@ -108,7 +239,7 @@ const MainView = () => {
     }, []); // Empty dependency array means this effect runs once on mount and cleanup on unmount
 
     const handleReservationCreated = () => {
-        fetchReservations(); // This will now also be triggered by socket event, but direct call is fine for immediate feedback
+        syncChanges(); // Usually already applied from the socket event; this only fetches missing deltas
     };
 
     const handlePreviousDay = () => {
@@ -143,9 +274,31 @@ const MainView = () => {
         }
     }, [displayDate]);
 
-    const filteredResources = resources.filter(resource =>
-        resource.name.toLowerCase().includes(searchTerm.toLowerCase())
-    );
+    // Type-ahead: ask the server's search index instead of filtering the whole inventory here
+    useEffect(() => {
+        const term = searchTerm.trim();
+        if (!term) {
+            setSearchResults(null);
+            return;
+        }
+        const controller = new AbortController();
+        const timer = setTimeout(async () => {
+            try {
+                const params = new URLSearchParams({ q: term, limit: SEARCH_LIMIT });
+                const response = await fetch(`/resources/search?${params}`, { signal: controller.signal });
+                if (!response.ok) throw new Error(`Search failed: ${response.statusText}`);
+                setSearchResults(await response.json());
+            } catch (err) {
+                if (err.name !== 'AbortError') console.error('Error searching resources:', err);
+            }
+        }, SEARCH_DEBOUNCE_MS);
+        return () => {
+            clearTimeout(timer);
+            controller.abort();
+        };
+    }, [searchTerm]);
+
+    const filteredResources = searchResults ?? resources;
 
     if (isLoading) {
         return <div className="loading-message">Loading...</div>;
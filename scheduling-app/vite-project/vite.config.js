@@ -11,6 +11,7 @@ export default defineConfig({
       '/reserve': 'http://localhost:5000',
       '/availability': 'http://localhost:5000',
       '/reservations': 'http://localhost:5000',
+      '/series': 'http://localhost:5000',
       '/socket.io': {
         target: 'http://localhost:5000',
         ws: true,